@@ -0,0 +1,257 @@
+"""
+Async read path for the event list, upcoming and detail endpoints.
+
+These are plain Django class-based views with ``async def`` handlers, so an
+ASGI server runs them on its event loop instead of handing every request to
+a worker thread the way it does for DRF's sync ``APIView``. They share the
+query, pagination, cache and validator logic of the sync views and return
+the same payloads, rendered with ``FastJSONRenderer``.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound, Throttled
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import CachedTokenAuthentication
+from .cache import LRUBackend, get_events_cache
+from .changes import broadcaster
+from .conditional import conditional_response, event_validators, make_etag, page_validators, set_validators
+from .metrics import timer
+from .renderers import FastJSONRenderer
+from .routers import get_replica_settings, reads_pinned_to_primary, replica_cache_timeout, route_reads_to_replica
+from .models import Event, tag_names_for
+from .serializers import EventSerializer, EventValuesSerializer
+from .throttling import LocalBucketStore, get_bucket_store
+from .views import EventListMixin, UpcomingEventListMixin
+
+
+async def _events_cache_call(method, *args, **kwargs):
+    # The in-process backend never blocks; shared backends do network I/O
+    if isinstance(get_events_cache().backend, LRUBackend):
+        return method(*args, **kwargs)
+    return await sync_to_async(method)(*args, **kwargs)
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async stand-in for ``APIView``: token (and optionally session)
+    authentication, an authenticated-only permission, the default throttles
+    and DRF-style error responses.
+    """
+    session_authentication = True
+    token_authentication = CachedTokenAuthentication()
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    renderer = FastJSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        # A DRF Request gives the shared helpers their query_params
+        self.request = Request(request)
+        try:
+            await self.authenticate(request)
+            await self.check_throttles()
+            await self.route_reads()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        user, auth = None, None
+        if self.session_authentication:
+            session_user = await request.auser()
+            if session_user.is_active:
+                user = session_user
+        if user is None:
+            user, auth = await self.token_authentication.aauthenticate(request) or (None, None)
+        if user is None:
+            raise NotAuthenticated()
+        # Also sets them on the Django request
+        self.request.user, self.request.auth = user, auth
+
+    async def route_reads(self):
+        # Pinned users are looked up in a cache that may do network I/O
+        config = get_replica_settings()
+        if not config['ALIASES'] or isinstance(caches[config['CACHE']], LocMemCache):
+            route_reads_to_replica(self.request)
+        else:
+            await sync_to_async(route_reads_to_replica)(self.request)
+
+    async def check_throttles(self):
+        waits = []
+        for throttle in [throttle_class() for throttle_class in self.throttle_classes]:
+            # In-process buckets never block; shared stores do network I/O
+            if isinstance(get_bucket_store(), LocalBucketStore):
+                allowed = throttle.allow_request(self.request, self)
+            else:
+                allowed = await sync_to_async(throttle.allow_request)(self.request, self)
+            if not allowed:
+                waits.append(throttle.wait())
+        if waits:
+            raise Throttled(max(waits))
+
+    def handle_exception(self, exc):
+        headers = {}
+        status_code = exc.status_code
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            # Same rule as APIView: 401 only when the first authenticator can
+            # send a WWW-Authenticate challenge, which SessionAuthentication cannot
+            if self.session_authentication:
+                status_code = status.HTTP_403_FORBIDDEN
+            else:
+                headers['WWW-Authenticate'] = self.token_authentication.authenticate_header(self.request)
+        elif isinstance(exc, Throttled) and exc.wait is not None:
+            headers['Retry-After'] = '%d' % exc.wait
+
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = self.render(data, status=status_code)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def render(self, data, status=status.HTTP_200_OK):
+        with timer('render'):
+            content = self.renderer.render(data)
+        return HttpResponse(content, status=status, content_type=self.renderer.media_type)
+
+
+# Async view to List all events
+class AsyncListEventView(EventListMixin, AsyncAPIView):
+    cache_name = 'list'
+
+    async def get(self, request):
+        request = self.request
+        try:
+            self.fields = self.get_fields(request)
+        except ValueError as exc:
+            return self.render({'Message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        events_cache = get_events_cache()
+        cache_params = self.get_cache_params(request)
+        cache_key = await _events_cache_call(events_cache.make_key, self.cache_name, cache_params)
+
+        entry = None
+        if not reads_pinned_to_primary():
+            entry = await _events_cache_call(events_cache.get, cache_key)
+        if entry is not None:
+            return self.page_response(request, entry, cache_status='HIT')
+
+        events = await self.aget_filtered_queryset()
+        paginator = self.pagination_class()
+
+        if 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            page_rows = paginator.get_page_queryset(events, request).values_list('id', 'updated_at')
+            rows = [row async for row in page_rows]
+            etag, last_modified = page_validators(cache_params, rows[:paginator.page_size], len(rows) > paginator.page_size)
+            not_modified = conditional_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+        page = await paginator.apaginate_queryset(self.as_rows(events), request, view=self)
+
+        if page or paginator.cursor is not None:
+            tag_names = None
+            if self.fields is None or 'tags' in self.fields:
+                tag_names = await sync_to_async(tag_names_for)([event.id for event in page])
+            serializer = self.serializer_class(page, tag_names=tag_names, fields=self.fields)
+            etag, last_modified = page_validators(
+                cache_params,
+                [(event.id, event.updated_at) for event in page],
+                paginator.has_more,
+            )
+            with timer('serialize'):
+                data = serializer.data
+            entry = {
+                'data': paginator.get_paginated_data(data),
+                'etag': etag,
+                'last_modified': last_modified,
+            }
+            timeout = replica_cache_timeout(self.get_cache_timeout(page))
+            await _events_cache_call(events_cache.set, cache_key, entry, timeout=timeout)
+            return self.page_response(request, entry, cache_status='MISS')
+
+        return self.render({'Message': 'No event records available'}, status=status.HTTP_404_NOT_FOUND)
+
+    async def aget_filtered_queryset(self):
+        queryset = self.get_queryset()
+        if not self.request.query_params.getlist('tags'):
+            return queryset
+        # tagged_with() looks up the event content type, a query while
+        # ContentType's cache is cold
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    def page_response(self, request, entry, cache_status):
+        not_modified = conditional_response(request, entry['etag'], entry['last_modified'])
+        response = not_modified or self.render(entry['data'])
+        set_validators(response, entry['etag'], entry['last_modified'])
+        response['X-Cache'] = cache_status
+        return response
+
+
+# Async view to List all upcoming events
+class AsyncListEventUpcomingView(UpcomingEventListMixin, AsyncListEventView):
+    async def aget_filtered_queryset(self):
+        # Reading the rollover boundary may run a rollover
+        return await sync_to_async(lambda: self.filter_queryset(self.get_queryset()))()
+
+
+# Async view to Retrieve a specific event
+class AsyncRetrieveEventView(AsyncAPIView):
+    session_authentication = False
+
+    async def get(self, request, pk):
+        try:
+            fields = EventValuesSerializer.parse_fields(self.request.query_params.get('fields'))
+        except ValueError as exc:
+            return self.render({'Message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if fields is None:
+            queryset = Event.objects.with_related()
+        else:
+            queryset = Event.objects.only(*EventValuesSerializer.columns_for(fields))
+        try:
+            event = await queryset.aget(pk=pk)
+        except Event.DoesNotExist:
+            raise NotFound({'Message': 'No event record available'})
+
+        etag, last_modified = event_validators(event)
+        if fields is not None:
+            etag = make_etag(etag, fields)
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        if fields is None:
+            with timer('serialize'):
+                data = EventSerializer(event).data
+        else:
+            tag_names = None
+            if 'tags' in fields:
+                tag_names = await sync_to_async(tag_names_for)([event.pk])
+            with timer('serialize'):
+                data = EventValuesSerializer([event], tag_names=tag_names, fields=fields).data[0]
+        return set_validators(self.render(data), etag, last_modified)
+
+
+# Async view to stream event changes as Server-Sent Events
+class EventChangeStreamView(AsyncAPIView):
+    session_authentication = False
+
+    async def get(self, request):
+        # Reconnecting EventSource clients resume from the last id they got
+        since = request.headers.get('Last-Event-ID') or self.request.query_params.get('since', 0)
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if since < 0:
+            return self.render({'Message': "'since' must be a change sequence number (0 or more)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(broadcaster.stream(since), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Don't let nginx buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
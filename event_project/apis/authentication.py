@@ -0,0 +1,208 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.signals import setting_changed
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from .cache import LRUCache
+from .metrics import timer
+
+
+class CachedToken:
+    """The fields of a token and its user, to build fresh instances from."""
+    __slots__ = ('user_class', 'user_fields', 'token_class', 'token_created', 'db', 'loaded_at')
+
+    def __init__(self, user, token, loaded_at):
+        self.user_class = type(user)
+        self.user_fields = {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields}
+        self.token_class = type(token)
+        self.token_created = token.created
+        self.db = user._state.db
+        self.loaded_at = loaded_at
+
+    @property
+    def user_id(self):
+        return self.user_fields['id']
+
+    def build(self, key):
+        user = self.user_class(**self.user_fields)
+        token = self.token_class(key=key, user_id=user.pk, created=self.token_created)
+        for instance in (user, token):
+            instance._state.adding = False
+            instance._state.db = self.db
+        # Only once token has a database: relating unsaved instances asks the
+        # router for a write database, which would pin the request to the primary
+        token.user = user
+        return user, token
+
+
+def _stamp_key(user_id):
+    return f'apis-token-user:{user_id}'
+
+
+class TokenCache:
+    """
+    Recently authenticated token keys mapped to their token and user fields.
+
+    Every hit builds a new user, so concurrent requests never share one.
+    Entries are kept per process. Deleting a token or saving a user (e.g.
+    deactivating it) also stamps the user in the ``CACHE`` Django cache, and
+    each hit checks that stamp, so every worker drops entries loaded before
+    the change on their next use. ``CACHE`` has to be shared between the
+    workers (e.g. Redis) for logouts to apply in all of them; ``None`` only
+    evicts in the process that made the change.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60, cache='default'):
+        self.entries = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.cache_alias = cache
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stamps(self):
+        return caches[self.cache_alias] if self.cache_alias is not None else None
+
+    def never_blocks(self):
+        """Whether lookups stay in process, so async code can call them directly."""
+        return self.stamps is None or isinstance(self.stamps, LocMemCache)
+
+    def get(self, key):
+        """A fresh ``(user, token)`` for ``key``, or None."""
+        entry = self.entries.get(key)
+        if entry is not None and self.stamps is not None:
+            stamp = self.stamps.get(_stamp_key(entry.user_id))
+            if stamp is not None and stamp >= entry.loaded_at:
+                self.entries.delete(key)
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry.build(key) if entry is not None else None
+
+    def set(self, key, user, token, loaded_at):
+        """Cache ``key``; ``loaded_at`` is ``time.time()`` from before the pair was read."""
+        self.entries.set(key, CachedToken(user, token, loaded_at))
+
+    def evict_user(self, user_id):
+        self.entries.delete_matching(lambda key, entry: entry.user_id == user_id)
+        if self.stamps is not None:
+            # Older entries expire by themselves after the TTL
+            self.stamps.set(_stamp_key(user_id), time.time(), timeout=self.entries.ttl * 2)
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'entries': len(self.entries),
+            'max_entries': self.entries.max_entries,
+            'ttl': self.entries.ttl,
+            'cache': self.cache_alias,
+        }
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        config = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        _token_cache = TokenCache(
+            max_entries=config.get('MAX_ENTRIES', 10000),
+            ttl=config.get('TTL', 60),
+            cache=config.get('CACHE', 'default'),
+        )
+    return _token_cache
+
+
+def _reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == 'TOKEN_AUTH_CACHE':
+        _token_cache = None
+
+
+setting_changed.connect(_reset_token_cache)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token/user query for recently seen keys."""
+
+    def authenticate(self, request):
+        with timer('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token = cached
+            if not user.is_active:
+                raise AuthenticationFailed('User inactive or deleted.')
+            return user, token
+
+        loaded_at = time.time()
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token, loaded_at)
+        return user, token
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate()`` for plain Django async views."""
+        with timer('auth'):
+            return await self._aauthenticate(request)
+
+    async def _aauthenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise AuthenticationFailed('Invalid token header. No credentials provided.')
+        elif len(auth) > 2:
+            raise AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        # A shared stamp cache may do network I/O
+        if token_cache.never_blocks():
+            cached = token_cache.get(key)
+        else:
+            cached = await sync_to_async(token_cache.get)(key)
+        if cached is not None:
+            user, token = cached
+        else:
+            loaded_at = time.time()
+            try:
+                token = await self.get_model().objects.select_related('user').aget(key=key)
+            except self.get_model().DoesNotExist:
+                raise AuthenticationFailed('Invalid token.')
+            user = token.user
+            if user.is_active:
+                token_cache.set(key, user, token, loaded_at)
+
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return user, token
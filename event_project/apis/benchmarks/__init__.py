@@ -0,0 +1,154 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks never touch the configured database: they run inside a throwaway
+test database created with ``benchmark_database()`` and seed it with
+synthetic users and events. The events cache is off in there, so repeated
+requests measure the database and serialization work rather than cache hits.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils.timezone import now
+from taggit.models import Tag, TaggedItem
+
+from ..geo import geocode
+from ..models import Event
+from ..tagcounts import events_added
+from ..throttling import get_throttle_settings
+from ..upcoming import sync_upcoming
+
+User = get_user_model()
+
+TAG_POOL = [
+    'music', 'festival', 'tech', 'conference', 'art', 'exhibition', 'sports',
+    'food', 'workshop', 'networking', 'theatre', 'film', 'comedy', 'charity',
+    'family', 'outdoor', 'startup', 'health', 'education', 'gaming',
+]
+
+
+@contextmanager
+def benchmark_database():
+    # DEBUG off, as in production: no SQL log growing during a run
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        # Load generators would only measure 429s, and repeated requests cache
+        # hits (bench_throttle turns both back on)
+        with override_settings(
+            EVENTS_THROTTLE={**get_throttle_settings(), 'ENABLED': False},
+            EVENTS_CACHE={'BACKEND': 'apis.cache.LRUBackend', 'OPTIONS': {'max_entries': 0}},
+        ):
+            yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_users(count, prefix='benchuser'):
+    # Hash once and reuse: PBKDF2 per user would dominate seeding time.
+    password = make_password('benchmark-password')
+    User.objects.bulk_create(
+        [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password) for i in range(count)],
+        batch_size=1000,
+        ignore_conflicts=True,  # re-seeding an existing database
+    )
+    return list(User.objects.filter(username__startswith=prefix).order_by('id'))
+
+
+def seed_events(count, organizers, tags_per_event=3, past_fraction=0.2, batch_size=5000, seed=0):
+    """
+    Bulk insert ``count`` events spread over roughly two years around now.
+
+    Tag popularity follows a Zipf-like distribution over ``TAG_POOL`` so that
+    tag filters see realistic selectivity.
+    """
+    rng = random.Random(seed)
+    geo_rng = random.Random(seed + 1)
+    start = now() - timedelta(days=int(730 * past_fraction))
+    weights = [1 / (rank + 1) for rank in range(len(TAG_POOL))]
+
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=TAG_POOL)}
+    missing = [Tag(name=name, slug=name) for name in TAG_POOL if name not in tags]
+    Tag.objects.bulk_create(missing)
+    tags = {tag.name: tag.id for tag in Tag.objects.filter(name__in=TAG_POOL)}
+    content_type = ContentType.objects.get_for_model(Event)
+
+    first_index = Event.objects.count()
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        events = []
+        for offset in range(size):
+            index = first_index + created + offset
+            events.append(Event(
+                title=f'Benchmark event {index}',
+                description=f'Synthetic event number {index} used for benchmarking.',
+                date=start + timedelta(minutes=rng.randrange(0, 730 * 24 * 60)),
+                location=rng.choice(['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret']),
+                ticket_price=round(rng.uniform(0, 5000), 2),
+                organizer=rng.choice(organizers),
+            ))
+        for event in events:
+            # Spread venues over ~30km around their city; a separate RNG keeps
+            # the rest of the seeded data unchanged
+            latitude, longitude = geocode(event.location)
+            event.latitude = round(latitude + geo_rng.uniform(-0.25, 0.25), 6)
+            event.longitude = round(longitude + geo_rng.uniform(-0.25, 0.25), 6)
+            event.locate()
+        Event.objects.bulk_create(events)
+        sync_upcoming(events)
+
+        if tags_per_event:
+            tagged_items = []
+            for event in events:
+                for name in set(rng.choices(TAG_POOL, weights=weights, k=tags_per_event)):
+                    tagged_items.append(TaggedItem(tag_id=tags[name], content_type=content_type, object_id=event.id))
+            TaggedItem.objects.bulk_create(tagged_items, batch_size=batch_size)
+            events_added([event.id for event in events])
+
+        created += size
+    return created
+
+
+def measure(func, repeat=20, warmup=2):
+    """Call ``func`` repeatedly and return latency statistics in milliseconds."""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'p50_ms': round(percentile(ordered, 50), 3),
+        'p95_ms': round(percentile(ordered, 95), 3),
+        'p99_ms': round(percentile(ordered, 99), 3),
+        'max_ms': round(ordered[-1], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
@@ -0,0 +1,242 @@
+"""
+Request mixes for ``replay_requests``.
+
+A mix is a list of request templates, read either from a JSONL file (one
+object per line) or from a REST Client ``.http`` file such as the repo's
+``sample.http``. JSONL templates look like::
+
+    {"name": "list", "method": "GET", "path": "/api/events/list-events/",
+     "params": {"tags": "music"}, "weight": 10}
+
+Strings in ``path``, ``params`` and ``body`` may use these placeholders,
+filled in for every request:
+
+* ``{event_id}``: a random existing event id
+* ``{n}``: a number unique to the request (e.g. for unique titles)
+* ``{future_date}``: an ISO datetime between one day and one year ahead
+"""
+import json
+import random
+import re
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import Request, urlopen
+
+from django.db import connection
+from django.test import Client
+from django.utils.timezone import now
+
+from . import percentile
+
+DEFAULT_MIX = Path(__file__).with_name('request_mix.jsonl')
+
+# Requests that would invalidate the credentials of the rest of the replay
+SKIPPED_PATHS = ('/api/users/logout/',)
+
+# Fixed-id deletes from a .http file would destroy data on a live server
+SKIPPED_METHODS = ('DELETE',)
+
+REQUEST_LINE = re.compile(r'^(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+(\S+)')
+HEADER_LINE = re.compile(r'^[\w-]+\s*:')
+
+
+def load_mix(path):
+    path = Path(path)
+    if path.suffix == '.http':
+        return parse_http_file(path)
+
+    templates = []
+    for line in path.read_text().splitlines():
+        if not line.strip() or line.lstrip().startswith('//'):
+            continue
+        template = json.loads(line)
+        template.setdefault('name', f"{template['method']} {template['path']}")
+        template.setdefault('weight', 1)
+        templates.append(template)
+    return templates
+
+
+def parse_http_file(path):
+    """
+    Read the requests of a REST Client file. Blocks are separated by lines of
+    ``#``; a block's body must be JSON (templates with placeholder prose, like
+    most bodies in sample.http, are skipped), and logout and DELETE requests
+    are left out.
+    """
+    templates = []
+    for block in re.split(r'^#{3,}\s*$', Path(path).read_text(), flags=re.MULTILINE):
+        lines = [line for line in block.splitlines() if not line.lstrip().startswith('#')]
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        if not lines or not (match := REQUEST_LINE.match(lines[0].strip())):
+            continue
+
+        method, url = match.groups()
+        split = urlsplit(url)
+        # Headers are replaced by the replay's own auth and content type
+        index = 1
+        while index < len(lines) and HEADER_LINE.match(lines[index].strip()):
+            index += 1
+        body = '\n'.join(lines[index:]).strip()
+
+        template = {'name': f'{method} {split.path}', 'method': method, 'path': split.path, 'weight': 1}
+        if split.query:
+            template['query'] = split.query
+        if body:
+            try:
+                template['body'] = json.loads(body)
+            except ValueError:
+                continue
+        if split.path in SKIPPED_PATHS or method in SKIPPED_METHODS:
+            continue
+        templates.append(template)
+    return templates
+
+
+def render(value, context):
+    if isinstance(value, str):
+        return value.format_map(context) if '{' in value else value
+    if isinstance(value, list):
+        return [render(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: render(item, context) for key, item in value.items()}
+    return value
+
+
+class RequestRenderer:
+    """Turns templates into concrete requests with fresh placeholder values."""
+
+    def __init__(self, event_ids, seed=0):
+        self.event_ids = event_ids
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.run_id = f'{time.time_ns():x}'
+
+    def __call__(self, template):
+        self.counter += 1
+        context = {
+            'event_id': self.rng.choice(self.event_ids) if self.event_ids else 0,
+            'n': f'{self.run_id}-{self.counter}',
+            'future_date': (now() + timedelta(minutes=self.rng.randrange(24 * 60, 365 * 24 * 60))).isoformat(),
+        }
+        path = render(template['path'], context)
+        params = render(template.get('params', {}), context)
+        query = urlencode(params, doseq=True) if params else render(template.get('query', ''), context)
+        return {
+            'name': template['name'],
+            'method': template['method'].upper(),
+            'path': path,
+            'query': query,
+            'body': render(template['body'], context) if 'body' in template else None,
+        }
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` callable that counts executed statements."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class InProcessTarget:
+    """Calls the app through Django's test client and counts SQL per request."""
+
+    def __init__(self, token):
+        self.client = Client(headers={'Authorization': f'Token {token}'})
+
+    def send(self, request):
+        counter = QueryCounter()
+        path = f"{request['path']}?{request['query']}" if request['query'] else request['path']
+        kwargs = {}
+        if request['body'] is not None:
+            kwargs = {'data': json.dumps(request['body']), 'content_type': 'application/json'}
+        with connection.execute_wrapper(counter):
+            response = self.client.generic(request['method'], path, **kwargs)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        return response.status_code, counter.count
+
+
+class HTTPTarget:
+    """Sends requests to a running server; SQL counts are not visible from here."""
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+
+    def send(self, request):
+        url = self.base_url + request['path'] + (f"?{request['query']}" if request['query'] else '')
+        data = None if request['body'] is None else json.dumps(request['body']).encode('utf-8')
+        http_request = Request(url, data=data, method=request['method'], headers={
+            'Authorization': f'Token {self.token}',
+            'Content-Type': 'application/json',
+        })
+        try:
+            with urlopen(http_request) as response:
+                response.read()
+                return response.status, None
+        except HTTPError as error:
+            return error.code, None
+
+
+def replay(target, requests, concurrency=1):
+    """
+    Send ``requests`` through ``target`` and return per-endpoint statistics.
+    Query counts are only exact with ``concurrency=1`` in process.
+    """
+    samples = {}
+    lock = threading.Lock()
+    pending = iter(requests)
+
+    def worker():
+        while True:
+            with lock:
+                request = next(pending, None)
+            if request is None:
+                return
+            started = time.perf_counter()
+            status_code, queries = target.send(request)
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.setdefault(request['name'], []).append((elapsed, status_code, queries))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {name: endpoint_stats(rows, elapsed) for name, rows in sorted(samples.items())}
+    overall = endpoint_stats([row for rows in samples.values() for row in rows], elapsed)
+    return {'seconds': round(elapsed, 3), 'overall': overall, 'endpoints': endpoints}
+
+
+def endpoint_stats(rows, elapsed):
+    latencies = sorted(row[0] * 1000 for row in rows)
+    statuses = {}
+    for _, status_code, _ in rows:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    queries = [row[2] for row in rows if row[2] is not None]
+    return {
+        'requests': len(rows),
+        'rps': round(len(rows) / elapsed, 1) if elapsed else None,
+        'errors': sum(1 for _, status_code, _ in rows if status_code >= 500),
+        'statuses': statuses,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p90_ms': round(percentile(latencies, 90), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
@@ -0,0 +1,86 @@
+"""
+Set-based creation of many events at once.
+
+Events, tags and tag links are each written with ``bulk_create``, so the
+number of queries depends on the number of insert batches, not on the number
+of events or tags.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from taggit.models import Tag, TaggedItem
+
+from .models import Event
+from .signals import events_bulk_created
+
+
+def bulk_create_events(items, organizer, batch_size=None):
+    """
+    Create one event per validated item (serializer ``validated_data``
+    dicts, with an optional ``tags`` list) and return the saved events.
+    """
+    tag_lists = []
+    events = []
+    for item in items:
+        item = dict(item)
+        tag_lists.append(item.pop('tags', []) or [])
+        event = Event(organizer=organizer, **item)
+        event.locate()
+        events.append(event)
+
+    with transaction.atomic():
+        Event.objects.bulk_create(events, batch_size=batch_size)
+
+        names = {name for tags in tag_lists for name in tags}
+        if names:
+            tags = get_or_create_tags(names)
+            content_type = ContentType.objects.get_for_model(Event)
+            tagged_items = [
+                TaggedItem(tag_id=tags[name], content_type=content_type, object_id=event.pk)
+                for event, tag_names in zip(events, tag_lists)
+                for name in dict.fromkeys(tag_names)
+            ]
+            TaggedItem.objects.bulk_create(tagged_items, batch_size=batch_size)
+
+    # bulk_create() sends no post_save signals
+    events_bulk_created.send(sender=Event, events=events)
+    return events
+
+
+def get_or_create_tags(names):
+    """Return a ``{name: tag id}`` mapping, creating the missing tags in bulk."""
+    tags = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in tags]
+    if not missing:
+        return tags
+
+    taken_slugs = set(Tag.objects.filter(slug__in=[Tag().slugify(name) for name in missing]).values_list('slug', flat=True))
+    new_tags = []
+    for name in missing:
+        slug = unique_slug(name, taken_slugs)
+        taken_slugs.add(slug)
+        new_tags.append(Tag(name=name, slug=slug))
+
+    # Another request may have created some of these tags in the meantime
+    Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+    tags.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    for name in missing:
+        if name not in tags:
+            # Lost a slug race: fall back to taggit's own slug resolution
+            tag, created = Tag.objects.get_or_create(name=name)
+            tags[name] = tag.id
+    return tags
+
+
+def unique_slug(name, taken_slugs):
+    tag = Tag()
+    slug = tag.slugify(name)
+    if slug not in taken_slugs:
+        return slug
+
+    # Same scheme as Tag.save(): append _1, _2, ... to a colliding slug
+    taken_slugs.update(Tag.objects.filter(slug__startswith=slug).values_list('slug', flat=True))
+    i = 1
+    while tag.slugify(name, i) in taken_slugs:
+        i += 1
+    return tag.slugify(name, i)
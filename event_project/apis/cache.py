@@ -0,0 +1,219 @@
+"""
+Server-side cache for the serialized event list payloads.
+
+Entries are keyed by the events version, the endpoint and the normalized
+query. Any write to an event or its tags bumps the version (see signals.py),
+which makes every cached page unreachable at once instead of having to find
+and delete individual keys.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+VERSION_KEY = 'events:version'
+
+
+class LRUCache:
+    """A thread-safe, size-bounded LRU mapping with optional per-entry expiry."""
+
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.ttl if timeout is None else timeout
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_matching(self, predicate):
+        with self._lock:
+            for key in [key for key, (_, value) in self._data.items() if predicate(key, value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LRUBackend:
+    """
+    In-process backend. Each worker process keeps its own entries and version,
+    so a write only invalidates the pages of the worker that made it; the
+    others serve their older pages until ``timeout`` seconds have passed. Use
+    ``DjangoCacheBackend`` on a shared cache when running more than one worker.
+    """
+
+    def __init__(self, max_entries=1024, timeout=60):
+        self.entries = LRUCache(max_entries=max_entries, ttl=timeout)
+        self.timeout = timeout
+        self._version = 1
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, timeout=None):
+        # Longer timeouts (upcoming pages) would outlast other workers' writes
+        if timeout is not None and self.timeout is not None:
+            timeout = min(timeout, self.timeout)
+        self.entries.set(key, value, timeout=timeout)
+
+    def get_version(self):
+        return self._version
+
+    def incr_version(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def clear(self):
+        self.entries.clear()
+
+    def size(self):
+        return len(self.entries)
+
+
+class DjangoCacheBackend:
+    """
+    Backend on top of a Django cache alias, e.g. one configured with
+    ``django.core.cache.backends.redis.RedisCache`` against a local Redis or a
+    Redis-compatible server. The version counter lives in the shared cache, so
+    a write in one worker invalidates the pages cached by every worker.
+    """
+
+    def __init__(self, alias='default', timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(key, value, self.timeout if timeout is None else timeout)
+
+    def get_version(self):
+        version = self.cache.get(VERSION_KEY)
+        if version is None:
+            self.cache.add(VERSION_KEY, 1, timeout=None)
+            version = self.cache.get(VERSION_KEY, 1)
+        return version
+
+    def incr_version(self):
+        try:
+            return self.cache.incr(VERSION_KEY)
+        except ValueError:
+            # The counter was evicted or never set
+            self.cache.add(VERSION_KEY, 1, timeout=None)
+            return self.cache.incr(VERSION_KEY)
+
+    def clear(self):
+        self.incr_version()
+
+    def size(self):
+        return None
+
+
+class EventListCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, endpoint, params):
+        normalized = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        return f'events:{self.backend.get_version()}:{endpoint}:{digest}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, timeout=None):
+        self.backend.set(key, value, timeout=timeout)
+
+    def bump_version(self):
+        return self.backend.incr_version()
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': f'{type(self.backend).__module__}.{type(self.backend).__name__}',
+            'version': self.backend.get_version(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'entries': self.backend.size(),
+        }
+
+
+_events_cache = None
+
+
+def get_events_cache():
+    global _events_cache
+    if _events_cache is None:
+        config = getattr(settings, 'EVENTS_CACHE', {})
+        backend_class = import_string(config.get('BACKEND', 'apis.cache.LRUBackend'))
+        _events_cache = EventListCache(backend_class(**config.get('OPTIONS', {})))
+    return _events_cache
+
+
+def bump_events_version():
+    get_events_cache().bump_version()
+
+
+def _reset_events_cache(setting, **kwargs):
+    global _events_cache
+    if setting == 'EVENTS_CACHE':
+        _events_cache = None
+
+
+setting_changed.connect(_reset_events_cache)
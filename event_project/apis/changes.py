@@ -0,0 +1,240 @@
+"""
+Event change feed: the ``EventChange`` log, events/changes/ and its SSE stream.
+
+Every event create, update (including tag changes) and delete appends a row
+to ``EventChange`` (see signals.py). Its ``seq`` only grows, so a client that
+remembers the last ``seq`` it saw asks for what happened since, and gets the
+current representation of each changed event instead of the whole catalog.
+SQLite serializes writers, so rows commit in ``seq`` order and a reader never
+sees a later ``seq`` before an earlier one.
+
+Live clients subscribe to the Server-Sent Events stream instead of polling.
+``ChangeBroadcaster`` keeps one fetcher task per event loop: after each
+commit that logged changes it is woken up, reads the new rows once, encodes
+each change once and hands the same bytes to every subscriber's queue. The
+wakeup only comes from commits in this process, so it also polls the log
+every ``HEARTBEAT_SECONDS``: writes from other workers reach the streams
+within a heartbeat. A
+subscriber that falls ``QUEUE_SIZE`` messages behind is disconnected; it
+reconnects with ``Last-Event-ID`` and catches up from the log.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import Event, EventChange
+from .serializers import EventValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def get_changes_settings():
+    return {
+        'PAGE_SIZE': 500,
+        'MAX_PAGE_SIZE': 5000,
+        'HEARTBEAT_SECONDS': 15,
+        'QUEUE_SIZE': 1000,
+        **getattr(settings, 'EVENTS_CHANGES', {}),
+    }
+
+
+def record(event_ids, action):
+    """Log ``action`` for ``event_ids`` and wake the live streams once it commits."""
+    if not event_ids:
+        return
+    EventChange.objects.bulk_create([EventChange(event_id=pk, action=action) for pk in event_ids])
+    transaction.on_commit(broadcaster.notify)
+
+
+def latest_seq():
+    return EventChange.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+def changes_since(since, limit, collapse=True, until=None):
+    """
+    Up to ``limit`` log rows after ``since`` (and up to ``until``) with the
+    current representation of their events, ``None`` for deleted ones. With
+    ``collapse`` only the last change of each event is kept.
+    """
+    rows = EventChange.objects.filter(seq__gt=since).order_by('seq')
+    if until is not None:
+        rows = rows.filter(seq__lte=until)
+    rows = list(rows.values_list('seq', 'event_id', 'action')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_seq = rows[-1][0] if rows else since
+
+    if collapse:
+        # Keep each event's last change, in log order
+        last = {event_id: (seq, event_id, action) for seq, event_id, action in rows}
+        rows = sorted(last.values())
+
+    live_ids = {event_id for _, event_id, action in rows if action != EventChange.DELETED}
+    events = {}
+    if live_ids:
+        event_rows = Event.objects.filter(pk__in=live_ids).values_list(*EventValuesSerializer.value_fields, named=True)
+        events = {event['id']: event for event in EventValuesSerializer(list(event_rows)).data}
+
+    changes = []
+    for seq, event_id, action in rows:
+        event = events.get(event_id)
+        changes.append({
+            'seq': seq,
+            # Deleted since, even if this change says otherwise
+            'action': action if event is not None else EventChange.DELETED,
+            'id': event_id,
+            'event': event,
+        })
+    return {'changes': changes, 'next': next_seq, 'has_more': has_more}
+
+
+def encode_message(change):
+    data = json.dumps(change, separators=(',', ':'), ensure_ascii=False)
+    return f"id: {change['seq']}\nevent: change\ndata: {data}\n\n".encode('utf-8')
+
+
+class Subscriber:
+    __slots__ = ('queue', 'dropped')
+
+    def __init__(self, size):
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = False
+
+    def put(self, message):
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow: it catches up from the log after reconnecting
+            self.close()
+
+    def close(self):
+        # Make room for the end-of-stream marker
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Fanout:
+    """The subscribers of one event loop and the task feeding them."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = set()
+        self.wake = asyncio.Event()
+        self.ready = asyncio.Event()
+        self.last_seq = None
+        self.failed = False
+        self.task = loop.create_task(self.run())
+
+    async def run(self):
+        try:
+            self.last_seq = await sync_to_async(latest_seq)()
+            self.ready.set()
+            config = get_changes_settings()
+            page_size = config['PAGE_SIZE']
+            while True:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), config['HEARTBEAT_SECONDS'])
+                except asyncio.TimeoutError:
+                    # Poll for changes committed by other processes
+                    pass
+                self.wake.clear()
+                has_more = True
+                while has_more:
+                    page = await sync_to_async(changes_since)(self.last_seq, page_size, collapse=False)
+                    messages = [(change['seq'], encode_message(change)) for change in page['changes']]
+                    self.last_seq, has_more = page['next'], page['has_more']
+                    for subscriber in list(self.subscribers):
+                        for message in messages:
+                            subscriber.put(message)
+        except Exception:
+            # End the streams; clients reconnect to a new fetcher
+            logger.exception('Event change fanout failed')
+            self.failed = True
+            self.ready.set()
+            for subscriber in list(self.subscribers):
+                subscriber.close()
+
+
+class ChangeBroadcaster:
+    def __init__(self):
+        self._fanouts = {}
+        self._lock = threading.Lock()
+
+    def notify(self):
+        """Wake the fetchers; safe to call from any thread."""
+        with self._lock:
+            fanouts = list(self._fanouts.values())
+        for fanout in fanouts:
+            try:
+                fanout.loop.call_soon_threadsafe(fanout.wake.set)
+            except RuntimeError:
+                # Its loop was closed with streams still open
+                with self._lock:
+                    if self._fanouts.get(fanout.loop) is fanout:
+                        del self._fanouts[fanout.loop]
+
+    def _fanout(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            fanout = self._fanouts.get(loop)
+            if fanout is None or fanout.task.done():
+                fanout = self._fanouts[loop] = Fanout(loop)
+            return fanout
+
+    def _unsubscribe(self, fanout, subscriber):
+        fanout.subscribers.discard(subscriber)
+        if not fanout.subscribers:
+            with self._lock:
+                if self._fanouts.get(fanout.loop) is fanout:
+                    del self._fanouts[fanout.loop]
+            fanout.task.cancel()
+
+    async def stream(self, since):
+        """SSE messages for the changes after ``since``: the backlog from the log, then live ones."""
+        config = get_changes_settings()
+        fanout = self._fanout()
+        await fanout.ready.wait()
+        if fanout.failed:
+            return
+        subscriber = Subscriber(config['QUEUE_SIZE'])
+        # No await in between: changes up to the snapshot come from the log,
+        # later ones through the queue
+        fanout.subscribers.add(subscriber)
+        snapshot = fanout.last_seq
+        try:
+            yield b'retry: 3000\n\n'
+            while since < snapshot:
+                page = await sync_to_async(changes_since)(since, config['PAGE_SIZE'], collapse=False, until=snapshot)
+                for change in page['changes']:
+                    yield encode_message(change)
+                if not page['has_more']:
+                    break
+                since = page['next']
+            since = max(since, snapshot)
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), config['HEARTBEAT_SECONDS'])
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+                    continue
+                if message is None:
+                    return
+                seq, data = message
+                if seq > since:
+                    since = seq
+                    yield data
+        finally:
+            self._unsubscribe(fanout, subscriber)
+
+
+broadcaster = ChangeBroadcaster()
@@ -0,0 +1,178 @@
+"""
+Response compression negotiated through ``Accept-Encoding``.
+
+``CompressionMiddleware`` encodes response bodies with brotli (when the
+optional ``brotli`` package is installed) or gzip, in the server's order of
+preference among the codings the client accepts. Bodies smaller than
+``settings.EVENTS_COMPRESSION['MIN_SIZE']`` are sent as they are: their
+framing would eat most of the saving. Streaming responses (the exports) are
+compressed chunk by chunk.
+
+Only the API's own formats (``CONTENT_TYPES``) are compressed. HTML pages,
+such as the admin's, carry CSRF tokens next to text an attacker may inject,
+and compressing them would open them to BREACH; Django's ``GZipMiddleware``
+pads those, this middleware leaves them alone.
+
+Each coding is its own representation with its own strong ETag: ``"<tag>"``
+becomes ``"<tag>-gzip"`` or ``"<tag>-br"``. The suffix is stripped from
+``If-Match`` and ``If-None-Match`` before the view compares them, so a
+client can send back the ETag of the compressed body it got, e.g. to update
+an event.
+"""
+import functools
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from .metrics import timer
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def get_compression_settings():
+    return {
+        'ENABLED': True,
+        'ENCODINGS': ['br', 'gzip'],
+        'MIN_SIZE': 1024,
+        'GZIP_LEVEL': 6,
+        'BROTLI_QUALITY': 5,
+        'CONTENT_TYPES': ['application/json', 'application/msgpack', 'application/x-ndjson', 'text/csv'],
+        **getattr(settings, 'EVENTS_COMPRESSION', {}),
+    }
+
+
+def available_encodings(config):
+    return tuple(encoding for encoding in config['ENCODINGS'] if encoding == 'gzip' or (encoding == 'br' and brotli is not None))
+
+
+@functools.lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding, encodings):
+    """The first of ``encodings`` the ``Accept-Encoding`` header allows with the highest q, or None."""
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        coding = coding.strip().lower()
+        if coding:
+            qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+ETAG_SUFFIX = re.compile(r'-(?:gzip|br)"')
+
+
+def encoded_etag(etag, encoding):
+    """The ETag of the ``encoding`` coding of the representation tagged ``etag``."""
+    return etag[:-1] + f'-{encoding}"' if etag.endswith('"') else etag
+
+
+def strip_etag_suffixes(header):
+    """``If-Match``/``If-None-Match`` value with the coding suffixes removed."""
+    return ETAG_SUFFIX.sub('"', header)
+
+
+def compress(content, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(content, quality=config['BROTLI_QUALITY'])
+    # mtime=0: the same body always compresses to the same bytes
+    return gzip.compress(content, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+def compress_stream(chunks, encoding, config):
+    if encoding == 'gzip':
+        yield from compress_sequence(chunks)
+        return
+    compressor = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress response bodies; see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        return self.process_response(request, await self.get_response(request))
+
+    def process_request(self, request):
+        # The If-None-Match the client sent, to answer a 304 with the ETag it has
+        request.etag_if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        for header in ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH'):
+            if header in request.META:
+                request.META[header] = strip_etag_suffixes(request.META[header])
+
+    def process_response(self, request, response):
+        config = get_compression_settings()
+        if not config['ENABLED'] or response.has_header('Content-Encoding'):
+            return response
+        if response.status_code == 304:
+            if response.has_header('ETag'):
+                for encoding in available_encodings(config):
+                    etag = encoded_etag(response['ETag'], encoding)
+                    if etag in getattr(request, 'etag_if_none_match', ''):
+                        response.headers['ETag'] = etag
+                        break
+            return response
+        content_type = response.get('Content-Type', '').partition(';')[0].strip().lower()
+        if content_type not in config['CONTENT_TYPES']:
+            return response
+        if response.streaming:
+            if response.is_async:
+                return response
+        elif len(response.content) < config['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available_encodings(config))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding, config)
+            del response.headers['Content-Length']
+        else:
+            with timer('compress'):
+                content = compress(response.content, encoding, config)
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        response.headers['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response.headers['ETag'] = encoded_etag(response['ETag'], encoding)
+        return response
@@ -0,0 +1,58 @@
+"""
+ETag / Last-Modified helpers for the event endpoints.
+
+Validators are derived from ``Event.updated_at`` (and, for list pages, the ids
+on the page), so they can be checked before anything is serialized.
+"""
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return '"%s"' % hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def event_validators(event):
+    return make_etag('event', event.pk, event.updated_at.isoformat()), event.updated_at
+
+
+def page_validators(params, rows, has_more):
+    """
+    Validators of one list page from its ``(id, updated_at)`` rows. The rows,
+    the query parameters and whether a next page exists fully determine the
+    response envelope.
+    """
+    rows = sorted(rows)
+    etag = make_etag('page', params, [(pk, updated_at.isoformat()) for pk, updated_at in rows], has_more)
+    last_modified = max((updated_at for _, updated_at in rows), default=None)
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_response(request, etag, last_modified=None):
+    """
+    Return a 304 (GET/HEAD) or 412 (other methods) response when the request's
+    If-None-Match / If-Match / If-Modified-Since / If-Unmodified-Since headers
+    call for it, otherwise None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def if_match_given(request):
+    """Whether the request makes its write depend on a specific version."""
+    value = request.META.get('HTTP_IF_MATCH', '').strip()
+    return bool(value) and value != '*'
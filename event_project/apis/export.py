@@ -0,0 +1,54 @@
+"""
+Streaming export of the event catalog as NDJSON or CSV.
+
+Events are read in keyset chunks ordered by id and their tags are fetched
+once per chunk, so memory use depends on the chunk size, not on the number
+of exported events.
+"""
+import csv
+import json
+
+from .serializers import EventValuesSerializer
+
+EXPORT_FIELDS = ['id', 'title', 'description', 'date', 'location', 'latitude', 'longitude', 'ticket_price', 'tags', 'organizer']
+
+
+def iter_event_chunks(queryset, chunk_size=2000):
+    last_id = None
+    while True:
+        chunk = queryset.order_by('id')
+        if last_id is not None:
+            chunk = chunk.filter(id__gt=last_id)
+        rows = list(chunk.values_list(*EventValuesSerializer.value_fields, named=True)[:chunk_size])
+        if not rows:
+            return
+
+        yield EventValuesSerializer(rows).data
+        last_id = rows[-1].id
+
+
+def iter_ndjson(queryset, chunk_size=2000):
+    for chunk in iter_event_chunks(queryset, chunk_size):
+        yield ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in chunk)
+
+
+class _Echo:
+    # csv.writer only needs an object with write(); hand each line back
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=2000):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for chunk in iter_event_chunks(queryset, chunk_size):
+        yield ''.join(
+            writer.writerow([','.join(event['tags']) if field == 'tags' else event[field] for field in EXPORT_FIELDS])
+            for event in chunk
+        )
+
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'events.ndjson'),
+    'csv': (iter_csv, 'text/csv', 'events.csv'),
+}
@@ -0,0 +1,136 @@
+"""
+Geohash proximity search for events/nearby/, and an offline geocoder.
+
+Events with coordinates store their geohash in an indexed column. A geohash
+names a lat/lon cell, and every cell inside it shares its prefix, so "events
+in this cell" is an index range scan. A search around a point covers the
+circle's bounding box with a few cells of the finest precision that keeps
+their number small, then measures the exact great-circle distance of the
+candidates in Python.
+
+``geocode()`` stands in for a geocoding service: it looks place names up in a
+small built-in gazetteer, so it works offline and is deterministic.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 9  # cells of about 5m
+# Most index ranges scanned by one proximity search
+MAX_CELLS = 16
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Upper bound for the last character of a geohash prefix range ('z' + 1)
+RANGE_END = '{'
+
+GAZETTEER = {
+    'nairobi': (-1.286389, 36.817223),
+    'mombasa': (-4.043477, 39.668206),
+    'kisumu': (-0.091702, 34.767956),
+    'nakuru': (-0.303099, 36.080026),
+    'eldoret': (0.514277, 35.269779),
+    'thika': (-1.033333, 37.069328),
+    'malindi': (-3.219186, 40.116890),
+    'naivasha': (-0.716667, 36.433334),
+    'kampala': (0.347596, 32.582520),
+    'dar es salaam': (-6.792354, 39.208328),
+    'kigali': (-1.944072, 30.061885),
+    'addis ababa': (8.980603, 38.757759),
+    'lagos': (6.524379, 3.379206),
+    'cairo': (30.044420, 31.235712),
+    'johannesburg': (-26.204103, 28.047305),
+    'london': (51.507351, -0.127758),
+    'new york': (40.712776, -74.005974),
+    'san francisco': (37.774929, -122.419416),
+    'tokyo': (35.689487, 139.691711),
+    'sydney': (-33.868820, 151.209290),
+}
+
+
+def geocode(place):
+    """
+    ``(latitude, longitude)`` of the first gazetteer place named in ``place``
+    (e.g. "KICC, Nairobi"), or None.
+    """
+    text = ' '.join(place.lower().replace(',', ' ').split())
+    if text in GAZETTEER:
+        return GAZETTEER[text]
+    for name, point in GAZETTEER.items():
+        if f' {name} ' in f' {text} ':
+            return point
+    return None
+
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Height and width of a cell at ``precision``, in degrees of latitude and longitude."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    ``(min_lat, max_lat, min_lon, max_lon)`` around the circle, or None when
+    it reaches a pole or crosses the antimeridian.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    if abs(latitude) + lat_delta >= 90:
+        return None
+    lon_delta = lat_delta / math.cos(math.radians(abs(latitude) + lat_delta))
+    if abs(longitude) + lon_delta >= 180:
+        return None
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+
+
+def covering_prefixes(latitude, longitude, radius_km, max_cells=MAX_CELLS):
+    """
+    Geohash prefixes of the cells covering the circle's bounding box, at the
+    finest precision that needs at most ``max_cells`` of them. None when only
+    a full scan is sure to cover it (near a pole or the antimeridian).
+    """
+    box = bounding_box(latitude, longitude, radius_km)
+    if box is None:
+        return None
+    min_lat, max_lat, min_lon, max_lon = box
+
+    cells = None
+    for precision in range(1, MAX_PRECISION + 1):
+        cell_height, cell_width = cell_size(precision)
+        rows = range(int((min_lat + 90) // cell_height), int((max_lat + 90) // cell_height) + 1)
+        columns = range(int((min_lon + 180) // cell_width), int((max_lon + 180) // cell_width) + 1)
+        if len(rows) * len(columns) > max_cells:
+            break
+        # Encode each cell by its center
+        cells = sorted(
+            encode(-90 + (row + 0.5) * cell_height, -180 + (column + 0.5) * cell_width, precision)
+            for row in rows for column in columns
+        )
+    return cells
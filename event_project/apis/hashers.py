@@ -0,0 +1,139 @@
+"""
+PBKDF2 password hashing with a configurable cost, run in a process pool.
+
+``PooledPBKDF2PasswordHasher`` writes and reads the same ``pbkdf2_sha256``
+hashes as Django's default hasher, with two differences:
+
+* the iteration count comes from ``settings.PASSWORD_HASHING['ITERATIONS']``
+  (None keeps Django's default). Hashes with another count are rehashed the
+  next time their user logs in, since ``check_password()`` updates passwords
+  whose hasher ``must_update()``;
+* the key derivation runs in a pool of ``POOL_SIZE`` worker processes (0 runs
+  it in the calling thread). Requests still wait for their own hash, but a
+  burst of logins or sign-ups uses at most ``POOL_SIZE`` cores and queues
+  behind them, instead of taking every CPU away from the rest of the API.
+
+The workers are spawned, so each re-imports the parent's ``__main__``: a
+script that sets Django up at import time without an
+``if __name__ == '__main__'`` guard crashes them. When the pool breaks, the
+hashing runs in the calling thread for ``RETRY_SECONDS`` before a new pool
+is tried.
+"""
+import base64
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.signals import setting_changed
+from django.utils.encoding import force_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def get_hashing_settings():
+    return {
+        'ITERATIONS': None,
+        'POOL_SIZE': 0,
+        'RETRY_SECONDS': 300,
+        **getattr(settings, 'PASSWORD_HASHING', {}),
+    }
+
+
+def derive_key(password, salt, iterations, digest):
+    """Module level, so the pool's worker processes can unpickle it."""
+    return hashlib.pbkdf2_hmac(digest, password, salt, iterations)
+
+
+class HashingPool:
+    """A lazily started process pool; after it breaks, callers hash inline for ``retry_seconds``."""
+
+    def __init__(self, size, retry_seconds=300):
+        self.size = size
+        self.retry_seconds = retry_seconds
+        self._executor = None
+        self._retry_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """The pool, or None while backing off after a failure."""
+        with self._lock:
+            if self._executor is None:
+                if self._retry_at is not None and time.monotonic() < self._retry_at:
+                    return None
+                # Forking a threaded server process is unsafe; spawned
+                # workers re-import __main__ (see the module docstring)
+                self._executor = ProcessPoolExecutor(self.size, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def run(self, func, *args):
+        executor = self.executor
+        if executor is None:
+            return func(*args)
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    logger.exception('Password hashing pool broke; hashing inline for %s seconds', self.retry_seconds)
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                    self._retry_at = time.monotonic() + self.retry_seconds
+            return func(*args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = get_hashing_settings()
+            _pool = HashingPool(config['POOL_SIZE'], config['RETRY_SECONDS']) if config['POOL_SIZE'] else False
+        return _pool or None
+
+
+def _reset_hashing_pool(setting, **kwargs):
+    global _pool
+    if setting == 'PASSWORD_HASHING':
+        with _pool_lock:
+            if _pool:
+                _pool.shutdown()
+            _pool = None
+
+
+setting_changed.connect(_reset_hashing_pool)
+
+
+def run_derive_key(password, salt, iterations, digest):
+    pool = get_hashing_pool()
+    if pool is None:
+        return derive_key(password, salt, iterations, digest)
+    return pool.run(derive_key, password, salt, iterations, digest)
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return get_hashing_settings()['ITERATIONS'] or PBKDF2PasswordHasher.iterations
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        key = run_derive_key(force_bytes(password), force_bytes(salt), iterations, self.digest().name)
+        hash = base64.b64encode(key).decode('ascii').strip()
+        return '%s$%d$%s$%s' % (self.algorithm, iterations, salt, hash)
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+from rest_framework.authtoken.models import Token
+
+from apis.benchmarks import benchmark_database, percentile, seed_events, seed_users
+from apis.models import Event
+
+
+def summarize_run(latencies, elapsed, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Drive the async (ASGI) and sync (WSGI) event read paths with many concurrent in-process "
+            "clients and compare requests per second and p50/p99 latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per endpoint and path.")
+        parser.add_argument('--concurrency', type=int, default=64)
+
+    def handle(self, *args, **options):
+        results = []
+        with benchmark_database():
+            user = seed_users(1)[0]
+            token = Token.objects.create(user=user)
+            self.stderr.write(f"Seeding {options['events']} events...")
+            seed_events(options['events'], [user])
+            event_id = Event.objects.filter(tags__name='music').order_by('id').values_list('id', flat=True).first()
+
+            endpoints = {
+                'list': ('events/list-events/', {'tags': 'music'}),
+                'upcoming': ('events/upcoming/', {}),
+                'detail': (f'events/{event_id}/', {}),
+            }
+            headers = {'Authorization': f'Token {token.key}'}
+            for name, (path, params) in endpoints.items():
+                results.append({
+                    'endpoint': name,
+                    'wsgi': self.run_wsgi(f'/api/{path}', params, headers, options),
+                    'asgi': asyncio.run(self.run_asgi(f'/api/async/{path}', params, headers, options)),
+                })
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'asgi_vs_wsgi',
+            'events': options['events'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2))
+
+    def run_wsgi(self, path, params, headers, options):
+        # One thread per concurrent client, like a threaded WSGI server
+        def call(_):
+            started = time.perf_counter()
+            response = Client().get(path, params, headers=headers)
+            close_old_connections()
+            return time.perf_counter() - started, response.status_code == 200
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            outcomes = list(pool.map(call, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return summarize_run([latency for latency, _ in outcomes], elapsed, sum(not ok for _, ok in outcomes))
+
+    async def run_asgi(self, path, params, headers, options):
+        # All clients share one event loop, like a single ASGI worker
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, params, headers=headers)
+                return time.perf_counter() - started, response.status_code == 200
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return summarize_run([latency for latency, _ in outcomes], elapsed, sum(not ok for _, ok in outcomes))
@@ -0,0 +1,91 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from apis.benchmarks import benchmark_database, measure, percentile
+from apis.hashers import PooledPBKDF2PasswordHasher, get_hashing_settings
+
+
+class Command(BaseCommand):
+    help = ("Measure password hashing, login throughput and registration latency with the "
+            "PBKDF2 hash in the request thread and in the hashing process pool.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=None,
+                            help="PBKDF2 iterations (default: PASSWORD_HASHING['ITERATIONS'] or Django's).")
+        parser.add_argument('--pool-size', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--logins', type=int, default=64)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        base = {**get_hashing_settings(), 'ITERATIONS': options['iterations'] or get_hashing_settings()['ITERATIONS']}
+        configs = {
+            'inline': {**base, 'POOL_SIZE': 0},
+            'pool': {**base, 'POOL_SIZE': options['pool_size']},
+        }
+        results = {}
+        with benchmark_database():
+            for name, config in configs.items():
+                with override_settings(PASSWORD_HASHING=config):
+                    results[name] = self.run_config(name, options)
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'auth',
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2))
+
+    def run_config(self, name, options):
+        # Also starts the pool's processes outside the measurements
+        hash_stats = measure(lambda: make_password('benchmark-password'), repeat=options['repeat'])
+
+        client = Client()
+        counter = iter(range(10 ** 9))
+
+        def register():
+            index = next(counter)
+            response = client.post('/api/users/register/', {
+                'username': f'{name}-user{index}',
+                'email': f'{name}-user{index}@example.com',
+                'password': 'benchmark-password',
+            })
+            assert response.status_code == 201, response.content
+
+        # The request_started signal resets connection.queries; count in a wrapper
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            register()
+        register_stats = measure(register, repeat=options['repeat'], warmup=0)
+
+        credentials = {'username': f'{name}-user0', 'password': 'benchmark-password'}
+
+        def login(_):
+            started = time.perf_counter()
+            response = Client().post('/api/users/login/', credentials)
+            elapsed = time.perf_counter() - started
+            connections.close_all()
+            return response.status_code == 200, elapsed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            outcomes = list(executor.map(login, range(options['logins'])))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for _, latency in outcomes)
+
+        return {
+            'iterations': PooledPBKDF2PasswordHasher().iterations,
+            'hash': hash_stats,
+            'register': {**register_stats, 'queries': len(queries)},
+            'login': {
+                'per_second': round(sum(ok for ok, _ in outcomes) / elapsed, 1),
+                'errors': sum(not ok for ok, _ in outcomes),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            },
+        }
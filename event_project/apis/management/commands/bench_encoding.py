@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apis.benchmarks import benchmark_database, measure, seed_events, seed_users
+from apis.compression import brotli, compress, get_compression_settings
+from apis.models import Event
+from apis.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from apis.serializers import EventValuesSerializer
+
+
+class Command(BaseCommand):
+    help = ("Report bytes on the wire and encode time of event listings as JSON and MessagePack, "
+            "uncompressed, gzipped and brotli compressed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000', help="Comma separated listing sizes.")
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        config = get_compression_settings()
+        renderers = {'json': FastJSONRenderer()}
+        if msgpack is not None:
+            renderers['msgpack'] = MessagePackRenderer()
+        encodings = [None, 'gzip'] + (['br'] if brotli is not None else [])
+
+        results = {}
+        with benchmark_database():
+            user = seed_users(1)[0]
+            self.stderr.write(f"Seeding {max(sizes)} events...")
+            seed_events(max(sizes), [user])
+
+            for size in sizes:
+                rows = list(Event.objects.order_by('date', 'id').values_list(*EventValuesSerializer.value_fields, named=True)[:size])
+                data = {'events': EventValuesSerializer(rows).data, 'next': None, 'previous': None}
+                for name, renderer in renderers.items():
+                    body = renderer.render(data)
+                    for encoding in encodings:
+                        if encoding is None:
+                            results[f'{size}/{name}'] = {
+                                'bytes': len(body),
+                                'encode': measure(lambda: renderer.render(data), repeat=options['repeat']),
+                            }
+                        else:
+                            results[f'{size}/{name}+{encoding}'] = {
+                                'bytes': len(compress(body, encoding, config)),
+                                # Rendering and compressing, as a request pays for both
+                                'encode': measure(lambda: compress(renderer.render(data), encoding, config), repeat=options['repeat']),
+                            }
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'encoding',
+            'gzip_level': config['GZIP_LEVEL'],
+            'brotli_quality': config['BROTLI_QUALITY'] if brotli is not None else None,
+            'results': results,
+        }, indent=2))
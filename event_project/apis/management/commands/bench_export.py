@@ -0,0 +1,56 @@
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from apis.benchmarks import benchmark_database, seed_events, seed_users
+from apis.models import Event
+
+
+class Command(BaseCommand):
+    help = "Measure peak memory and throughput of the streaming events/export/ endpoint as the catalog grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help="Comma separated catalog sizes to export, seeded cumulatively.")
+        parser.add_argument('--output', choices=['ndjson', 'csv'], default='ndjson')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+
+        results = []
+        with benchmark_database():
+            user = seed_users(1)[0]
+            client = APIClient()
+            client.force_authenticate(user)
+
+            for size in sizes:
+                missing = size - Event.objects.count()
+                self.stderr.write(f"Seeding {missing} events (catalog size {size})...")
+                seed_events(missing, [user])
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                response = client.get('/api/events/export/', {'output': options['output']})
+                streamed_bytes = 0
+                for part in response.streaming_content:
+                    streamed_bytes += len(part)
+                elapsed = time.perf_counter() - started
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                results.append({
+                    'events': size,
+                    'peak_memory_mb': round(peak / 2 ** 20, 2),
+                    'streamed_mb': round(streamed_bytes / 2 ** 20, 2),
+                    'seconds': round(elapsed, 2),
+                    'events_per_second': round(size / elapsed),
+                })
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'export',
+            'output': options['output'],
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,71 @@
+import json
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apis.benchmarks import benchmark_database, measure, seed_events, seed_users
+from apis.models import Event
+from apis.pagination import EventCursorPagination
+
+
+class Command(BaseCommand):
+    help = "Benchmark keyset pagination of the event list endpoint from the first page to deep pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--pages', default='1,10,100,1000,10000',
+                            help="Comma separated page numbers to time.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        pages = [int(page) for page in options['pages'].split(',')]
+        needed = max(pages) * page_size
+        events = max(options['events'], needed)
+
+        with benchmark_database():
+            user = seed_users(1)[0]
+            self.stderr.write(f"Seeding {events} events...")
+            seed_events(events, [user], tags_per_event=2)
+
+            client = APIClient()
+            client.force_authenticate(user)
+            paginator = EventCursorPagination()
+            factory = APIRequestFactory()
+            ordered = Event.objects.order_by('date', 'id')
+
+            results = []
+            for page in pages:
+                offset = (page - 1) * page_size
+                params = {'page_size': page_size}
+                if offset:
+                    # Position the cursor on the last row of the previous page.
+                    params['cursor'] = paginator.encode_cursor(ordered[offset - 1])
+
+                def keyset():
+                    response = client.get('/api/events/list-events/', params)
+                    assert response.status_code == 200, response.status_code
+
+                request = Request(factory.get('/api/events/list-events/', params))
+
+                def keyset_query():
+                    EventCursorPagination().paginate_queryset(Event.objects.all(), request)
+
+                def offset_scan():
+                    list(ordered[offset:offset + page_size])
+
+                results.append({
+                    'page': page,
+                    'keyset_request': measure(keyset, repeat=options['repeat']),
+                    'keyset_query': measure(keyset_query, repeat=options['repeat']),
+                    'offset_query_baseline': measure(offset_scan, repeat=options['repeat']),
+                })
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'pagination',
+            'events': events,
+            'page_size': page_size,
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from apis.benchmarks import benchmark_database, measure, seed_events, seed_users
+from apis.models import Event
+from apis.search import search_terms
+
+
+class Command(BaseCommand):
+    help = "Measure events/search/ latency on a large synthetic corpus against an unindexed icontains scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200000)
+        parser.add_argument('--queries', default='synthetic,event 12345,nairobi bench,kisu synth,number 99',
+                            help="Comma separated search queries.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        queries = [query for query in options['queries'].split(',') if query.strip()]
+
+        results = []
+        with benchmark_database():
+            user = seed_users(1)[0]
+            self.stderr.write(f"Seeding {options['events']} events...")
+            seed_events(options['events'], [user])
+
+            client = APIClient()
+            client.force_authenticate(user)
+
+            for query in queries:
+                def indexed():
+                    response = client.get('/api/events/search/', {'q': query, 'limit': 20})
+                    assert response.status_code == 200, response.status_code
+
+                def upcoming_indexed():
+                    client.get('/api/events/search/', {'q': query, 'limit': 20, 'upcoming': '1', 'tags': 'music'})
+
+                def scan():
+                    events = Event.objects.all()
+                    for term in search_terms(query):
+                        events = events.filter(Q(title__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term))
+                    list(events.order_by('date', 'id')[:20])
+
+                results.append({
+                    'query': query,
+                    'search_request': measure(indexed, repeat=options['repeat']),
+                    'search_request_upcoming_music': measure(upcoming_indexed, repeat=options['repeat']),
+                    'icontains_query_baseline': measure(scan, repeat=max(options['repeat'] // 4, 1), warmup=1),
+                })
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'search',
+            'events': options['events'],
+            'results': results,
+        }, indent=2))
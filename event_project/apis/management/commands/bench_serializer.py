@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apis.benchmarks import benchmark_database, measure, seed_events, seed_users
+from apis.models import Event
+from apis.renderers import FastJSONRenderer, orjson
+from apis.serializers import EventSerializer, EventValuesSerializer
+
+
+class Command(BaseCommand):
+    help = ("Compare EventSerializer(many=True) + JSONRenderer with EventValuesSerializer + FastJSONRenderer "
+            "when loading, serializing and rendering a large event listing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = seed_users(1)[0]
+            self.stderr.write(f"Seeding {options['events']} events...")
+            seed_events(options['events'], [user])
+
+            events = Event.objects.order_by('date', 'id')
+            instances = list(events.with_related())
+            rows = list(events.values_list(*EventValuesSerializer.value_fields, named=True))
+            serialized = EventSerializer(instances, many=True).data
+            slim = EventValuesSerializer(rows).data
+            fast_renderer, json_renderer = FastJSONRenderer(), JSONRenderer()
+            if fast_renderer.render(slim) != json_renderer.render(serialized):
+                self.stderr.write("Outputs differ!")
+
+            repeat = options['repeat']
+            results = {
+                'model_serializer': {
+                    'load': measure(lambda: list(events.with_related()), repeat=repeat),
+                    'serialize': measure(lambda: EventSerializer(instances, many=True).data, repeat=repeat),
+                    'render': measure(lambda: json_renderer.render(serialized), repeat=repeat),
+                    'end_to_end': measure(
+                        lambda: json_renderer.render(EventSerializer(list(events.with_related()), many=True).data), repeat=repeat
+                    ),
+                },
+                'values_serializer': {
+                    'load': measure(lambda: list(events.values_list(*EventValuesSerializer.value_fields, named=True)), repeat=repeat),
+                    'serialize': measure(lambda: EventValuesSerializer(rows).data, repeat=repeat),
+                    'render': measure(lambda: fast_renderer.render(slim), repeat=repeat),
+                    'end_to_end': measure(
+                        lambda: fast_renderer.render(EventValuesSerializer(
+                            list(events.values_list(*EventValuesSerializer.value_fields, named=True))
+                        ).data), repeat=repeat
+                    ),
+                },
+            }
+
+        before = results['model_serializer']['end_to_end']['p50_ms']
+        after = results['values_serializer']['end_to_end']['p50_ms']
+        self.stdout.write(json.dumps({
+            'benchmark': 'serializer',
+            'events': options['events'],
+            'orjson': orjson is not None,
+            'speedup': round(before / after, 2),
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,128 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.test.utils import setup_test_environment
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from apis.benchmarks import percentile, seed_events, seed_users
+
+
+def run_worker(args):
+    """Mixed read/write loop in one forked process, like one WSGI worker."""
+    worker, user_id, seconds, write_ratio = args
+    from django.contrib.auth import get_user_model
+
+    rng = random.Random(worker)
+    user = get_user_model().objects.get(pk=user_id)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    reads, writes, errors, latencies = 0, 0, 0, []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                response = client.post('/api/events/create-event/', {
+                    'title': f'Concurrent event {worker}-{writes}',
+                    'description': 'Written by the concurrency benchmark',
+                    'date': (now() + timedelta(days=rng.randint(1, 365))).isoformat(),
+                    'location': 'Benchmark',
+                    'tags': ['music'],
+                }, format='json')
+                ok = response.status_code == 201
+                writes += ok
+            else:
+                response = client.get('/api/events/list-events/', {'page_size': 20})
+                ok = response.status_code == 200
+                reads += ok
+        except Exception:
+            ok = False
+        errors += not ok
+        latencies.append(time.perf_counter() - started)
+        # The test client keeps connections open; close them the way the
+        # request_finished handler of a real server would.
+        close_old_connections()
+
+    connections.close_all()
+    return reads, writes, errors, latencies
+
+
+class Command(BaseCommand):
+    help = ("Run concurrent readers and writers against a file-backed SQLite database "
+            "once per DATABASE_PROFILES entry and report throughput, latency and lock errors.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=','.join(settings.DATABASE_PROFILES),
+                            help="Comma separated names from settings.DATABASE_PROFILES.")
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+        results = []
+        try:
+            for name in options['profiles'].split(','):
+                results.append(self.run_profile(name, os.path.join(directory, f'{name}.sqlite3'), options))
+        finally:
+            connections.close_all()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'sqlite_concurrency',
+            'workers': options['workers'],
+            'seconds': options['seconds'],
+            'write_ratio': options['write_ratio'],
+            'results': results,
+        }, indent=2))
+
+    def run_profile(self, name, path, options):
+        profile = settings.DATABASE_PROFILES[name]
+        connections.close_all()
+        # Point the default connection at a scratch file with this profile's options
+        connection.settings_dict.update({
+            'NAME': path,
+            'OPTIONS': dict(profile.get('OPTIONS', {})),
+            'CONN_MAX_AGE': profile.get('CONN_MAX_AGE', 0),
+            'CONN_HEALTH_CHECKS': profile.get('CONN_HEALTH_CHECKS', False),
+        })
+
+        self.stderr.write(f"[{name}] migrating and seeding {options['events']} events...")
+        call_command('migrate', verbosity=0, interactive=False)
+        user = seed_users(1)[0]
+        seed_events(options['events'], [user])
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        jobs = [(worker, user.pk, options['seconds'], options['write_ratio']) for worker in range(options['workers'])]
+        started = time.perf_counter()
+        with context.Pool(options['workers']) as pool:
+            outcomes = pool.map(run_worker, jobs)
+        elapsed = time.perf_counter() - started
+
+        reads = sum(outcome[0] for outcome in outcomes)
+        writes = sum(outcome[1] for outcome in outcomes)
+        errors = sum(outcome[2] for outcome in outcomes)
+        latencies = sorted(latency for outcome in outcomes for latency in outcome[3])
+        return {
+            'profile': name,
+            'reads_per_second': round(reads / elapsed, 1),
+            'writes_per_second': round(writes / elapsed, 1),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        }
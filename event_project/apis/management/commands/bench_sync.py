@@ -0,0 +1,83 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from apis.benchmarks import benchmark_database, measure, seed_events, seed_users
+from apis.changes import latest_seq, record
+from apis.models import Event, EventChange
+from apis.sync import encode_watermark, get_sync_settings
+
+
+class Command(BaseCommand):
+    help = ("Time events/sync/ from a watermark for catalogs of several sizes with the same number "
+            "of changes since, showing that a sync costs what changed rather than the catalog size.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help="Comma separated catalog sizes.")
+        parser.add_argument('--changes', type=int, default=100, help="Events updated since the watermark.")
+        parser.add_argument('--deletes', type=int, default=10, help="Events deleted since the watermark.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = []
+        with benchmark_database():
+            user = seed_users(1)[0]
+            client = APIClient()
+            client.force_authenticate(user)
+            for size in sizes:
+                self.stderr.write(f"Seeding up to {size} events...")
+                seed_events(size - Event.objects.count(), [user], tags_per_event=2)
+                results.append(self.run_size(size, user, client, options))
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'sync',
+            'changes': options['changes'],
+            'deletes': options['deletes'],
+            'results': results,
+        }, indent=2))
+
+    def run_size(self, size, user, client, options):
+        # Extra events to delete, so the catalog keeps its size and
+        # seed_events() its titles for the next size
+        doomed = Event.objects.bulk_create([
+            Event(title=f'Sync benchmark event {size}-{i}', description='Deleted after the watermark.',
+                  date=now(), location='Nairobi', organizer=user)
+            for i in range(options['deletes'])
+        ])
+
+        # Everything so far is before the watermark
+        watermark = encode_watermark((latest_seq(), None))
+        ids = list(Event.objects.values_list('id', flat=True)[:size])
+        updated = random.Random(size).sample(ids, min(options['changes'], len(ids)))
+        Event.objects.filter(pk__in=updated).update(updated_at=now())
+        record(updated, EventChange.UPDATED)
+        for event in doomed:
+            event.delete()
+
+        params = {'since': watermark, 'limit': get_sync_settings()['MAX_PAGE_SIZE']}
+        response = client.get('/api/events/sync/', params)
+        assert response.status_code == 200, response.status_code
+        assert not response.data['has_more']
+
+        def delta_sync():
+            client.get('/api/events/sync/', params)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN QUERY PLAN SELECT seq, event_id, action FROM apis_eventchange WHERE seq > %s ORDER BY seq',
+                [latest_seq()],
+            )
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        return {
+            'events': Event.objects.count(),
+            'updated_returned': len(response.data['events']),
+            'deleted_returned': len(response.data['deleted']),
+            'delta_sync': measure(delta_sync, repeat=options['repeat']),
+            'log_scan_plan': plan,
+        }
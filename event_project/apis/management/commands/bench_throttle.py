@@ -0,0 +1,56 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from apis.benchmarks import benchmark_database, measure, seed_events, seed_users
+from apis.throttling import LocalBucketStore, get_throttle_settings
+
+# High enough that the benchmark itself is never throttled
+UNLIMITED_RATES = {scope: '1000000000/s' for scope in ('token_read', 'token_write', 'ip_read', 'ip_write')}
+
+
+class Command(BaseCommand):
+    help = ("Measure the latency the token bucket throttles add: a single bucket check, and cached "
+            "events/list-events/ requests with throttling off, with in-process buckets and with "
+            "cache-backed buckets.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        store = LocalBucketStore()
+        results = {
+            'bucket_check': measure(lambda: store.consume('bench', 10 ** 9, 10 ** 9), repeat=repeat),
+        }
+
+        events_cache = getattr(settings, 'EVENTS_CACHE', {})
+        with benchmark_database():
+            user = seed_users(1)[0]
+            token = Token.objects.create(user=user)
+            seed_events(options['events'], [user])
+            client = Client(headers={'Authorization': f'Token {token.key}'})
+
+            configs = {
+                'disabled': {'ENABLED': False},
+                'local_store': {'ENABLED': True, 'BACKEND': 'apis.throttling.LocalBucketStore', 'OPTIONS': {}},
+                'cache_store': {'ENABLED': True, 'BACKEND': 'apis.throttling.CacheBucketStore', 'OPTIONS': {'alias': 'default'}},
+            }
+            for name, config in configs.items():
+                throttle = {**get_throttle_settings(), **config, 'RATES': UNLIMITED_RATES}
+                with override_settings(EVENTS_THROTTLE=throttle, EVENTS_CACHE=events_cache):
+                    # The page is served from the events cache after the warmup,
+                    # so the throttle is a large share of what's left
+                    results[name] = measure(lambda: client.get('/api/events/list-events/'), repeat=repeat, warmup=20)
+
+        overhead = results['local_store']['p50_ms'] - results['disabled']['p50_ms']
+        self.stdout.write(json.dumps({
+            'benchmark': 'throttle',
+            'events': options['events'],
+            'local_store_overhead_p50_ms': round(overhead, 3),
+            'results': results,
+        }, indent=2))
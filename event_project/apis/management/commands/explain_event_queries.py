@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from taggit.models import TaggedItem
+
+from apis.models import Event
+from apis.pagination import EventCursorPagination
+from apis.views import ListEventAPIView, ListEventUpcomingAPIView
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of every query behind the event list endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', default='music,tech',
+                            help="Comma separated tags used for the filtered variants.")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        tags = [tag for tag in options['tags'].split(',') if tag]
+        variants = [('first page', {}), ('tag filter', {'tags': tags})]
+
+        first_event = Event.objects.using(options['database']).order_by('date', 'id').first()
+        if first_event is not None:
+            cursor = EventCursorPagination().encode_cursor(first_event)
+            variants.append(('next page', {'cursor': cursor}))
+            variants.append(('previous page', {'cursor': EventCursorPagination().encode_cursor(first_event, reverse=True)}))
+
+        factory = APIRequestFactory()
+        for view_class, path in [(ListEventAPIView, '/api/events/list-events/'),
+                                 (ListEventUpcomingAPIView, '/api/events/upcoming/')]:
+            for label, params in variants:
+                request = Request(factory.get(path, params))
+                view = view_class()
+                view.request = request
+
+                queryset = view.filter_queryset(view.get_queryset()).using(options['database'])
+                queryset = view.pagination_class().get_page_queryset(queryset, request)
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{view_class.__name__} - {label}'))
+                self.stdout.write(str(queryset.query))
+                self.stdout.write(queryset.explain())
+                self.stdout.write('')
+
+        # The same tag prefetch query follows every page
+        ids = list(Event.objects.using(options['database']).order_by('date', 'id').values_list('id', flat=True)[:50])
+        lookup = f'{TaggedItem.tag_relname()}__object_id__in'
+        prefetch = TaggedItem.tags_for(Event, **{lookup: ids}).using(options['database'])
+        self.stdout.write(self.style.MIGRATE_HEADING('Tag prefetch for one page'))
+        self.stdout.write(str(prefetch.query))
+        self.stdout.write(prefetch.explain())
@@ -0,0 +1,87 @@
+import json
+import random
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+
+from apis.benchmarks import benchmark_database, seed_events, seed_users
+from apis.benchmarks.replay import DEFAULT_MIX, HTTPTarget, InProcessTarget, RequestRenderer, load_mix, replay
+from apis.models import Event
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Replay a weighted request mix (JSONL or a .http file such as sample.http) against the app in "
+            "process or a running server, and report RPS, latency percentiles and SQL queries per endpoint as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', default=str(DEFAULT_MIX),
+                            help="JSONL request mix or .http file. Defaults to apis/benchmarks/request_mix.jsonl.")
+        parser.add_argument('--requests', type=int, default=2000, help="Total number of requests to send.")
+        parser.add_argument('--warmup', type=int, default=50, help="Requests sent before measuring.")
+        parser.add_argument('--url', help="Base URL of a running server, e.g. http://127.0.0.1:8000. "
+                                          "Without it the app is called in process on a seeded throwaway database.")
+        parser.add_argument('--token', help="Auth token for --url (see seed_events).")
+        parser.add_argument('--concurrency', type=int, default=1, help="Concurrent clients, for --url.")
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        templates = load_mix(options['mix'])
+        if not templates:
+            raise CommandError(f"No replayable requests in {options['mix']}.")
+
+        if options['url']:
+            if not options['token']:
+                raise CommandError("--url needs --token.")
+            event_ids = list(Event.objects.values_list('id', flat=True)[:10000])
+            target = HTTPTarget(options['url'], options['token'])
+            results = self.run(target, templates, event_ids, options)
+        else:
+            with benchmark_database():
+                users = seed_users(options['users'])
+                self.stderr.write(f"Seeding {options['events']} events...")
+                seed_events(options['events'], users, seed=options['seed'])
+                token = Token.objects.create(user=users[0])
+                event_ids = list(Event.objects.values_list('id', flat=True))
+                results = self.run(InProcessTarget(token.key), templates, event_ids, options)
+
+        report = json.dumps({
+            'benchmark': 'replay',
+            'commit': git_commit(),
+            'timestamp': now().isoformat(),
+            'target': options['url'] or 'in-process',
+            'mix': Path(options['mix']).name,
+            'concurrency': options['concurrency'] if options['url'] else 1,
+            **results,
+        }, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(report + '\n')
+        self.stdout.write(report)
+
+    def run(self, target, templates, event_ids, options):
+        rng = random.Random(options['seed'])
+        render = RequestRenderer(event_ids, seed=options['seed'])
+        weights = [template['weight'] for template in templates]
+
+        def requests(count):
+            return [render(template) for template in rng.choices(templates, weights=weights, k=count)]
+
+        concurrency = options['concurrency'] if options['url'] else 1
+        replay(target, requests(options['warmup']), concurrency)
+        return replay(target, requests(options['requests']), concurrency)
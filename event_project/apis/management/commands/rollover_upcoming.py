@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from apis.upcoming import boundary, rebuild, rollover
+
+
+class Command(BaseCommand):
+    help = ("Drop the events that have started from the upcoming events index. With --loop, keep running "
+            "and roll over at each event's start time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Repopulate the index and the tag counts from the events table first.")
+        parser.add_argument('--loop', action='store_true', help="Keep rolling over at every boundary.")
+        parser.add_argument(
+            '--max-sleep', type=float, default=60.0,
+            help="Longest wait between checks in --loop mode, so events created meanwhile are picked up.",
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write(f"Rebuilt the upcoming events index: {rebuild()} events.")
+
+        while True:
+            deleted = rollover()
+            next_boundary = boundary.get()
+            if deleted or not options['loop']:
+                self.stdout.write(f"Rolled over {deleted} events; next boundary: {next_boundary or 'none'}.")
+            if not options['loop']:
+                return
+
+            wait = options['max_sleep']
+            if next_boundary is not None:
+                wait = min(wait, max((next_boundary - now()).total_seconds(), 0))
+            time.sleep(wait)
@@ -0,0 +1,39 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from apis.benchmarks import seed_events, seed_users
+
+
+class Command(BaseCommand):
+    help = ("Seed the configured database with synthetic users and events (Zipf-distributed tags) "
+            "for load testing against a running server.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--events', type=int, default=100000)
+        parser.add_argument('--tags-per-event', type=int, default=3)
+        parser.add_argument('--past-fraction', type=float, default=0.2,
+                            help="Share of events dated in the past.")
+        parser.add_argument('--user-prefix', default='benchuser')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users = seed_users(options['users'], prefix=options['user_prefix'])
+        created = seed_events(
+            options['events'], users,
+            tags_per_event=options['tags_per_event'],
+            past_fraction=options['past_fraction'],
+            seed=options['seed'],
+        )
+        # A token to pass to replay_requests --url
+        token, _ = Token.objects.get_or_create(user=users[0])
+        self.stdout.write(json.dumps({
+            'users': len(users),
+            'events': created,
+            'seconds': round(time.perf_counter() - started, 2),
+            'token': token.key,
+        }, indent=2))
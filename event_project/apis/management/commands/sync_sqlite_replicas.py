@@ -0,0 +1,50 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apis.routers import get_replica_settings
+
+
+def copy_database(source, target):
+    """Copy ``source`` over ``target`` with SQLite's online backup; readers of ``target`` see the old or the new copy."""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        source_connection.close()
+        target_connection.close()
+
+
+class Command(BaseCommand):
+    help = ("Refresh the SQLite read replicas in DATABASE_REPLICAS['ALIASES'] with a consistent copy "
+            "of the default database, once or every --interval seconds.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep copying every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds between copies; keep it below DATABASE_REPLICAS['STICKY_SECONDS'].")
+
+    def handle(self, *args, **options):
+        aliases = get_replica_settings()['ALIASES']
+        if not aliases:
+            raise CommandError("No replicas configured; set EVENT_API_DB_REPLICAS or DATABASE_REPLICAS['ALIASES'].")
+        for alias in [DEFAULT_DB_ALIAS, *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"'{alias}' is not an SQLite database.")
+
+        if options['interval'] >= get_replica_settings()['STICKY_SECONDS']:
+            self.stderr.write("Warning: the interval is not below STICKY_SECONDS; users may not read their own writes.")
+
+        source = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        while True:
+            started = time.perf_counter()
+            for alias in aliases:
+                copy_database(source, connections[alias].settings_dict['NAME'])
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f"Copied {source} to {len(aliases)} replica(s) in {elapsed:.1f} ms")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
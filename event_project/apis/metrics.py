@@ -0,0 +1,255 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` times a sample of requests (``SAMPLE_RATE`` in
+``settings.PERFORMANCE_METRICS``): wall time, SQL query count and time, and
+the auth, serialize, render and compress phases recorded with ``timer()``. Sampled
+responses get a ``Server-Timing`` header, and every sample is added to
+in-process per-endpoint histograms served in the Prometheus text format by
+``metrics_view`` at ``/metrics``.
+
+The current request's measurements live in a context variable, so SQL run
+by async views in ``sync_to_async`` threads is attributed correctly.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Upper bounds of the histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+PHASES = ('auth', 'db', 'serialize', 'render', 'compress')
+
+_current = ContextVar('apis_request_metrics', default=None)
+
+
+def get_metrics_settings():
+    return {
+        'SAMPLE_RATE': 1.0,
+        'SERVER_TIMING': True,
+        'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+        **getattr(settings, 'PERFORMANCE_METRICS', {}),
+    }
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'timings')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.timings = dict.fromkeys(PHASES, 0.0)
+
+    def add(self, phase, seconds):
+        self.timings[phase] += seconds
+
+
+@contextmanager
+def timer(phase):
+    """Add the time spent in the block to ``phase`` of the current sampled request."""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.add(phase, time.perf_counter() - started)
+
+
+def query_timer(execute, sql, params, many, context):
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.queries += 1
+        record.add('db', time.perf_counter() - started)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # Connections are per thread, so every new one gets the wrapper
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+connection_created.connect(install_query_timer)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Per-endpoint histograms and counters of the sampled requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.requests = {}
+            self.durations = {}
+            self.queries = {}
+            self.phases = {}
+
+    def observe(self, endpoint, method, status_code, record, total):
+        labels = (endpoint, method)
+        with self._lock:
+            key = labels + (str(status_code),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.durations.setdefault(labels, Histogram(DURATION_BUCKETS)).observe(total)
+            self.queries.setdefault(labels, Histogram(QUERY_COUNT_BUCKETS)).observe(record.queries)
+            for phase, seconds in record.timings.items():
+                if seconds:
+                    self.phases.setdefault(labels + (phase,), Histogram(DURATION_BUCKETS)).observe(seconds)
+
+    def render(self, sample_rate):
+        lines = [
+            '# HELP apis_metrics_sample_rate Fraction of requests that are measured.',
+            '# TYPE apis_metrics_sample_rate gauge',
+            f'apis_metrics_sample_rate {sample_rate}',
+            '# HELP apis_requests_total Sampled requests by endpoint, method and status.',
+            '# TYPE apis_requests_total counter',
+        ]
+        with self._lock:
+            for (endpoint, method, status_code), count in sorted(self.requests.items()):
+                lines.append(f'apis_requests_total{labels(endpoint=endpoint, method=method, status=status_code)} {count}')
+            self._render_histograms(lines, 'apis_request_duration_seconds', 'Wall time of sampled requests.', self.durations)
+            self._render_histograms(lines, 'apis_request_queries', 'SQL queries per sampled request.', self.queries)
+            self._render_histograms(
+                lines, 'apis_request_phase_seconds', 'Time of sampled requests spent in auth, db, serialize, render and compress.',
+                {(endpoint, method, phase): histogram for (endpoint, method, phase), histogram in self.phases.items()},
+                extra_label='phase',
+            )
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines, name, description, histograms, extra_label=None):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(histograms.items()):
+            base = {'endpoint': key[0], 'method': key[1]}
+            if extra_label:
+                base[extra_label] = key[2]
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{labels(**base, le=bound)} {count}')
+            lines.append(f'{name}_bucket{labels(**base, le="+Inf")} {histogram.count}')
+            lines.append(f'{name}_sum{labels(**base)} {histogram.sum}')
+            lines.append(f'{name}_count{labels(**base)} {histogram.count}')
+
+
+def labels(**values):
+    escaped = (
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in values.items()
+    )
+    return '{%s}' % ','.join(escaped)
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    """Measure a sample of requests; see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_metrics_settings()
+        if random.random() >= config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        record = RequestMetrics()
+        reset_token = _current.set(record)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(reset_token)
+        return self.finish(request, response, record, config)
+
+    async def __acall__(self, request):
+        config = get_metrics_settings()
+        if random.random() >= config['SAMPLE_RATE']:
+            return await self.get_response(request)
+
+        record = RequestMetrics()
+        reset_token = _current.set(record)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(reset_token)
+        return self.finish(request, response, record, config)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        record = _current.get()
+        if record is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: record.add('render', time.perf_counter() - started))
+        return response
+
+    def finish(self, request, response, record, config):
+        total = time.perf_counter() - record.started
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name == 'metrics':
+            return response
+
+        endpoint = match.route if match is not None else 'unmatched'
+        registry.observe(endpoint, request.method, response.status_code, record, total)
+
+        if config['SERVER_TIMING']:
+            entries = [f'total;dur={total * 1000:.2f}']
+            for phase, seconds in record.timings.items():
+                if phase == 'db':
+                    entries.append(f'db;dur={seconds * 1000:.2f};desc="{record.queries} queries"')
+                elif seconds:
+                    entries.append(f'{phase};dur={seconds * 1000:.2f}')
+            response['Server-Timing'] = ', '.join(entries)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text exposition of the sampled request metrics."""
+    config = get_metrics_settings()
+    if request.META.get('REMOTE_ADDR') not in config['METRICS_ALLOWED_IPS']:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(config['SAMPLE_RATE']), content_type='text/plain; version=0.0.4; charset=utf-8')
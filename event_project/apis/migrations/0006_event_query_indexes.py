@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-17 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+TAG_JOIN_INDEX = models.Index(fields=['tag', 'content_type', 'object_id'], name='apis_taggeditem_tag_ct_obj_idx')
+
+
+def add_tag_join_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('taggit', 'TaggedItem'), TAG_JOIN_INDEX)
+
+
+def remove_tag_join_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('taggit', 'TaggedItem'), TAG_JOIN_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0005_event_date_index'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'date'], name='apis_event_organizer_date_idx'),
+        ),
+        # Lets the planner drive the tag filter from the matching tags
+        # (tag -> tagged events) instead of probing every event. The reverse
+        # direction (event -> tags) is covered by taggit's unique constraint on
+        # (content_type, object_id, tag).
+        migrations.RunPython(add_tag_join_index, remove_tag_join_index),
+    ]
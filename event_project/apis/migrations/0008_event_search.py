@@ -0,0 +1,84 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS apis_event_fts USING fts5(
+        title, description, location,
+        content='apis_event', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apis_event_fts_ai AFTER INSERT ON apis_event BEGIN
+        INSERT INTO apis_event_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apis_event_fts_ad AFTER DELETE ON apis_event BEGIN
+        INSERT INTO apis_event_fts(apis_event_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apis_event_fts_au AFTER UPDATE OF title, description, location ON apis_event BEGIN
+        INSERT INTO apis_event_fts(apis_event_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO apis_event_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    # Index the events that already exist
+    "INSERT INTO apis_event_fts(apis_event_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS apis_event_fts_ai",
+    "DROP TRIGGER IF EXISTS apis_event_fts_ad",
+    "DROP TRIGGER IF EXISTS apis_event_fts_au",
+    "DROP TABLE IF EXISTS apis_event_fts",
+]
+
+POSTGRESQL_BACKWARD = ["DROP INDEX IF EXISTS apis_event_search_idx"]
+
+MYSQL_FORWARD = ["CREATE FULLTEXT INDEX apis_event_search_idx ON apis_event (title, description, location)"]
+
+MYSQL_BACKWARD = ["DROP INDEX apis_event_search_idx ON apis_event"]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+def add_postgresql_index(apps, schema_editor):
+    # Built from the same SearchVector as apis.search so the planner can
+    # match the query expression against the index expression.
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    index = GinIndex(SearchVector('title', 'description', 'location', config='english'), name='apis_event_search_idx')
+    schema_editor.add_index(apps.get_model('apis', 'Event'), index)
+
+
+def forward(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        add_postgresql_index(apps, schema_editor)
+    else:
+        run({'sqlite': SQLITE_FORWARD, 'mysql': MYSQL_FORWARD})(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0007_event_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            forward,
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD, 'mysql': MYSQL_BACKWARD}),
+        ),
+    ]
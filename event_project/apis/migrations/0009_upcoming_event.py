@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.timezone import now
+
+
+def populate_upcoming(apps, schema_editor):
+    Event = apps.get_model('apis', 'Event')
+    UpcomingEvent = apps.get_model('apis', 'UpcomingEvent')
+    rows = Event.objects.filter(date__gt=now()).values_list('id', 'date')
+    UpcomingEvent.objects.bulk_create(
+        (UpcomingEvent(event_id=pk, date=date) for pk, date in rows.iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0008_event_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpcomingEvent',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='upcoming', serialize=False, to='apis.event')),
+                ('date', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.RunPython(populate_upcoming, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.2 on 2026-10-17 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef
+
+
+def populate_tag_counts(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagCount = apps.get_model('apis', 'TagCount')
+    UpcomingEvent = apps.get_model('apis', 'UpcomingEvent')
+
+    content_type = ContentType.objects.filter(app_label='apis', model='event').first()
+    if content_type is None:
+        return
+    rows = (
+        TaggedItem.objects.filter(content_type=content_type)
+        .values('tag_id', 'tag__name')
+        .annotate(
+            events=Count('pk'),
+            upcoming=Count('pk', filter=Exists(UpcomingEvent.objects.filter(pk=OuterRef('object_id')))),
+        )
+        .values_list('tag_id', 'tag__name', 'events', 'upcoming')
+    )
+    TagCount.objects.bulk_create(
+        [TagCount(tag_id=tag_id, key=name.lower(), events=events, upcoming_events=upcoming)
+         for tag_id, name, events, upcoming in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0009_upcoming_event'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='event_count', serialize=False, to='taggit.tag')),
+                ('key', models.CharField(db_index=True, max_length=100)),
+                ('events', models.IntegerField(default=0)),
+                ('upcoming_events', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_tag_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-17 18:31
+
+import django.core.validators
+from django.db import migrations, models
+
+from apis import geo
+
+
+def locate_events(apps, schema_editor):
+    # Same as Event.locate(), which historical models don't have
+    Event = apps.get_model('apis', 'Event')
+    located = []
+    for event in Event.objects.only('id', 'location').iterator(chunk_size=2000):
+        point = geo.geocode(event.location)
+        if point is not None:
+            event.latitude, event.longitude = point
+            event.geohash = geo.encode(*point)
+            located.append(event)
+    Event.objects.bulk_update(located, ['latitude', 'longitude', 'geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0010_tag_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['geohash', 'latitude', 'longitude'], name='apis_event_geohash_idx'),
+        ),
+        migrations.RunPython(locate_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-17 18:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def log_existing_events(apps, schema_editor):
+    # Syncing from seq 0 then returns the whole catalog
+    Event = apps.get_model('apis', 'Event')
+    EventChange = apps.get_model('apis', 'EventChange')
+    ids = Event.objects.order_by('id').values_list('id', flat=True)
+    EventChange.objects.bulk_create(
+        (EventChange(event_id=pk, action='created') for pk in ids.iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0011_event_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=7)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(log_existing_events, migrations.RunPython.noop),
+    ]
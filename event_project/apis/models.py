@@ -1,16 +1,178 @@
 from django.db import models
 from django.utils.timezone import now
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from taggit.managers import TaggableManager
+from taggit.models import Tag, TaggedItem
+
+from . import geo
 
 # Create your models here.
 User = get_user_model()
+
+
+def tag_names_for(event_ids):
+    """
+    Map each of ``event_ids`` to its tag names with a single query, in the
+    same order as ``event.tags.all()``.
+    """
+    tag_names = {event_id: [] for event_id in event_ids}
+    # The content type is checked here: in SQL, SQLite (without ANALYZE
+    # statistics) would scan its index, i.e. every tagged event, instead of
+    # looking up the few object ids
+    content_type_id = ContentType.objects.get_for_model(Event).pk
+    rows = (
+        TaggedItem.objects
+        .filter(object_id__in=event_ids)
+        .order_by('pk')
+        .values_list('object_id', 'content_type_id', 'tag__name')
+    )
+    for event_id, row_content_type_id, name in rows:
+        if row_content_type_id == content_type_id:
+            tag_names[event_id].append(name)
+    return tag_names
+
+
+class EventQuerySet(models.QuerySet):
+    def with_related(self):
+        # Load organizers in the same query and fetch the tags of every event
+        # in a single query over the taggit through table, instead of one
+        # tag query per serialized event.
+        return self.select_related('organizer').prefetch_related('tags')
+
+    def tagged_with(self, names):
+        # EXISTS semi-join on the taggit through table: an event matching
+        # several of the tags is returned once, so no DISTINCT is needed.
+        tagged_items = TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            object_id=models.OuterRef('pk'),
+            tag__name__in=names,
+        )
+        return self.filter(models.Exists(tagged_items))
+
+    def near(self, latitude, longitude, radius_km):
+        # Candidates for a proximity search: events in the geohash cells
+        # covering the circle, narrowed to its bounding box. Exact distances
+        # are left to the caller.
+        queryset = self.filter(geohash__isnull=False)
+        prefixes = geo.covering_prefixes(latitude, longitude, radius_km)
+        if prefixes is not None:
+            # Ranges rather than startswith, whose LIKE can't use the index
+            cells = models.Q()
+            for prefix in prefixes:
+                cells |= models.Q(geohash__gte=prefix, geohash__lt=prefix + geo.RANGE_END)
+            queryset = queryset.filter(cells)
+        box = geo.bounding_box(latitude, longitude, radius_km)
+        if box is not None:
+            min_lat, max_lat, min_lon, max_lon = box
+            queryset = queryset.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        return queryset
+
+    def upcoming(self):
+        # Events in the materialized upcoming index (see upcoming.py), after
+        # rolling over the ones that started. The index is the only source of
+        # membership: this process's cached boundary may not know about events
+        # other workers added.
+        from .upcoming import upcoming_boundary
+
+        upcoming_boundary()
+        return self.filter(upcoming__isnull=False)
+
+
 class Event(models.Model):
     title = models.CharField(max_length=150, unique=True)
     description = models.TextField()
-    date = models.DateTimeField()
+    date = models.DateTimeField(db_index=True)
     location = models.CharField(max_length=150)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Derived from the coordinates by locate(), for events/nearby/ (see geo.py)
+    geohash = models.CharField(max_length=geo.MAX_PRECISION, null=True, blank=True, editable=False)
     ticket_price = models.FloatField(default=0.00)
-    tags = TaggableManager()
+    # Tags in the order they were added, also when prefetched (taggit leaves
+    # the prefetch query unordered), matching tag_names_for()
+    tags = TaggableManager(ordering=['taggit_taggeditem_items__pk'])
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='event_organizer')
+    # Also touched when the event's tags change (see signals.py), so it
+    # versions the whole serialized representation.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organizer', 'date'], name='apis_event_organizer_date_idx'),
+            # Covers the candidate scan of events/nearby/ (see EventQuerySet.near)
+            models.Index(fields=['geohash', 'latitude', 'longitude'], name='apis_event_geohash_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_place()
+        return instance
+
+    def remember_place(self):
+        # The stored location and coordinates, for locate() to see a move
+        self._stored_place = (self.__dict__.get('location'), self.__dict__.get('latitude'), self.__dict__.get('longitude'))
+
+    def save(self, *args, **kwargs):
+        self.locate()
+        super().save(*args, **kwargs)
+        self.remember_place()
+
+    def locate(self):
+        # Place events without coordinates at their location's gazetteer
+        # entry, if any, and keep the geohash in step. bulk_create() callers
+        # must call this themselves.
+        stored = getattr(self, '_stored_place', None)
+        if (stored is not None and stored[0] is not None and self.location != stored[0]
+                and (self.latitude, self.longitude) == stored[1:]):
+            # Moved without new coordinates: the old ones are the old place's
+            self.latitude = self.longitude = None
+        if self.latitude is None and self.longitude is None and self.location:
+            self.latitude, self.longitude = geo.geocode(self.location) or (None, None)
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = None
+
+
+class UpcomingEvent(models.Model):
+    """
+    One row per event that has not started yet, kept up to date on event
+    writes and removed by the rollover at the event's start (see upcoming.py).
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='upcoming')
+    # Copy of event.date, so rollovers and boundaries never touch apis_event
+    date = models.DateTimeField(db_index=True)
+
+
+class TagCount(models.Model):
+    """
+    How many events, and how many upcoming events, carry each tag. Adjusted
+    by the writes that change them (see tagcounts.py).
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='event_count')
+    # Lowercased tag name, for case-insensitive prefix range scans
+    key = models.CharField(max_length=100, db_index=True)
+    events = models.IntegerField(default=0)
+    upcoming_events = models.IntegerField(default=0)
+
+
+class EventChange(models.Model):
+    """
+    Append-only log of event writes; ``seq`` orders them for incremental sync
+    (see changes.py). Rows outlive their event, so ``event_id`` is no foreign key.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+
+    seq = models.BigAutoField(primary_key=True)
+    event_id = models.BigIntegerField()
+    action = models.CharField(max_length=7, choices=ACTIONS)
+    changed_at = models.DateTimeField(default=now)
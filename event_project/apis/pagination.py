@@ -0,0 +1,124 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+# Keyset pagination over (date, id) for the event list endpoints.
+# Each page is fetched with an indexed range scan starting right after the
+# cursor position, so page 10,000 costs the same as page 1 (no OFFSET).
+class EventCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = getattr(settings, 'EVENTS_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'EVENTS_MAX_PAGE_SIZE', 500)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_results(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        # chunk_size covers the whole page, so prefetches run once per page
+        return self.paginate_results([event async for event in page_queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def paginate_results(self, results):
+        # results are the rows of get_page_queryset(), in query order
+        self.next_cursor = None
+        self.previous_cursor = None
+        reverse = self.cursor is not None and self.cursor[2]
+
+        # has_more refers to the direction of travel: a following page when
+        # paging forward, a preceding one when paging backward.
+        self.has_more = has_more = len(results) > self.page_size
+        page = results[:self.page_size]
+
+        if reverse:
+            page.reverse()
+            if has_more:
+                self.previous_cursor = self.encode_cursor(page[0], reverse=True)
+            self.next_cursor = self.encode_cursor(page[-1]) if page else self.flip_cursor()
+        else:
+            if has_more:
+                self.next_cursor = self.encode_cursor(page[-1])
+            if self.cursor is not None:
+                self.previous_cursor = self.encode_cursor(page[0], reverse=True) if page else self.flip_cursor()
+
+        return page
+
+    def get_page_queryset(self, queryset, request):
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            date, pk, reverse = None, None, False
+        else:
+            date, pk, reverse = self.cursor
+
+        if reverse:
+            queryset = queryset.filter(date__lte=date).filter(Q(date__lt=date) | Q(id__lt=pk))
+            queryset = queryset.order_by('-date', '-id')
+        else:
+            if date is not None:
+                queryset = queryset.filter(date__gte=date).filter(Q(date__gt=date) | Q(id__gt=pk))
+            queryset = queryset.order_by('date', 'id')
+
+        # Fetch one extra row to find out whether there is a following page.
+        return queryset[:self.page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_paginated_data(self, data):
+        return {
+            'events': data,
+            'next': self.next_cursor,
+            'previous': self.previous_cursor,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            date = parse_datetime(payload['d'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date, pk, reverse
+
+    def encode_cursor(self, event, reverse=False):
+        return self._encode(event.date, event.id, reverse)
+
+    def flip_cursor(self):
+        date, pk, reverse = self.cursor
+        return self._encode(date, pk, not reverse)
+
+    def _encode(self, date, pk, reverse):
+        payload = {'d': date.isoformat(), 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii'))
+        return encoded.decode('ascii').rstrip('=')
@@ -0,0 +1,94 @@
+"""
+JSONRenderer with an optional orjson fast path, and an optional MessagePack
+renderer for the event listings.
+
+orjson is only used for payloads it is known to encode to exactly the bytes
+``JSONRenderer`` would produce: the representations built by
+``EventValuesSerializer`` (which checks its floats while building them), alone
+or as values of a flat envelope dict such as ``{'events': ..., 'next': ...}``.
+Everything else, and every payload when orjson is not installed, goes
+through ``JSONRenderer`` unchanged.
+
+``MessagePackRenderer`` encodes the same data as MessagePack for clients
+that send ``Accept: application/msgpack``; it is only offered when the
+``msgpack`` package is installed (``BINARY_RENDERER_CLASSES``).
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class JSONRows(list):
+    """
+    A list of representations, with ``orjson_safe`` set by whoever built it
+    when every value is one orjson encodes like ``json.dumps``.
+    """
+    orjson_safe = False
+
+
+def float_is_orjson_safe(value):
+    # Outside this range json.dumps switches to exponent notation
+    # (1e-05, 1e+16), which orjson spells differently.
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def is_orjson_safe(data):
+    if isinstance(data, JSONRows):
+        return data.orjson_safe
+    if isinstance(data, dict):
+        for value in data.values():
+            if isinstance(value, JSONRows):
+                if not value.orjson_safe:
+                    return False
+            elif isinstance(value, float):
+                if not float_is_orjson_safe(value):
+                    return False
+            elif value is not None and type(value) not in (str, int, bool):
+                return False
+        return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or not is_orjson_safe(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    # Values JSON would encode through its encoder (dates, decimals, ...)
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.encoder.default, use_bin_type=True)
+
+
+BINARY_RENDERER_CLASSES = [MessagePackRenderer] if msgpack is not None else []
@@ -0,0 +1,214 @@
+"""
+Primary/replica database routing with read-your-writes.
+
+``settings.DATABASE_REPLICAS['ALIASES']`` names read-only copies of the
+``default`` database. Reads of the API's read views (``ReplicaReadsMixin``
+and the async views) go to one of them, picked per request; every write, and
+every read anywhere else or after the request wrote, goes to ``default``.
+
+A replica lags behind the primary, so a client that just wrote would not see
+its own change there. After a request writes, its user is pinned to the
+primary for ``STICKY_SECONDS`` (kept in the ``CACHE`` cache, which has to be
+shared between workers in production); pinned requests also skip the events
+cache, which replica reads may have filled with older pages. Those pages may
+be cached under an events version a writer already bumped, so they are kept
+for at most ``STICKY_SECONDS`` (``replica_cache_timeout()``) instead of the
+cache's own timeout. Keep
+``STICKY_SECONDS`` above the replication lag, e.g. the interval of
+``manage.py sync_sqlite_replicas --loop`` for local SQLite copies.
+Housekeeping writes a read makes on its own (``internal_writes()``, e.g. the
+lazy upcoming rollover) aren't the user's and don't pin them.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('apis_db_routing', default=None)
+
+
+def get_replica_settings():
+    return {
+        'ALIASES': [],
+        'STICKY_SECONDS': 5,
+        'CACHE': 'default',
+        **getattr(settings, 'DATABASE_REPLICAS', {}),
+    }
+
+
+class RoutingState:
+    """Where the current request reads from, and whether it wrote."""
+    __slots__ = ('replica', 'pinned', 'wrote', 'internal')
+
+    def __init__(self):
+        self.replica = None
+        self.pinned = False
+        self.wrote = False
+        self.internal = 0
+
+
+def _sticky_key(user_id):
+    return f'apis-db-sticky:{user_id}'
+
+
+def pin_to_primary(user_id):
+    config = get_replica_settings()
+    caches[config['CACHE']].set(_sticky_key(user_id), True, timeout=config['STICKY_SECONDS'])
+
+
+def is_pinned_to_primary(user_id):
+    return bool(caches[get_replica_settings()['CACHE']].get(_sticky_key(user_id)))
+
+
+def route_reads_to_replica(request):
+    """
+    Send the rest of this request's reads to a replica, unless it is a write
+    or its user wrote recently. Call once the request is authenticated.
+    """
+    state = _state.get()
+    aliases = get_replica_settings()['ALIASES']
+    if state is None or not aliases or request.method not in SAFE_METHODS:
+        return
+    user = request.user
+    if user is not None and user.is_authenticated and is_pinned_to_primary(user.pk):
+        state.pinned = True
+        return
+    state.replica = random.choice(aliases)
+
+
+def reads_pinned_to_primary():
+    """Whether this request's user wrote recently, so cached pages may be older than their write."""
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def replica_cache_timeout(timeout):
+    """``timeout`` for caching what this request read, capped at ``STICKY_SECONDS`` if it read a replica."""
+    state = _state.get()
+    if state is None or state.replica is None or state.wrote:
+        return timeout
+    sticky = get_replica_settings()['STICKY_SECONDS']
+    return sticky if timeout is None else min(timeout, sticky)
+
+
+@contextmanager
+def primary():
+    """Read from ``default`` inside the block, e.g. to compute a write from current data."""
+    state = _state.get()
+    replica = state.replica if state is not None else None
+    if state is not None:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.replica = replica
+
+
+@contextmanager
+def internal_writes():
+    """Writes inside the block are housekeeping, not the user's: they don't pin them to the primary."""
+    state = _state.get()
+    if state is not None:
+        state.internal += 1
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.internal -= 1
+
+
+def _release(token):
+    try:
+        _state.reset(token)
+    except ValueError:
+        # Closed from a copy of the request's context (sync streams under
+        # ASGI); the request's own context ends with its task
+        pass
+
+
+class ReplicaReadsMixin:
+    """For read-only ``APIView``s: route their reads to a replica after authentication."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        route_reads_to_replica(request)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and not state.internal:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replica_settings()['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the migrated primary
+        if db in get_replica_settings()['ALIASES']:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Track routing per request and pin users to the primary after their writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self.finish(request, response, state, token)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self.finish(request, response, state, token)
+
+    def finish(self, request, response, state, token):
+        if state.wrote:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        if response.streaming:
+            # Streamed bodies (exports) are read after this returns: keep
+            # routing until the server closes the response
+            response._resource_closers.append(lambda: _release(token))
+        else:
+            _state.reset(token)
+        return response
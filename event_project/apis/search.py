@@ -0,0 +1,104 @@
+"""
+Full-text search over Event title, description and location.
+
+Each database uses its native engine:
+
+* SQLite: the ``apis_event_fts`` FTS5 table (external content on
+  ``apis_event``), kept in sync by triggers and ranked with bm25().
+* PostgreSQL: a GIN-indexed ``to_tsvector`` expression ranked with ts_rank.
+* MySQL: a FULLTEXT index queried in boolean mode.
+
+Other backends fall back to unindexed ``icontains`` matching. Every term is
+matched as a prefix and all terms must match.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q, Value
+
+FTS_TABLE = 'apis_event_fts'
+
+# Column weights for bm25(): a hit in the title counts most
+SQLITE_BM25_WEIGHTS = (10.0, 1.0, 2.0)
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON apis_event BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON apis_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, location ON apis_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+]
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search_events(queryset, query):
+    """Filter ``queryset`` to events matching ``query``, best matches first."""
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = apis_event.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            # bm25() is lower for better matches
+            select={'relevance': f'-bm25({FTS_TABLE}, {weights})'},
+        )
+    elif vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector('title', 'description', 'location', config='english')
+        search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='english')
+        queryset = queryset.annotate(document=vector, relevance=SearchRank(vector, search_query)).filter(document=search_query)
+    elif vendor == 'mysql':
+        match = ' '.join(f'+{term}*' for term in terms)
+        queryset = queryset.extra(
+            where=['MATCH (apis_event.title, apis_event.description, apis_event.location) AGAINST (%s IN BOOLEAN MODE)'],
+            params=[match],
+            select={'relevance': 'MATCH (apis_event.title, apis_event.description, apis_event.location) AGAINST (%s IN BOOLEAN MODE)'},
+            select_params=[match],
+        )
+    else:
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term))
+        queryset = queryset.annotate(relevance=Value(0.0))
+
+    return queryset.order_by('-relevance', 'date', 'id')
+
+
+def ensure_search_triggers(using='default', **kwargs):
+    """
+    Recreate the SQLite sync triggers if they are missing. Django rebuilds a
+    table (dropping its triggers) for some schema changes, so this runs after
+    every migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if FTS_TABLE not in connection.introspection.table_names(cursor):
+            return
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
@@ -1,6 +1,13 @@
+from operator import attrgetter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Event
-from rest_framework import serializers
+from django.db import transaction
+from django.utils import timezone
+from .models import Event, tag_names_for
+from .renderers import JSONRows, float_is_orjson_safe
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from rest_framework.authtoken.models import Token
 from django.utils.timezone import now
 from taggit.serializers import (TagListSerializerField,
@@ -21,16 +28,17 @@ class RegisterUserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password']
         extra_kwargs = {"password": {"write_only":True}}
 
-    def save(self, **kwargs):
-        new_user = User.objects.create_user(
-            username = self.validated_data['username'],
-            email = self.validated_data['email'],
-            password = self.validated_data['password']
-        )
-
-        new_user.save()
-        # Generate token for the new user
-        token = Token.objects.get_or_create(user=new_user)
+    def create(self, validated_data):
+        # One transaction: never a user without a token
+        with transaction.atomic():
+            new_user = User.objects.create_user(
+                username = validated_data['username'],
+                email = validated_data['email'],
+                password = validated_data['password']
+            )
+            # Generate token for the new user
+            Token.objects.create(user=new_user)
+        return new_user
 
 
 class LoginSerializer(serializers.ModelSerializer):
@@ -39,18 +47,29 @@ class LoginSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'password']
-class EventSerializer(TaggitSerializer,serializers.ModelSerializer):
+class CoordinatesMixin:
+    def validate(self, data):
+        data = super().validate(data)
+        # Coordinates come in pairs; without them the location is geocoded
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Provide both latitude and longitude, or neither.")
+        return data
+
+
+class EventSerializer(CoordinatesMixin,TaggitSerializer,serializers.ModelSerializer):
     tags = TagListSerializerField(default=[])
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'date', 'location', 'ticket_price', 'tags', 'organizer']
+        fields = ['id', 'title', 'description', 'date', 'location', 'latitude', 'longitude', 'ticket_price', 'tags', 'organizer']
         extra_kwargs = {'organizer': {'read_only':True}}
 
-class CreateEventSerializer(TaggitSerializer,serializers.ModelSerializer):
+class CreateEventSerializer(CoordinatesMixin,TaggitSerializer,serializers.ModelSerializer):
     tags = TagListSerializerField(default=[])
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'date', 'location', 'ticket_price', 'tags', 'organizer']
+        fields = ['id', 'title', 'description', 'date', 'location', 'latitude', 'longitude', 'ticket_price', 'tags', 'organizer']
         extra_kwargs = {'organizer': {'read_only':True}}
 
         def validate(self, data):
@@ -77,3 +96,138 @@ class CreateEventSerializer(TaggitSerializer,serializers.ModelSerializer):
 
             new_event.save()
 
+
+class BulkCreateEventSerializer(CreateEventSerializer):
+    # Title uniqueness is checked for the whole batch in one query by the view
+    # instead of one UniqueValidator query per item.
+    class Meta(CreateEventSerializer.Meta):
+        extra_kwargs = {'organizer': {'read_only':True}, 'title': {'validators': []}}
+
+
+class EventValuesSerializer:
+    """
+    Read-only ``EventSerializer(events, many=True).data`` for listings.
+
+    Takes rows from ``queryset.values_list(*value_fields, named=True)`` and
+    builds the representations directly, with the tags of all rows fetched in
+    one query, instead of running a serializer field per value. The output
+    renders to the same JSON as ``EventSerializer``.
+
+    With ``fields`` (see ``parse_fields()``) only those keys are built, from
+    the rows of ``columns_for(fields)``; the tags are only fetched when asked for.
+    """
+    fields = ('id', 'title', 'description', 'date', 'location', 'latitude', 'longitude', 'ticket_price', 'tags', 'organizer')
+    value_fields = ['id', 'title', 'description', 'date', 'location', 'latitude', 'longitude', 'ticket_price', 'organizer_id', 'updated_at']
+    # Read whatever the fields: cursors need date and id, validators updated_at
+    key_columns = ['id', 'date', 'updated_at']
+    # Columns of the fields not named after theirs; tags aren't a column
+    field_columns = {'organizer': 'organizer_id', 'tags': None}
+    date_field = serializers.DateTimeField()
+
+    def __init__(self, rows, tag_names=None, fields=None):
+        self.rows = rows
+        self.tag_names = tag_names
+        self.fields = fields
+
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        The fields named in a comma separated ``?fields=`` value, in
+        representation order, or None for all of them. ValueError for
+        unknown names.
+        """
+        names = {name.strip() for name in (value or '').split(',')} - {''}
+        unknown = names.difference(cls.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Choose from: {', '.join(cls.fields)}.")
+        if not names or len(names) == len(cls.fields):
+            return None
+        return tuple(name for name in cls.fields if name in names)
+
+    @classmethod
+    def columns_for(cls, fields):
+        """The columns to load for ``fields``."""
+        if fields is None:
+            return cls.value_fields
+        columns = list(cls.key_columns)
+        for name in fields:
+            column = cls.field_columns.get(name, name)
+            if column is not None and column not in columns:
+                columns.append(column)
+        return columns
+
+    @property
+    def data(self):
+        if self.fields is not None:
+            return self.sparse_data()
+
+        tag_names = self.tag_names
+        if tag_names is None:
+            tag_names = tag_names_for([row.id for row in self.rows])
+
+        date_representation = self.get_date_representation()
+        orjson_safe = True
+        data = JSONRows()
+        for row in self.rows:
+            ticket_price = row.ticket_price
+            for value in (ticket_price, row.latitude, row.longitude):
+                if value is not None and not float_is_orjson_safe(value):
+                    orjson_safe = False
+            data.append({
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'date': date_representation(row.date),
+                'location': row.location,
+                'latitude': row.latitude,
+                'longitude': row.longitude,
+                'ticket_price': ticket_price,
+                'tags': tag_names[row.id],
+                'organizer': row.organizer_id,
+            })
+        data.orjson_safe = orjson_safe
+        return data
+
+    def sparse_data(self):
+        tag_names = self.tag_names
+        if tag_names is None and 'tags' in self.fields:
+            tag_names = tag_names_for([row.id for row in self.rows])
+
+        date_representation = self.get_date_representation()
+        getters = []
+        for name in self.fields:
+            if name == 'date':
+                getters.append((name, lambda row: date_representation(row.date)))
+            elif name == 'tags':
+                getters.append((name, lambda row: tag_names[row.id]))
+            else:
+                getters.append((name, attrgetter(self.field_columns.get(name, name))))
+        floats = [name for name in ('ticket_price', 'latitude', 'longitude') if name in self.fields]
+
+        orjson_safe = True
+        data = JSONRows()
+        for row in self.rows:
+            item = {name: getter(row) for name, getter in getters}
+            for name in floats:
+                value = item[name]
+                if value is not None and not float_is_orjson_safe(value):
+                    orjson_safe = False
+            data.append(item)
+        data.orjson_safe = orjson_safe
+        return data
+
+    def get_date_representation(self):
+        output_format = api_settings.DATETIME_FORMAT
+        if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+            return self.date_field.to_representation
+
+        # DateTimeField.to_representation() for aware datetimes, with the
+        # current timezone looked up once instead of once per row
+        current_timezone = timezone.get_current_timezone()
+
+        def date_representation(value):
+            value = value.astimezone(current_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return date_representation
@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.contrib.auth import get_user_model
+from django.dispatch import Signal, receiver
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from taggit.models import Tag
+
+from .authentication import get_token_cache
+from .cache import bump_events_version
+from .models import Event, EventChange, TagCount
+from . import changes, tagcounts
+from .upcoming import sync_upcoming
+
+User = get_user_model()
+
+# Sent by apis.bulk.bulk_create_events() with the created ``events``, since
+# bulk_create() bypasses post_save.
+events_bulk_created = Signal()
+
+
+def events_changed():
+    # Bump right away so this thread never reads a stale page, and again on
+    # commit so pages cached by other threads before the commit are dropped.
+    bump_events_version()
+    transaction.on_commit(bump_events_version)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(events_bulk_created, sender=Event)
+def event_saved_or_deleted(sender, **kwargs):
+    events_changed()
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, **kwargs):
+    # Deletes cascade to the upcoming index on their own
+    sync_upcoming([instance], created=created)
+    changes.record([instance.pk], EventChange.CREATED if created else EventChange.UPDATED)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted_logged(sender, instance, **kwargs):
+    changes.record([instance.pk], EventChange.DELETED)
+
+
+@receiver(events_bulk_created, sender=Event)
+def events_bulk_created_indexes(sender, events, **kwargs):
+    # Index first: the tag counts include upcoming events
+    sync_upcoming(events, created=True)
+    tagcounts.events_added([event.pk for event in events])
+    changes.record([event.pk for event in events], EventChange.CREATED)
+
+
+@receiver(pre_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    # Before the tag links and the upcoming row cascade away
+    tagcounts.events_removed([instance.pk])
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+def event_tags_changed(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Event):
+        # Tags are part of the representation, so they version the event too
+        instance.updated_at = now()
+        Event.objects.filter(pk=instance.pk).update(updated_at=instance.updated_at)
+        changes.record([instance.pk], EventChange.UPDATED)
+        events_changed()
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+def event_tags_counted(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Event):
+        return
+    if action == 'post_add':
+        tagcounts.event_tags_changed(instance, pk_set, 1)
+    elif action == 'post_remove':
+        tagcounts.event_tags_changed(instance, pk_set, -1)
+    elif action == 'pre_clear':
+        # post_clear doesn't say which tags were removed
+        tagcounts.events_removed([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        # A renamed tag changes every event carrying it
+        tagged = Event.objects.tagged_with([instance.name])
+        changes.record(list(tagged.values_list('id', flat=True)), EventChange.UPDATED)
+        tagged.update(updated_at=now())
+        TagCount.objects.filter(tag=instance).update(key=instance.name.lower())
+        events_changed()
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    tagged = Event.objects.tagged_with([instance.name])
+    changes.record(list(tagged.values_list('id', flat=True)), EventChange.UPDATED)
+    tagged.update(updated_at=now())
+    events_changed()
+
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # Stamping the owner makes every worker re-check its cached tokens
+    get_token_cache().evict_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_saved_or_deleted(sender, instance, **kwargs):
+    # Drop cached users so deactivation (or any other change) applies at once
+    get_token_cache().evict_user(instance.pk)
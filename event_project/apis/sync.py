@@ -0,0 +1,97 @@
+"""
+Watermark-based delta sync behind events/sync/, for offline copies of the catalog.
+
+A client stores the ``watermark`` of its last sync and gets back only what
+changed after it: the current representation of the events written since,
+and the ids of the events deleted since. Both come from the change log
+(``EventChange``, see changes.py), read after the ``seq`` in the watermark.
+The log's ``seq`` is assigned by the writer holding SQLite's write lock, so
+rows commit in ``seq`` order: unlike a timestamp taken before a slow commit,
+a write can't become visible behind a watermark a client already has. A
+sync is a range scan of the log's primary key and costs the same whatever
+the catalog's size.
+
+A first sync (no watermark) pages through the catalog by id instead, and its
+watermarks also carry the log's last ``seq`` when it started: anything
+written during the full sync is in the log after it, so the first delta
+sync picks it up.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+
+from .changes import changes_since, latest_seq
+from .models import Event
+from .serializers import EventValuesSerializer
+
+
+def get_sync_settings():
+    return {
+        'PAGE_SIZE': 500,
+        'MAX_PAGE_SIZE': 5000,
+        **getattr(settings, 'EVENTS_SYNC', {}),
+    }
+
+
+def encode_watermark(key):
+    seq, after_id = key
+    payload = {'s': seq} if after_id is None else {'s': seq, 'i': after_id}
+    payload = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_watermark(encoded):
+    """
+    ``(seq, id)`` of a watermark: the log position, and the last event id of
+    a full sync still in progress (None once it is done). ValueError if it
+    isn't one.
+    """
+    try:
+        padded = encoded + '=' * (-len(encoded) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        seq = int(payload['s'])
+        after_id = int(payload['i']) if 'i' in payload else None
+    except (TypeError, KeyError, ValueError, UnicodeEncodeError, binascii.Error) as exc:
+        raise ValueError('Invalid watermark') from exc
+    if seq < 0:
+        raise ValueError('Invalid watermark')
+    return seq, after_id
+
+
+def catalog_page(seq, after_id, limit):
+    """A page of the full catalog in id order, for a first sync started at log position ``seq``."""
+    rows = Event.objects.order_by('id').values_list(*EventValuesSerializer.value_fields, named=True)
+    if after_id is not None:
+        rows = rows.filter(id__gt=after_id)
+    rows = list(rows[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'events': EventValuesSerializer(rows).data,
+        'deleted': [],
+        'watermark': encode_watermark((seq, rows[-1].id if has_more else None)),
+        'has_more': has_more,
+    }
+
+
+def sync_page(watermark=None, limit=500):
+    """
+    The events written and the event ids deleted after ``watermark`` (a
+    decoded key, None for everything), at most ``limit`` of them together.
+    """
+    if watermark is None:
+        return catalog_page(latest_seq(), None, limit)
+    seq, after_id = watermark
+    if after_id is not None:
+        return catalog_page(seq, after_id, limit)
+
+    page = changes_since(seq, limit)
+    changes = page['changes']
+    return {
+        'events': [change['event'] for change in changes if change['event'] is not None],
+        'deleted': [change['id'] for change in changes if change['event'] is None],
+        'watermark': encode_watermark((page['next'], None)),
+        'has_more': page['has_more'],
+    }
@@ -0,0 +1,134 @@
+"""
+Denormalized per-tag event counts behind the events/tags/ endpoint.
+
+``TagCount`` keeps, for every tag, the number of events carrying it and the
+number of those in the upcoming index. Each write that changes them adjusts
+the counts with a query over the events it touched only, never a GROUP BY
+over the whole catalog:
+
+* tags added to, removed from or cleared off an event (taggit's
+  ``m2m_changed`` signals);
+* events created in bulk (their tag links bypass the m2m signals) or deleted;
+* events entering or leaving the upcoming index (date changes, rollovers).
+
+``rebuild()`` recomputes everything from the tag links, for the initial
+migration and for data written around the ORM.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, QuerySet, Value, When
+from taggit.models import Tag, TaggedItem
+
+from .models import Event, TagCount, UpcomingEvent
+
+# Tags per UPDATE ... CASE statement
+APPLY_BATCH_SIZE = 500
+
+
+def tagged_items(event_ids):
+    return TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Event), object_id__in=event_ids)
+
+
+def count_by_tag(event_ids):
+    """``{tag_id: (events, upcoming events)}`` over ``event_ids`` (a list or a values queryset)."""
+    rows = (
+        tagged_items(event_ids)
+        .values('tag_id')
+        .annotate(
+            events=Count('pk'),
+            upcoming=Count('pk', filter=Exists(UpcomingEvent.objects.filter(pk=OuterRef('object_id')))),
+        )
+        .values_list('tag_id', 'events', 'upcoming')
+    )
+    return {tag_id: (events, upcoming) for tag_id, events, upcoming in rows}
+
+
+def apply(deltas):
+    """Add ``{tag_id: (events, upcoming events)}`` to the counts."""
+    deltas = {tag_id: delta for tag_id, delta in deltas.items() if delta != (0, 0)}
+    tag_ids = list(deltas)
+    for start in range(0, len(tag_ids), APPLY_BATCH_SIZE):
+        batch = {tag_id: deltas[tag_id] for tag_id in tag_ids[start:start + APPLY_BATCH_SIZE]}
+        if _update(batch) < len(batch):
+            # Tags created in bulk (bypassing post_save) have no row yet
+            missing = dict(Tag.objects.filter(pk__in=batch, event_count__isnull=True).values_list('pk', 'name'))
+            TagCount.objects.bulk_create([TagCount(tag_id=pk, key=name.lower()) for pk, name in missing.items()], ignore_conflicts=True)
+            _update({tag_id: batch[tag_id] for tag_id in missing})
+
+
+def _update(deltas):
+    def delta(index):
+        return Case(*[When(tag_id=tag_id, then=Value(value[index])) for tag_id, value in deltas.items()], default=Value(0))
+
+    return TagCount.objects.filter(tag_id__in=deltas).update(
+        events=F('events') + delta(0),
+        upcoming_events=F('upcoming_events') + delta(1),
+    )
+
+
+def events_added(event_ids):
+    apply(count_by_tag(event_ids))
+
+
+def events_removed(event_ids):
+    apply({tag_id: (-events, -upcoming) for tag_id, (events, upcoming) in count_by_tag(event_ids).items()})
+
+
+def event_tags_changed(event, tag_ids, sign):
+    upcoming = UpcomingEvent.objects.filter(pk=event.pk).exists()
+    apply({tag_id: (sign, sign if upcoming else 0) for tag_id in tag_ids})
+
+
+def upcoming_changed(entered=(), left=()):
+    """Adjust the upcoming counts of events added to or dropped from the upcoming index."""
+    deltas = {}
+    for event_ids, sign in ((entered, 1), (left, -1)):
+        if not isinstance(event_ids, QuerySet) and not event_ids:
+            continue
+        rows = tagged_items(event_ids).values('tag_id').annotate(count=Count('pk')).values_list('tag_id', 'count')
+        for tag_id, count in rows:
+            deltas[tag_id] = (0, deltas.get(tag_id, (0, 0))[1] + sign * count)
+    apply(deltas)
+
+
+def rebuild():
+    """Recompute every count from the tag links; return the number of tags counted."""
+    rows = (
+        TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Event))
+        .values('tag_id', 'tag__name')
+        .annotate(
+            events=Count('pk'),
+            upcoming=Count('pk', filter=Exists(UpcomingEvent.objects.filter(pk=OuterRef('object_id')))),
+        )
+        .values_list('tag_id', 'tag__name', 'events', 'upcoming')
+    )
+    with transaction.atomic():
+        TagCount.objects.all().delete()
+        TagCount.objects.bulk_create(
+            [TagCount(tag_id=tag_id, key=name.lower(), events=events, upcoming_events=upcoming)
+             for tag_id, name, events, upcoming in rows],
+            batch_size=1000,
+        )
+    return TagCount.objects.count()
+
+
+def tag_facets(prefix='', upcoming=False, limit=20):
+    """
+    The most used tags, optionally only those starting with ``prefix`` (case
+    insensitive) and counting upcoming events only.
+    """
+    field = 'events'
+    if upcoming:
+        from .upcoming import upcoming_boundary
+
+        # Roll over started events first, as upcoming event reads do
+        upcoming_boundary()
+        field = 'upcoming_events'
+
+    counts = TagCount.objects.filter(**{f'{field}__gt': 0})
+    if prefix:
+        # A range on the lowercased names, which unlike LIKE uses the index
+        key = prefix.lower()
+        counts = counts.filter(key__gte=key, key__lt=key + '\U0010ffff')
+    rows = counts.order_by(f'-{field}', 'key').values_list('tag__name', 'tag__slug', field)[:limit]
+    return [{'name': name, 'slug': slug, 'count': count} for name, slug, count in rows]
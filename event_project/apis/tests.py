@@ -1,12 +1,50 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import math
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient, TestCase
 
 # Create your tests here.
 from rest_framework import status
 from rest_framework.test import APITestCase
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from django.utils.timezone import now
-from .models import Event 
+from django.test import override_settings
+from .authentication import TokenCache, get_token_cache
+from .benchmarks.replay import InProcessTarget, RequestRenderer, parse_http_file
+from .cache import LRUBackend, get_events_cache
+from .changes import broadcaster
+from .compression import brotli, negotiate_encoding
+from .hashers import HashingPool, get_hashing_settings
+from .metrics import registry
+from django.contrib.contenttypes.models import ContentType
+from taggit.models import Tag
+from . import geo, views
+from .models import Event, EventChange, UpcomingEvent
+from .renderers import FastJSONRenderer, JSONRows, msgpack
+from .routers import PrimaryReplicaRouter, _state, is_pinned_to_primary
+from .serializers import EventSerializer, EventValuesSerializer
+from .tagcounts import rebuild as rebuild_tag_counts
+from .throttling import CacheBucketStore, get_throttle_settings, refill
+from .upcoming import RolloverScheduler, boundary, rollover
+from .management.commands.sync_sqlite_replicas import copy_database
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
 from datetime import timedelta
 
 class UserAPITestCase(APITestCase):
@@ -83,6 +121,21 @@ class EventAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreaterEqual(len(response.data['events']), 1)
 
+    def test_filter_events_by_tags(self):
+        self.event.tags.add("music", "festival")
+        Event.objects.create(
+            title="Untagged Event",
+            description="This event has no tags.",
+            date=now() + timedelta(days=2),
+            location="Test Location",
+            organizer=self.user
+        )
+
+        # An event matching several of the tags is only listed once
+        response = self.client.get('/api/events/list-events/', {'tags': ['music', 'festival']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data['events']], [self.event.id])
+
     def test_list_upcoming_events(self):
         response = self.client.get('/api/events/upcoming/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -151,4 +204,1567 @@ class EventAPITestCase(APITestCase):
         Event.objects.all().delete()
         response = self.client.get('/api/events/list-events/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
-        self.assertIn('Message', response.data)
\ No newline at end of file
+        self.assertIn('Message', response.data)
+
+class EventPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        base_date = now() + timedelta(days=1)
+
+        # Two events share a date so the id tie-breaker is exercised
+        self.events = [
+            Event.objects.create(
+                title=f"Event {i}",
+                description="Paginated event.",
+                date=base_date + timedelta(hours=i // 2),
+                location="Test Location",
+                organizer=self.user
+            )
+            for i in range(5)
+        ]
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_walk_pages_forward_and_back(self):
+        seen = []
+        pages = []
+        cursor = None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/events/list-events/', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            seen.extend(event['id'] for event in response.data['events'])
+            cursor = response.data['next']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [event.id for event in self.events])
+        self.assertIsNone(pages[0]['previous'])
+
+        # Following 'previous' from the last page returns the middle page
+        response = self.client.get('/api/events/list-events/', {'page_size': 2, 'cursor': pages[-1]['previous']})
+        self.assertEqual(response.data['events'], pages[1]['events'])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/events/upcoming/', {'page_size': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['events']), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/events/list-events/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EventListQueryCountTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def create_events(self, count):
+        future_date = now() + timedelta(days=1)
+        for i in range(count):
+            event = Event.objects.create(
+                title=f"Tagged Event {Event.objects.count()}",
+                description="Event with tags.",
+                date=future_date + timedelta(minutes=i),
+                location="Test Location",
+                organizer=self.user
+            )
+            event.tags.add("music", f"tag-{i}")
+
+    def test_list_endpoints_use_constant_queries(self):
+        # The page of events and one bulk tag query (the token is cached
+        # after the first request), plus the upcoming rollover boundary,
+        # which is read again after every event write
+        self.client.get('/api/events/list-events/')
+        for url, queries in [('/api/events/list-events/', 2), ('/api/events/upcoming/', 3)]:
+            for count in [1, 20]:
+                self.create_events(count)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertTrue(all(len(event['tags']) == 2 for event in response.data['events']))
+
+
+
+class EventListCacheTestCase(APITestCase):
+    def setUp(self):
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.event = Event.objects.create(
+            title="Cached Event",
+            description="This event is cached.",
+            date=now() + timedelta(days=1),
+            location="Test Location",
+            organizer=self.user
+        )
+        self.event.tags.add("music", "festival")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_request_is_served_from_cache(self):
+        first = self.client.get('/api/events/list-events/', {'tags': ['music', 'festival']})
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        # Nothing hits the database; tag order is normalized
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/events/list-events/', {'tags': ['festival', 'music', 'music']})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_event_and_tag_writes_invalidate(self):
+        self.client.get('/api/events/upcoming/')
+
+        self.event.title = "Renamed Event"
+        self.event.save()
+        response = self.client.get('/api/events/upcoming/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['events'][0]['title'], "Renamed Event")
+
+        self.event.tags.remove("music")
+        response = self.client.get('/api/events/upcoming/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['events'][0]['tags'], ["festival"])
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'events': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'events'},
+        },
+        EVENTS_CACHE={'BACKEND': 'apis.cache.DjangoCacheBackend', 'OPTIONS': {'alias': 'events'}},
+    )
+    def test_django_cache_backend(self):
+        self.assertEqual(self.client.get('/api/events/list-events/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/events/list-events/')['X-Cache'], 'HIT')
+        self.event.delete()
+        self.assertEqual(self.client.get('/api/events/list-events/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_local_backend_entries_expire(self):
+        backend = LRUBackend(timeout=60)
+        backend.set('page', b'cached')
+        backend.set('upcoming', b'cached', timeout=3600)
+        self.assertEqual(backend.get('page'), b'cached')
+        with mock.patch('apis.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(backend.get('page'))
+            self.assertIsNone(backend.get('upcoming'))
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.client.get('/api/events/list-events/')
+        self.client.get('/api/events/list-events/')
+        self.assertEqual(self.client.get('/api/stats/').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['events_cache']['hits'], 1)
+        self.assertEqual(response.data['events_cache']['misses'], 1)
+
+
+
+class EventConditionalRequestTestCase(APITestCase):
+    def setUp(self):
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.event = Event.objects.create(
+            title="Polled Event",
+            description="Clients poll this event.",
+            date=now() + timedelta(days=1),
+            location="Test Location",
+            organizer=self.user
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_detail_not_modified(self):
+        response = self.client.get(f'/api/events/{self.event.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+        # The event row only: no tag query from the serializer
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/events/{self.event.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_with_tags(self):
+        etag = self.client.get(f'/api/events/{self.event.id}/')['ETag']
+        self.event.tags.add("music")
+        response = self.client.get(f'/api/events/{self.event.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_match_on_update_and_delete(self):
+        etag = self.client.get(f'/api/events/{self.event.id}/')['ETag']
+        data = {
+            'title': 'Updated Event',
+            'description': 'Updated description.',
+            'date': (now() + timedelta(days=2)).isoformat(),
+            'location': 'Updated Location',
+            'ticket_price': 150.0
+        }
+
+        response = self.client.put(f'/api/events/{self.event.id}/', data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # The first ETag is now stale
+        response = self.client.put(f'/api/events/{self.event.id}/', data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(f'/api/events/{self.event.id}/', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Event.objects.filter(pk=self.event.id).exists())
+
+    def test_writers_racing_on_one_etag(self):
+        url = f'/api/events/{self.event.id}/'
+        etag = self.client.get(url)['ETag']
+        data = {
+            'description': 'Written.', 'date': (now() + timedelta(days=2)).isoformat(),
+            'location': 'Nairobi', 'ticket_price': 10.0,
+        }
+        check = views.conditional_response
+        responses = []
+
+        def second_writer_in_between(request, *args, **kwargs):
+            # Both writers pass the If-Match check before either writes
+            response = check(request, *args, **kwargs)
+            if not responses:
+                responses.append(None)
+                responses.append(self.client.put(url, {**data, 'title': 'Second Writer'}, HTTP_IF_MATCH=etag))
+            return response
+
+        with mock.patch.object(views, 'conditional_response', second_writer_in_between):
+            first = self.client.put(url, {**data, 'title': 'First Writer'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(responses[1].status_code, status.HTTP_200_OK)
+        self.assertEqual(first.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Event.objects.get(pk=self.event.id).title, 'Second Writer')
+
+        # The same for deletes
+        etag = self.client.get(url)['ETag']
+        responses.clear()
+
+        def writer_before_delete(request, *args, **kwargs):
+            response = check(request, *args, **kwargs)
+            if not responses:
+                responses.append(None)
+                responses.append(self.client.put(url, {**data, 'title': 'Last Writer'}, HTTP_IF_MATCH=etag))
+            return response
+
+        with mock.patch.object(views, 'conditional_response', writer_before_delete):
+            response = self.client.delete(url, HTTP_IF_MATCH=etag)
+        self.assertEqual(responses[1].status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Event.objects.get(pk=self.event.id).title, 'Last Writer')
+
+    def test_list_not_modified(self):
+        for url in ['/api/events/list-events/', '/api/events/upcoming/']:
+            etag = self.client.get(url)['ETag']
+
+            # Served from the cached validators
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            # Checked against the page rows when the cache is cold
+            get_events_cache().clear()
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_is_cached(self):
+        self.client.get('/api/events/upcoming/')
+        with self.assertNumQueries(1):
+            # Only the (empty) upcoming index is read, not the token
+            response = self.client.get('/api/events/upcoming/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(get_token_cache().stats()['hits'], 1)
+
+    def test_logout_invalidates_token(self):
+        self.client.get('/api/events/upcoming/')
+        response = self.client.get('/api/users/logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Session authentication comes first on this view, so DRF answers 403
+        response = self.client.get('/api/events/upcoming/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivation_invalidates_user(self):
+        self.client.get('/api/events/upcoming/')
+        self.user.is_active = False
+        self.user.save()
+
+        # Session authentication comes first on this view, so DRF answers 403
+        response = self.client.get('/api/events/upcoming/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_logout_and_deactivation_reach_other_workers(self):
+        # Another worker's cache, sharing the stamp cache with this one
+        other = TokenCache(cache='default')
+        other_token = Token.objects.create(user=User.objects.create_user(username="other", password="testpassword"))
+        for token in (self.token, other_token):
+            other.set(token.key, token.user, token, time.time() - 1)
+
+        self.client.get('/api/users/logout/')
+        self.assertIsNone(other.get(self.token.key))
+
+        other_token.user.is_active = False
+        other_token.user.save()
+        self.assertIsNone(other.get(other_token.key))
+
+    def test_hits_build_fresh_users(self):
+        self.client.get('/api/events/upcoming/')
+        first, first_token = get_token_cache().get(self.token.key)
+        second, _ = get_token_cache().get(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertEqual((first.pk, first.username, first_token.user_id), (self.user.pk, "testuser", self.user.pk))
+        first.username = "changed"
+        self.assertEqual(second.username, "testuser")
+
+
+class BulkCreateEventTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.client.get('/api/events/upcoming/')  # warm the token cache
+
+    def make_events(self, count, prefix="Session"):
+        return [
+            {
+                'title': f'{prefix} {i}',
+                'description': 'Festival session.',
+                'date': (now() + timedelta(days=1, minutes=i)).isoformat(),
+                'location': 'Main Stage',
+                'ticket_price': 10.0,
+                'tags': ['festival', f'stage-{i % 3}'],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_with_tags(self):
+        Event.objects.create(title="Session 1", description="Taken.", date=now(), location="Hall", organizer=self.user)
+        events = self.make_events(4)
+        events[2]['ticket_price'] = 'free'
+        events.append(dict(events[0]))  # duplicate title inside the batch
+
+        response = self.client.post('/api/events/bulk-create/', events, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.data['created']], [0, 3])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 4])
+        self.assertIn('title', response.data['errors'][0]['errors'])
+        self.assertIn('ticket_price', response.data['errors'][1]['errors'])
+
+        event = Event.objects.get(pk=response.data['created'][1]['id'])
+        self.assertEqual(event.organizer, self.user)
+        self.assertEqual(sorted(event.tags.names()), ['festival', 'stage-0'])
+
+    def test_bulk_create_query_count_is_constant(self):
+        # Title check, event insert, tag lookup, slug check, tag insert, tag
+        # re-read, tag link insert, upcoming index insert, plus the
+        # transaction savepoint pair; then the tag counts: grouped links,
+        # update, and creating the rows of the new tags (lookup, insert,
+        # update); and the change log insert
+        ContentType.objects.get_for_model(Event)
+        for prefix, count in [("Small", 3), ("Large", 60)]:
+            with self.assertNumQueries(16):
+                response = self.client.post('/api/events/bulk-create/', {'events': self.make_events(count, prefix)}, format='json')
+            self.assertEqual(len(response.data['created']), count)
+            # Start the next batch with the same tags missing
+            Tag.objects.filter(name__startswith='stage-').delete()
+            Tag.objects.filter(name='festival').delete()
+
+    def test_bulk_create_limits(self):
+        response = self.client.post('/api/events/bulk-create/', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(EVENTS_BULK_CREATE_MAX_SIZE=2):
+            response = self.client.post('/api/events/bulk-create/', self.make_events(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportEventTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        for i in range(5):
+            event = Event.objects.create(
+                title=f"Export Event {i}",
+                description="Exported, with a \"quote\".",
+                date=now() + timedelta(days=i - 1),
+                location="Test Location",
+                ticket_price=10.5,
+                organizer=self.user
+            )
+            event.tags.add("export", f"tag-{i}")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_export_ndjson_matches_serializer(self):
+        with self.settings(EVENTS_EXPORT_CHUNK_SIZE=2):
+            response = self.client.get('/api/events/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        exported = [json.loads(line) for line in lines]
+        expected = EventSerializer(Event.objects.order_by('id'), many=True).data
+        self.assertEqual(exported, json.loads(json.dumps(expected)))
+
+    def test_export_csv_with_filters(self):
+        response = self.client.get('/api/events/export/', {'output': 'csv', 'upcoming': '1', 'tags': 'tag-3'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'description', 'date', 'location', 'latitude', 'longitude', 'ticket_price', 'tags', 'organizer'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1], "Export Event 3")
+        self.assertEqual(rows[1][8], "export,tag-3")
+
+    def test_export_unknown_format(self):
+        response = self.client.get('/api/events/export/', {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchEventTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+
+        def create(title, description, location, days, tags=()):
+            event = Event.objects.create(
+                title=title, description=description, location=location,
+                date=now() + timedelta(days=days), organizer=self.user
+            )
+            event.tags.add(*tags)
+            return event
+
+        self.title_hit = create("Jazz Night", "Live music by the lake.", "Kisumu", 3, ["music"])
+        self.description_hit = create("Friday Social", "Mixer with a jazz trio.", "Nairobi", 2, ["social"])
+        self.past_hit = create("Jazz Brunch", "Last year's brunch.", "Nairobi", -30, ["music"])
+        create("Tech Meetup", "Talks about Django.", "Nairobi", 1)
+
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def search(self, **params):
+        response = self.client.get('/api/events/search/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [event['id'] for event in response.data['events']]
+
+    def test_title_matches_rank_first(self):
+        ids = self.search(q="jazz")
+        self.assertEqual(set(ids), {self.title_hit.id, self.description_hit.id, self.past_hit.id})
+        self.assertEqual(ids[-1], self.description_hit.id)
+
+    def test_prefix_and_all_terms_match(self):
+        self.assertEqual(self.search(q="jaz kisu"), [self.title_hit.id])
+
+    def test_combined_with_filters(self):
+        self.assertEqual(self.search(q="jazz", upcoming="1", tags="music"), [self.title_hit.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.description_hit.description = "Mixer with a string quartet."
+        self.description_hit.save()
+        self.past_hit.delete()
+        self.assertEqual(self.search(q="jazz"), [self.title_hit.id])
+        self.assertEqual(self.search(q="quartet"), [self.description_hit.id])
+
+    def test_missing_query(self):
+        response = self.client.get('/api/events/search/', {'q': '  '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncEventViewTestCase(APITestCase):
+    def setUp(self):
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.event = Event.objects.create(
+            title="Async Event", description="Served by the async view.", location="Nairobi",
+            date=now() + timedelta(days=1), ticket_price=10.0, organizer=self.user
+        )
+        self.event.tags.add("music", "festival")
+        self.past_event = Event.objects.create(
+            title="Past Event", description="Already happened.", location="Nairobi",
+            date=now() - timedelta(days=1), organizer=self.user
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.async_client = AsyncClient()
+
+    def async_get(self, path, token=None, headers=None, **kwargs):
+        # AsyncClient only turns per-request headers into ASGI headers
+        headers = dict(headers or {})
+        token = self.token.key if token is None else token
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        return async_to_sync(self.async_client.get)(path, headers=headers, **kwargs)
+
+    def test_list_matches_sync_view(self):
+        sync_response = self.client.get('/api/events/list-events/', {'page_size': 1})
+        get_events_cache().clear()
+
+        response = self.async_get('/api/async/events/list-events/', data={'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.content, sync_response.content)
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+
+        next_page = self.async_get('/api/async/events/list-events/', data={'page_size': 1, 'cursor': response.json()['next']})
+        self.assertEqual([event['id'] for event in next_page.json()['events']], [self.event.id])
+
+    def test_upcoming_and_tag_filter(self):
+        response = self.async_get('/api/async/events/upcoming/', data={'tags': 'festival'})
+        self.assertEqual([event['id'] for event in response.json()['events']], [self.event.id])
+        self.assertEqual(sorted(response.json()['events'][0]['tags']), ['festival', 'music'])
+
+    def test_tag_filter_in_a_fresh_worker(self):
+        # Nothing has looked up the event content type yet
+        ContentType.objects.clear_cache()
+        response = self.async_get('/api/async/events/list-events/', data={'tags': 'music'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.json()['events']], [self.event.id])
+
+    def test_detail_and_conditional_get(self):
+        sync_response = self.client.get(f'/api/events/{self.event.id}/')
+        response = self.async_get(f'/api/async/events/{self.event.id}/')
+        self.assertEqual(response.content, sync_response.content)
+
+        response = self.async_get(f'/api/async/events/{self.event.id}/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.async_get('/api/async/events/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {'Message': 'No event record available'})
+
+    def test_authentication_errors_match_sync_views(self):
+        response = self.async_get('/api/async/events/list-events/', token='')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.async_get(f'/api/async/events/{self.event.id}/', token='')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+        response = self.async_get(f'/api/async/events/{self.event.id}/', token='not-a-token')
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+
+
+class ReplayRequestsTestCase(APITestCase):
+    def test_parse_http_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        http_file = Path(directory.name) / 'sample.http'
+        http_file.write_text(
+            "# Register\n"
+            "POST http://127.0.0.1:8000/api/users/register/ HTTP/1.1\n"
+            "content-type: application/json\n"
+            '{"username": "replay"}\n'
+            "#######\n"
+            "GET http://127.0.0.1:8000/api/events/search/?q=jazz HTTP/1.1\n"
+            "Authorization: Token generated token\n"
+            "#######\n"
+            "POST http://127.0.0.1:8000/api/events/create-event/ HTTP/1.1\n\n"
+            '{"ticket_price": (float-field required)}\n'
+            "#######\n"
+            "DELETE http://127.0.0.1:8000/api/events/3/delete/ HTTP/1.1\n"
+            "#######\n"
+        )
+        templates = parse_http_file(http_file)
+
+        self.assertEqual([template['name'] for template in templates], ['POST /api/users/register/', 'GET /api/events/search/'])
+        self.assertEqual(templates[0]['body'], {'username': 'replay'})
+        self.assertEqual(templates[1]['query'], 'q=jazz')
+
+    def test_in_process_target_counts_queries(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        event = Event.objects.create(title="Replayed", description="-", location="Nairobi",
+                                     date=now() + timedelta(days=1), organizer=user)
+        token = Token.objects.create(user=user)
+        render = RequestRenderer([event.id])
+
+        request = render({'name': 'detail', 'method': 'GET', 'path': '/api/events/{event_id}/'})
+        self.assertEqual(request['path'], f'/api/events/{event.id}/')
+        status_code, queries = InProcessTarget(token.key).send(request)
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(queries, 2)
+
+        first, second = (render({'name': 'create', 'method': 'POST', 'path': '/', 'body': {'title': 'Event {n}'}}) for _ in range(2))
+        self.assertNotEqual(first['body']['title'], second['body']['title'])
+
+
+@override_settings(PERFORMANCE_METRICS={'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True, 'METRICS_ALLOWED_IPS': ['127.0.0.1']})
+class PerformanceMetricsTestCase(APITestCase):
+    def setUp(self):
+        registry.clear()
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.event = Event.objects.create(title="Measured Event", description="-", location="Nairobi",
+                                          date=now() + timedelta(days=1), organizer=self.user)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def server_timing(self, response):
+        return dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+
+    def test_server_timing_header(self):
+        response = self.client.get(f'/api/events/{self.event.id}/')
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing) - {'auth'}, {'total', 'db', 'serialize', 'render'})
+        self.assertIn('desc="3 queries"', timing['db'])
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/events/list-events/')
+        self.client.get('/api/events/list-events/')
+        self.client.get(f'/api/events/{self.event.id}/')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('apis_requests_total{endpoint="api/events/list-events/",method="GET",status="200"} 2', body)
+        self.assertIn('apis_request_duration_seconds_count{endpoint="api/events/<int:pk>/",method="GET"} 1', body)
+        self.assertIn('apis_request_queries_bucket{endpoint="api/events/<int:pk>/",method="GET",le="3"} 1', body)
+        self.assertIn('apis_request_phase_seconds_count{endpoint="api/events/<int:pk>/",method="GET",phase="serialize"} 1', body)
+        self.assertNotIn('endpoint="metrics"', body)
+
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_async_views_are_measured(self):
+        response = async_to_sync(AsyncClient().get)(
+            f'/api/async/events/{self.event.id}/', headers={'Authorization': f'Token {self.token.key}'}
+        )
+        self.assertIn('desc="3 queries"', self.server_timing(response)['db'])
+
+    @override_settings(PERFORMANCE_METRICS={'SAMPLE_RATE': 0.0})
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(f'/api/events/{self.event.id}/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.requests, {})
+
+
+class EventValuesSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        prices = [0.0, 99.99, 1e-05, 1e16, 2500.5]
+        titles = ["Plain", "Ünïcödé – café", "Line\u2028separator", "Quote \" and \\ slash", "Emoji 🎉"]
+        for index, (title, price) in enumerate(zip(titles, prices)):
+            event = Event.objects.create(
+                title=title, description=f"Description\n{index}\t<b>", location="Nairobi",
+                date=now() + timedelta(days=index, microseconds=index * 7), ticket_price=price, organizer=self.user
+            )
+            event.tags.add(*["music", "art", "food"][:index % 4])
+
+    def render_both(self, events):
+        expected = JSONRenderer().render(EventSerializer(events, many=True).data)
+        rows = Event.objects.filter(id__in=[event.id for event in events]).order_by('id')
+        data = EventValuesSerializer(list(rows.values_list(*EventValuesSerializer.value_fields, named=True))).data
+        return expected, data
+
+    def test_byte_compatible_with_event_serializer(self):
+        events = list(Event.objects.with_related().order_by('id'))
+        expected, data = self.render_both(events)
+        self.assertFalse(data.orjson_safe)  # 1e-05 and 1e16 need the stdlib encoder
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(FastJSONRenderer().render({'events': data, 'next': None}), JSONRenderer().render({'events': json.loads(expected), 'next': None}))
+
+        safe_events = [event for event in events if event.ticket_price in (0.0, 99.99, 2500.5)]
+        expected, data = self.render_both(safe_events)
+        self.assertTrue(data.orjson_safe)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(FastJSONRenderer().render({'events': data, 'next': 'abc'}), JSONRenderer().render({'events': json.loads(expected), 'next': 'abc'}))
+
+    def test_unmarked_data_uses_json_renderer(self):
+        data = {'price': 1e16, 'rows': JSONRows([{'a': 1}]), 'nested': {'b': 1e-05}}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_list_endpoint_matches_event_serializer(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        get_events_cache().clear()
+        response = self.client.get('/api/events/list-events/')
+        events = Event.objects.with_related().order_by('date', 'id')
+        expected = {'events': EventSerializer(events, many=True).data, 'next': None, 'previous': None}
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+
+class UpcomingEventIndexTestCase(APITestCase):
+    def setUp(self):
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.events = [
+            Event.objects.create(
+                title=f"Indexed Event {days}", description="Upcoming index.", location="Test Location",
+                date=now() + timedelta(days=days), organizer=self.user
+            )
+            for days in (-1, 1, 3)
+        ]
+
+    def indexed(self):
+        return set(UpcomingEvent.objects.values_list('event_id', flat=True))
+
+    def test_index_follows_event_writes(self):
+        past, soon, later = self.events
+        self.assertEqual(self.indexed(), {soon.id, later.id})
+
+        soon.date = now() - timedelta(hours=1)
+        soon.save()
+        past.date = now() + timedelta(days=2)
+        past.save()
+        self.assertEqual(self.indexed(), {past.id, later.id})
+        self.assertEqual(UpcomingEvent.objects.get(pk=past.id).date, past.date)
+
+        later.delete()
+        self.assertEqual(self.indexed(), {past.id})
+
+    def test_read_rolls_over_passed_boundary(self):
+        past, soon, later = self.events
+        self.assertEqual(list(Event.objects.upcoming().order_by('date')), [soon, later])
+
+        # Two days later the first upcoming event has started
+        with mock.patch('apis.upcoming.now', return_value=now() + timedelta(days=2)):
+            self.assertEqual(list(Event.objects.upcoming()), [later])
+        self.assertEqual(self.indexed(), {later.id})
+
+        self.assertEqual(rollover(at=now() + timedelta(days=4)), 1)
+        self.assertFalse(Event.objects.upcoming().exists())
+
+    def test_upcoming_endpoint_uses_index(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        UpcomingEvent.objects.filter(pk=self.events[2].pk).delete()
+        response = self.client.get('/api/events/upcoming/')
+        self.assertEqual([event['id'] for event in response.data['events']], [self.events[1].id])
+
+    def test_events_added_by_other_workers_are_listed(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(list(Event.objects.upcoming()), [self.events[1], self.events[2]])
+
+        # Another worker's write bumps its own events version and boundary, not this one's
+        with mock.patch('apis.signals.bump_events_version'), mock.patch.object(boundary, 'clear'):
+            sooner = Event.objects.create(
+                title="Sooner Event", description="Added elsewhere.", location="Test Location",
+                date=now() + timedelta(hours=1), organizer=self.user
+            )
+        get_events_cache().clear()
+        response = self.client.get('/api/events/upcoming/')
+        self.assertIn(sooner.id, [event['id'] for event in response.data['events']])
+
+        # Its rollover is noticed once the cached boundary expires
+        with mock.patch('apis.upcoming.now', return_value=now() + timedelta(hours=2)), \
+                mock.patch('apis.upcoming.time.monotonic', return_value=time.monotonic() + 60):
+            self.assertEqual(list(Event.objects.upcoming().order_by('date')), [self.events[1], self.events[2]])
+
+    def test_scheduler_keeps_earliest_rollover(self):
+        scheduler = RolloverScheduler()
+        self.addCleanup(scheduler.cancel)
+        later, sooner = now() + timedelta(days=2), now() + timedelta(days=1)
+        scheduler.schedule(later)
+        scheduler.schedule(sooner)
+        scheduler.schedule(later)
+        self.assertEqual(scheduler.next_run, sooner)
+
+    def test_rollover_command_rebuilds_index(self):
+        UpcomingEvent.objects.all().delete()
+        out = StringIO()
+        call_command('rollover_upcoming', '--rebuild', stdout=out)
+        self.assertIn('Rebuilt the upcoming events index: 2 events.', out.getvalue())
+        self.assertEqual(self.indexed(), {self.events[1].id, self.events[2].id})
+
+
+class EventTagsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.past = self.create_event("Past", -1, "music", "Museum")
+        self.soon = self.create_event("Soon", 1, "music", "art")
+        self.later = self.create_event("Later", 2, "music", "food")
+
+    def create_event(self, title, days, *tags):
+        event = Event.objects.create(
+            title=title, description="Tagged.", location="Test Location",
+            date=now() + timedelta(days=days), organizer=self.user
+        )
+        event.tags.add(*tags)
+        return event
+
+    def facets(self, **params):
+        response = self.client.get('/api/events/tags/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(tag['name'], tag['count']) for tag in response.data['tags']]
+
+    def test_facets_and_prefix(self):
+        self.assertEqual(self.facets(), [('music', 3), ('art', 1), ('food', 1), ('Museum', 1)])
+        self.assertEqual(self.facets(upcoming=1), [('music', 2), ('art', 1), ('food', 1)])
+        self.assertEqual(self.facets(prefix='MU'), [('music', 3), ('Museum', 1)])
+        self.assertEqual(self.facets(prefix='mu', upcoming='true'), [('music', 2)])
+        self.assertEqual(self.facets(limit=1), [('music', 3)])
+
+    def test_counts_follow_writes(self):
+        self.soon.tags.remove("art")
+        self.later.tags.set(["food", "art"])
+        self.past.tags.clear()
+        self.assertEqual(self.facets(), [('art', 1), ('food', 1), ('music', 1)])
+
+        self.soon.date = now() - timedelta(hours=1)
+        self.soon.save()
+        self.later.delete()
+        self.assertEqual(self.facets(), [('music', 1)])
+        self.assertEqual(self.facets(upcoming=1), [])
+
+        bulk = [{"title": f"Bulk {i}", "description": "Bulk.", "date": (now() + timedelta(days=3)).isoformat(),
+                 "location": "Test Location", "tags": ["music", "bulk"]} for i in range(3)]
+        self.client.post('/api/events/bulk-create/', {'events': bulk}, format='json')
+        self.assertEqual(self.facets(upcoming=1), [('bulk', 3), ('music', 3)])
+
+    def test_rollover_updates_upcoming_counts(self):
+        with mock.patch('apis.upcoming.now', return_value=now() + timedelta(days=1, hours=12)):
+            self.assertEqual(self.facets(upcoming=1), [('food', 1), ('music', 1)])
+
+    def test_counts_match_rebuild(self):
+        self.later.tags.add("art")
+        expected = self.facets()
+        self.assertEqual(rebuild_tag_counts(), 4)
+        self.assertEqual(self.facets(), expected)
+
+
+class NearbyEventTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.kicc = self.create_event("KICC", "KICC, Nairobi", latitude=-1.2889, longitude=36.8231)
+        self.karen = self.create_event("Karen", "Karen", latitude=-1.3193, longitude=36.7073)
+        self.thika = self.create_event("Thika", "Thika")  # geocoded
+        self.mombasa = self.create_event("Mombasa", "Mombasa", days=-1)
+        self.nowhere = self.create_event("Nowhere", "Somewhere unknown")
+
+    def create_event(self, title, location, days=1, **coordinates):
+        return Event.objects.create(
+            title=title, description="Located.", location=location,
+            date=now() + timedelta(days=days), organizer=self.user, **coordinates
+        )
+
+    def nearby(self, **params):
+        response = self.client.get('/api/events/nearby/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(event['title'], event['distance_km']) for event in response.data['events']]
+
+    def test_geohash_and_geocoding(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 9), 'u4pruydqq')
+        self.assertEqual(self.thika.geohash, geo.encode(*geo.GAZETTEER['thika']))
+        self.assertIsNone(self.nowhere.geohash)
+        self.assertEqual(geo.geocode("Old Town,  MOMBASA"), geo.GAZETTEER['mombasa'])
+
+    def test_nearby_sorted_by_distance(self):
+        results = self.nearby(near='Nairobi', radius=50)
+        self.assertEqual([title for title, _ in results], ["KICC", "Karen", "Thika"])
+        self.assertEqual(results[0][1], round(geo.haversine_km(*geo.GAZETTEER['nairobi'], -1.2889, 36.8231), 3))
+        self.assertTrue(all(distance <= 50 for _, distance in results))
+
+        self.assertEqual([title for title, _ in self.nearby(lat=-1.3193, lon=36.7073, radius=5)], ["Karen"])
+        self.assertEqual([title for title, _ in self.nearby(lat=-1.29, lon=36.82, radius=500, limit=2)], ["KICC", "Karen"])
+        self.assertEqual([title for title, _ in self.nearby(near='Mombasa', radius=20)], ["Mombasa"])
+        self.assertEqual(self.nearby(near='Mombasa', radius=20, upcoming=1), [])
+
+    def test_location_change_moves_the_event(self):
+        event = self.create_event("Moving", "Nairobi")
+        self.assertIn("Moving", [title for title, _ in self.nearby(near='Nairobi', radius=20)])
+
+        serializer = EventSerializer(event, data={'location': "Mombasa"}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        event.refresh_from_db()
+        self.assertEqual((event.latitude, event.longitude), geo.GAZETTEER['mombasa'])
+        self.assertEqual(event.geohash, geo.encode(*geo.GAZETTEER['mombasa']))
+        self.assertNotIn("Moving", [title for title, _ in self.nearby(near='Nairobi', radius=20)])
+        self.assertIn("Moving", [title for title, _ in self.nearby(near='Mombasa', radius=20)])
+
+        # Coordinates sent with the new location win over the gazetteer
+        serializer = EventSerializer(event, data={'location': "Thika", 'latitude': -1.2889, 'longitude': 36.8231}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        event.refresh_from_db()
+        self.assertEqual((event.latitude, event.longitude), (-1.2889, 36.8231))
+
+        # An unknown place has no coordinates rather than the previous ones
+        event.location = "Somewhere unknown"
+        event.save()
+        self.assertIsNone(Event.objects.get(pk=event.pk).geohash)
+
+    def test_covering_cells_contain_the_circle(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            latitude, longitude = rng.uniform(-60, 60), rng.uniform(-170, 170)
+            radius = 10 ** rng.uniform(-1, 3)
+            prefixes = geo.covering_prefixes(latitude, longitude, radius)
+            for _ in range(20):
+                # A point on the circle's edge, where misses would show up
+                bearing = rng.uniform(0, 2 * math.pi)
+                point_lat = latitude + radius * math.cos(bearing) / geo.KM_PER_DEGREE * 0.999
+                point_lon = longitude + radius * math.sin(bearing) / geo.KM_PER_DEGREE / math.cos(math.radians(point_lat)) * 0.999
+                if geo.haversine_km(latitude, longitude, point_lat, point_lon) > radius:
+                    continue
+                self.assertTrue(any(geo.encode(point_lat, point_lon).startswith(prefix) for prefix in prefixes))
+
+    def test_nearby_validation(self):
+        for params in [{}, {'lat': 'x', 'lon': 1}, {'lat': 91, 'lon': 0}, {'near': 'Atlantis'},
+                       {'near': 'Nairobi', 'radius': 0}, {'near': 'Nairobi', 'radius': 100000}]:
+            response = self.client.get('/api/events/nearby/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/events/create-event/', {
+            "title": "Half located", "description": "Half.", "location": "Nairobi",
+            "date": (now() + timedelta(days=1)).isoformat(), "latitude": 1,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def throttle_rates(**rates):
+    return override_settings(EVENTS_THROTTLE={
+        **get_throttle_settings(),
+        'RATES': {'token_read': '1000/min', 'token_write': '1000/min', 'ip_read': '1000/min', 'ip_write': '1000/min', **rates},
+    })
+
+
+class ThrottleTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_refill(self):
+        self.assertEqual(refill(None, 10, 1.0, 100.0), 10)
+        self.assertEqual(refill((2.5, 100.0), 10, 1.0, 104.0), 6.5)
+        self.assertEqual(refill((2.5, 100.0), 10, 1.0, 200.0), 10)
+
+    @mock.patch('apis.throttling.time.time', return_value=1_000_030.0)
+    def test_cache_store_counts_concurrent_requests_once(self, _):
+        cache.clear()
+        store = CacheBucketStore()
+        barrier = threading.Barrier(20)
+        results = []
+
+        def consume():
+            barrier.wait()
+            results.append(store.consume('racing', 10, 10 / 60))
+        threads = [threading.Thread(target=consume) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(allowed for allowed, *_ in results), 10)
+        # The minute's window ends 50 seconds later
+        self.assertEqual(store.consume('racing', 10, 10 / 60), (False, 0, 50.0, 50.0))
+
+    @throttle_rates(token_read='2/min')
+    def test_token_read_budget(self):
+        responses = [self.client.get('/api/events/upcoming/') for _ in range(3)]
+        self.assertEqual([response['X-RateLimit-Remaining'] for response in responses[:2]], ['1', '0'])
+        self.assertEqual(responses[0]['X-RateLimit-Limit'], '2')
+        self.assertEqual(responses[2].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(responses[2]['Retry-After'], '30')
+
+        # Other tokens have their own budget
+        other = User.objects.create_user(username="otheruser", password="testpassword")
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(self.client.get('/api/events/upcoming/').status_code, status.HTTP_404_NOT_FOUND)
+
+    @throttle_rates(token_write='1/min')
+    def test_writes_have_their_own_budget(self):
+        event = {"title": "Throttled", "description": "Write.", "location": "Nairobi", "date": (now() + timedelta(days=1)).isoformat()}
+        self.assertEqual(self.client.post('/api/events/create-event/', event, format='json').status_code, status.HTTP_201_CREATED)
+        event['title'] = "Throttled again"
+        self.assertEqual(self.client.post('/api/events/create-event/', event, format='json').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get('/api/events/upcoming/').status_code, status.HTTP_200_OK)
+
+    @throttle_rates(ip_write='1/hour')
+    def test_anonymous_requests_use_ip_budget(self):
+        self.client.credentials()
+        credentials = {'username': 'testuser', 'password': 'testpassword'}
+        self.assertEqual(self.client.post('/api/users/login/', credentials).status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/users/login/', credentials, REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '3600')
+        self.assertEqual(self.client.post('/api/users/login/', credentials, REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    @throttle_rates(token_read='1/min')
+    def test_async_views_are_throttled(self):
+        headers = {'Authorization': f'Token {self.token.key}'}
+        client = AsyncClient()
+        first = async_to_sync(client.get)('/api/async/events/upcoming/', headers=headers)
+        self.assertEqual(first['X-RateLimit-Remaining'], '0')
+        response = async_to_sync(client.get)('/api/async/events/upcoming/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60')
+
+
+def password_hashing(**options):
+    return override_settings(PASSWORD_HASHING={**get_hashing_settings(), **options})
+
+
+class PasswordHashingTestCase(APITestCase):
+    credentials = {"username": "testuser", "email": "testuser@example.com", "password": "password123"}
+
+    @password_hashing(ITERATIONS=1000, POOL_SIZE=0)
+    def test_register_and_login_queries(self):
+        # Unique username check, user and token inserts in a savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/users/register/', self.credentials)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['token'], Token.objects.get(user__username="testuser").key)
+        self.assertNotIn('password', response.data['user'])
+
+        # The user, then their token
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/users/login/', self.credentials)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['username'], "testuser")
+
+    def test_login_rehashes_with_the_configured_iterations(self):
+        with password_hashing(ITERATIONS=1000, POOL_SIZE=0):
+            user = User.objects.create_user(username="testuser", password="password123")
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with password_hashing(ITERATIONS=2000, POOL_SIZE=0):
+            response = self.client.post('/api/users/login/', self.credentials)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(user.check_password("password123"))
+
+    def test_pool_hashes_like_the_request_thread(self):
+        with password_hashing(ITERATIONS=1000, POOL_SIZE=0):
+            inline = make_password("password123", salt="fixedsalt")
+        with password_hashing(ITERATIONS=1000, POOL_SIZE=1):
+            self.assertEqual(make_password("password123", salt="fixedsalt"), inline)
+            self.assertTrue(check_password("password123", inline))
+
+
+    def test_broken_pool_falls_back_to_the_request_thread(self):
+        pool = HashingPool(1, retry_seconds=60)
+        self.addCleanup(pool.shutdown)
+        with mock.patch('apis.hashers.ProcessPoolExecutor') as executor_class:
+            executor_class.return_value.submit.return_value.result.side_effect = BrokenProcessPool()
+            with self.assertLogs('apis.hashers', 'ERROR'):
+                self.assertEqual(pool.run(divmod, 7, 2), (3, 1))
+            # No new pool to spawn (and break) on every hash
+            self.assertEqual(pool.run(divmod, 7, 2), (3, 1))
+            self.assertEqual(executor_class.call_count, 1)
+
+            with mock.patch('apis.hashers.time.monotonic', return_value=time.monotonic() + 61), self.assertLogs('apis.hashers', 'ERROR'):
+                pool.run(divmod, 7, 2)
+            self.assertEqual(executor_class.call_count, 2)
+
+
+class CompressionTestCase(APITestCase):
+    def setUp(self):
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        for i in range(20):
+            event = Event.objects.create(
+                title=f"Compressed Event {i}",
+                description="A listing with plenty of repeated keys.",
+                date=now() + timedelta(days=i + 1),
+                location="Nairobi",
+                organizer=self.user
+            )
+            event.tags.add("music", "festival")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate, br', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('*', ('gzip',)), 'gzip')
+        self.assertIsNone(negotiate_encoding('gzip;q=0, identity', ('gzip',)))
+        self.assertIsNone(negotiate_encoding('', ('br', 'gzip')))
+
+    def test_gzip_list(self):
+        plain = self.client.get('/api/events/list-events/')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/events/list-events/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 4)
+        # Another representation: its own strong ETag
+        self.assertEqual(response['ETag'], plain['ETag'][:-1] + '-gzip"')
+
+        etag = response['ETag']
+        response = self.client.get('/api/events/list-events/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/api/events/list-events/', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response['ETag'], plain['ETag'])
+
+    def test_if_match_with_compressed_etag(self):
+        event = Event.objects.create(
+            title="Long Event", description="A long description. " * 100, date=now() + timedelta(days=1),
+            location="Nairobi", organizer=self.user
+        )
+        response = self.client.get(f'/api/events/{event.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        response = self.client.put(f'/api/events/{event.id}/', {
+            'title': "Long Event", 'description': "Shorter.", 'date': (now() + timedelta(days=2)).isoformat(),
+            'location': "Nairobi", 'ticket_price': 5.0,
+        }, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_html_pages_are_not_compressed(self):
+        # CSRF tokens next to reflected input: compressing them invites BREACH
+        self.client.credentials()
+        response = self.client.get('/admin/login/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(len(response.content), 1024)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_small_bodies_are_not_compressed(self):
+        response = self.client.get('/api/events/list-events/', {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_streaming_export(self):
+        plain = b''.join(self.client.get('/api/events/export/').streaming_content)
+        response = self.client.get('/api/events/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli_preferred(self):
+        plain = self.client.get('/api/events/list-events/')
+        response = self.client.get('/api/events/list-events/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_list(self):
+        plain = self.client.get('/api/events/upcoming/')
+        response = self.client.get('/api/events/upcoming/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(plain.content))
+        self.assertNotEqual(response['ETag'], plain['ETag'])
+        self.assertIn('Accept', response['Vary'])
+
+
+@override_settings(DATABASE_REPLICAS={'ALIASES': ['replica1'], 'STICKY_SECONDS': 5, 'CACHE': 'default'})
+class ReplicaRoutingTestCase(APITestCase):
+    def setUp(self):
+        # A replica alias sharing the test database's connection
+        connections.settings['replica1'] = connections['default'].settings_dict
+        connections['replica1'] = connections['default']
+        self.addCleanup(connections.settings.pop, 'replica1')
+        self.addCleanup(connections.__delitem__, 'replica1')
+        get_events_cache().clear()
+        cache.clear()
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.other_user = User.objects.create_user(username="otheruser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.other_token = Token.objects.create(user=self.other_user)
+        Event.objects.create(title="Replicated Event", description="Read from a replica.", date=now() + timedelta(days=1), location="Nairobi", organizer=self.user)
+
+        self.reads = []
+        db_for_read = PrimaryReplicaRouter.db_for_read
+
+        def record_read(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            self.reads.append(alias)
+            return alias
+        patcher = mock.patch.object(PrimaryReplicaRouter, 'db_for_read', record_read)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, path, token):
+        self.reads.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return self.client.get(path)
+
+    def test_read_views_use_the_replica(self):
+        response = self.get('/api/events/list-events/', self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The token lookup runs before routing
+        self.assertIn('replica1', self.reads)
+        self.assertEqual(self.reads[0], None)
+
+        self.get(f"/api/events/{Event.objects.get().pk}/", self.token)
+        self.assertIn('replica1', self.reads)
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        self.assertEqual(self.get('/api/events/list-events/', self.token)['X-Cache'], 'MISS')
+
+        self.reads.clear()
+        response = self.client.post('/api/events/create-event/', {
+            "title": "Fresh Event", "description": "Just written.", "location": "Nairobi",
+            "date": (now() + timedelta(days=2)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('replica1', self.reads)
+
+        # Pinned to the primary, and past pages a replica may have filled
+        response = self.get('/api/events/list-events/', self.token)
+        self.assertNotIn('replica1', self.reads)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['events']), 2)
+
+        # Other users keep reading replicas (here the cache the pinned read refreshed)
+        self.assertEqual(self.get('/api/events/list-events/', self.other_token)['X-Cache'], 'HIT')
+        detail = f"/api/events/{response.data['events'][0]['id']}/"
+        self.get(detail, self.other_token)
+        self.assertIn('replica1', self.reads)
+        self.get(detail, self.token)
+        self.assertNotIn('replica1', self.reads)
+
+        cache.clear()  # the sticky window ends
+        self.get(detail, self.token)
+        self.assertIn('replica1', self.reads)
+
+    def test_pages_read_from_replicas_expire_with_the_sticky_window(self):
+        backend = get_events_cache().backend
+        with mock.patch.object(backend, 'set', wraps=backend.set) as cache_set:
+            self.assertEqual(self.get('/api/events/list-events/', self.token)['X-Cache'], 'MISS')
+            async_to_sync(AsyncClient().get)('/api/async/events/upcoming/', headers={'Authorization': f'Token {self.token.key}'})
+        # A lagging replica may have filled them after a writer bumped the version
+        self.assertEqual([call.kwargs['timeout'] for call in cache_set.call_args_list], [5, 5])
+
+    def test_lazy_rollover_does_not_pin_readers(self):
+        Event.objects.create(title="Later Event", description="Still upcoming.", date=now() + timedelta(days=3), location="Nairobi", organizer=self.user)
+        with mock.patch('apis.upcoming.now', return_value=now() + timedelta(days=2)):
+            response = self.get('/api/events/upcoming/', self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(UpcomingEvent.objects.filter(event__title="Replicated Event").exists())
+        self.assertFalse(is_pinned_to_primary(self.user.pk))
+
+    def test_streamed_responses_release_the_routing_state(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        # Earlier tests may leave unread streams behind
+        before = _state.get()
+        response = self.client.get('/api/events/export/')
+        self.assertTrue(response.streaming)
+        b''.join(response.streaming_content)
+        self.assertIn('replica1', self.reads)
+        self.assertIs(_state.get(), before)
+
+    def test_async_read_views_use_the_replica(self):
+        response = async_to_sync(AsyncClient().get)('/api/async/events/list-events/', headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('replica1', self.reads)
+
+    def test_replicas_are_not_migrated_or_written(self):
+        router = PrimaryReplicaRouter()
+        self.assertIs(router.allow_migrate('replica1', 'apis'), False)
+        self.assertIsNone(router.allow_migrate('default', 'apis'))
+        self.assertEqual(router.db_for_write(Event), 'default')
+
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = Path(directory) / 'primary.sqlite3', Path(directory) / 'replica.sqlite3'
+            with sqlite3.connect(source) as connection:
+                connection.execute('CREATE TABLE events (title TEXT)')
+                connection.execute("INSERT INTO events VALUES ('Copied')")
+            connection.close()
+            copy_database(source, target)
+            copy_database(source, target)
+            connection = sqlite3.connect(target)
+            self.assertEqual(connection.execute('SELECT title FROM events').fetchall(), [('Copied',)])
+            connection.close()
+
+
+class EventChangesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.start = EventChange.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+    def create_event(self, title, **fields):
+        return Event.objects.create(title=title, description="Changing.", date=now() + timedelta(days=1), location="Nairobi", organizer=self.user, **fields)
+
+    def test_changes_since(self):
+        kept, dropped = self.create_event("Kept Event"), self.create_event("Dropped Event")
+        kept.tags.add("music")
+        kept.title = "Renamed Event"
+        kept.save()
+        dropped_id = dropped.pk
+        dropped.delete()
+
+        response = self.client.get('/api/events/changes/', {'since': self.start})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # One entry per event: its last change, with the current representation
+        changes = response.data['changes']
+        self.assertEqual([(change['id'], change['action']) for change in changes], [(kept.pk, 'updated'), (dropped_id, 'deleted')])
+        self.assertEqual(changes[0]['event']['title'], "Renamed Event")
+        self.assertEqual(changes[0]['event']['tags'], ["music"])
+        self.assertIsNone(changes[1]['event'])
+        self.assertFalse(response.data['has_more'])
+
+        response = self.client.get('/api/events/changes/', {'since': response.data['next']})
+        self.assertEqual(response.data['changes'], [])
+
+    def test_pages_and_bulk_creates(self):
+        response = self.client.post('/api/events/bulk-create/', {'events': [
+            {"title": f"Bulk {i}", "description": "Bulk.", "location": "Nairobi", "date": (now() + timedelta(days=1)).isoformat()}
+            for i in range(3)
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        first = self.client.get('/api/events/changes/', {'since': self.start, 'limit': 2}).data
+        self.assertTrue(first['has_more'])
+        second = self.client.get('/api/events/changes/', {'since': first['next'], 'limit': 2}).data
+        self.assertFalse(second['has_more'])
+        titles = [change['event']['title'] for change in first['changes'] + second['changes']]
+        self.assertEqual(titles, ["Bulk 0", "Bulk 1", "Bulk 2"])
+
+        self.assertEqual(self.client.get('/api/events/changes/', {'since': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream(self):
+        backlog = self.create_event("Backlog Event")
+
+        async def read_stream():
+            stream = broadcaster.stream(self.start)
+            messages = [await anext(stream), await anext(stream)]
+            live = await sync_to_async(self.create_event)("Live Event")
+            # on_commit doesn't run inside the test's transaction
+            broadcaster.notify()
+            messages.append(await anext(stream))
+            await stream.aclose()
+            return live, messages
+
+        live, messages = async_to_sync(read_stream)()
+        self.assertEqual(messages[0], b'retry: 3000\n\n')
+        for message, event in zip(messages[1:], [backlog, live]):
+            lines = message.decode().split('\n')
+            self.assertEqual(lines[1], 'event: change')
+            change = json.loads(lines[2][len('data: '):])
+            self.assertEqual(lines[0], f"id: {change['seq']}")
+            self.assertEqual((change['id'], change['action'], change['event']['title']), (event.pk, 'created', event.title))
+
+    @override_settings(EVENTS_CHANGES={'HEARTBEAT_SECONDS': 0.05})
+    def test_stream_polls_for_other_workers_writes(self):
+        async def read_stream():
+            stream = broadcaster.stream(self.start)
+            await anext(stream)
+            # Written by another process: nothing notifies this one
+            event = await sync_to_async(self.create_event)("Remote Event")
+            message = await anext(stream)
+            while message == b': keepalive\n\n':
+                message = await anext(stream)
+            await stream.aclose()
+            return event, message
+
+        event, message = async_to_sync(read_stream)()
+        change = json.loads(message.decode().split('\n')[2][len('data: '):])
+        self.assertEqual((change['id'], change['action']), (event.pk, 'created'))
+
+    def test_stream_view(self):
+        self.create_event("Streamed Event")
+
+        async def first_messages():
+            response = await AsyncClient().get('/api/async/events/changes/stream/', headers={
+                'Authorization': f'Token {self.token.key}', 'Last-Event-ID': str(self.start),
+            })
+            content = response.streaming_content
+            messages = [await anext(content), await anext(content)]
+            await content.aclose()
+            return response, messages
+
+        response, messages = async_to_sync(first_messages)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(b'"title":"Streamed Event"', messages[1])
+
+
+class BatchEventTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.events = []
+        for i in range(20):
+            event = Event.objects.create(title=f"Saved Event {i}", description="Saved.", date=now() + timedelta(days=1), location="Nairobi", organizer=self.user)
+            event.tags.add("music", f"tag{i}")
+            self.events.append(event)
+
+    def test_order_and_missing_ids(self):
+        first, second = self.events[0], self.events[1]
+        response = self.client.get('/api/events/batch/', {'ids': f'{second.pk},{first.pk},999999,{second.pk}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data['events']], [second.pk, first.pk])
+        self.assertEqual(response.data['events'][0], EventSerializer(second).data)
+        self.assertEqual(response.data['missing'], [999999])
+
+        response = self.client.post('/api/events/batch/', {'ids': [first.pk, 999999]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['title'] for event in response.data['events']], ["Saved Event 0"])
+        self.assertEqual(response.data['missing'], [999999])
+
+    def test_constant_queries(self):
+        # Caches the token
+        self.client.get('/api/events/batch/', {'ids': self.events[0].pk})
+        for count in [1, 20]:
+            ids = ','.join(str(event.pk) for event in reversed(self.events[:count]))
+            # The rows and their tags
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/events/batch/', {'ids': ids})
+            self.assertEqual(len(response.data['events']), count)
+            self.assertTrue(all(len(event['tags']) == 2 for event in response.data['events']))
+
+    def test_invalid_and_too_many_ids(self):
+        for params in [{}, {'ids': 'x'}, {'ids': ','}]:
+            self.assertEqual(self.client.get('/api/events/batch/', params).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post('/api/events/batch/', {'ids': 'x'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(EVENTS_BATCH_MAX_SIZE=2):
+            response = self.client.post('/api/events/batch/', [event.pk for event in self.events[:3]], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        get_events_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        for i in range(10):
+            event = Event.objects.create(
+                title=f"Sparse Event {i}", description="A long description. " * 20, date=now() + timedelta(days=1, minutes=i),
+                location="Nairobi", ticket_price=25.0, organizer=self.user
+            )
+            event.tags.add("music", f"tag{i}")
+        self.event = event
+        # Caches the token and the content type
+        self.client.get('/api/events/list-events/')
+
+    def test_list_fields_skip_columns_and_tags(self):
+        for url in ['/api/events/list-events/', '/api/events/upcoming/']:
+            full = self.client.get(url)
+            get_events_cache().clear()
+            # The page only: no tag query
+            with self.assertNumQueries(1):
+                sparse = self.client.get(url, {'fields': 'date,title,id'})
+            self.assertEqual(sparse.status_code, status.HTTP_200_OK)
+            self.assertEqual([list(event) for event in sparse.data['events']], [['id', 'title', 'date']] * 10)
+            self.assertEqual(sparse.data['events'], [
+                {'id': event['id'], 'title': event['title'], 'date': event['date']} for event in full.data['events']
+            ])
+            self.assertLess(len(sparse.content) * 5, len(full.content))
+            self.assertNotEqual(sparse['ETag'], full['ETag'])
+
+            # Cached apart from the full page
+            again = self.client.get(url, {'fields': 'id,title,date'})
+            self.assertEqual(again['X-Cache'], 'HIT')
+            self.assertEqual(again.content, sparse.content)
+
+            with_tags = self.client.get(url, {'fields': 'id,tags'})
+            self.assertEqual(with_tags.data['events'][0], {'id': full.data['events'][0]['id'], 'tags': full.data['events'][0]['tags']})
+
+        sparse = self.client.get('/api/events/list-events/', {'fields': 'id', 'page_size': 4})
+        next_page = self.client.get('/api/events/list-events/', {'fields': 'id', 'page_size': 4, 'cursor': sparse.data['next']})
+        self.assertEqual(len(next_page.data['events']), 4)
+        self.assertEqual(self.client.get('/api/events/list-events/', {'fields': 'id,secret'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_fields(self):
+        url = f'/api/events/{self.event.id}/'
+        full = self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,title,ticket_price,organizer'})
+        self.assertEqual(response.data, {'id': self.event.id, 'title': self.event.title, 'ticket_price': 25.0, 'organizer': self.user.id})
+        self.assertNotEqual(response['ETag'], full['ETag'])
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'fields': 'tags'})
+        self.assertEqual(response.data, {'tags': full.data['tags']})
+
+        response = self.client.get(url, {'fields': 'title'}, HTTP_IF_NONE_MATCH=self.client.get(url, {'fields': 'title'})['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(url, {'fields': 'nope'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_views_match(self):
+        headers = {'Authorization': f'Token {self.token.key}'}
+        for url in ['/api/events/list-events/', f'/api/events/{self.event.id}/']:
+            sync_response = self.client.get(url, {'fields': 'id,title,tags'})
+            get_events_cache().clear()
+            response = async_to_sync(AsyncClient().get)(url.replace('/api/', '/api/async/'), {'fields': 'id,title,tags'}, headers=headers)
+            self.assertEqual(response.content, sync_response.content)
+            self.assertEqual(response['ETag'], sync_response['ETag'])
+
+
+class EventSyncTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def create_event(self, title):
+        return Event.objects.create(title=title, description="Synced.", date=now() + timedelta(days=1), location="Nairobi", organizer=self.user)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get('/api/events/sync/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_sync_from_watermark(self):
+        kept, dropped = self.create_event("Kept Event"), self.create_event("Dropped Event")
+        full = self.sync()
+        self.assertEqual([event['title'] for event in full['events']], ["Kept Event", "Dropped Event"])
+        self.assertEqual(full['deleted'], [])
+        self.assertFalse(full['has_more'])
+
+        kept.tags.add("music")
+        dropped_id = dropped.pk
+        dropped.delete()
+        self.create_event("New Event")
+
+        delta = self.sync(full['watermark'])
+        self.assertEqual([event['title'] for event in delta['events']], ["Kept Event", "New Event"])
+        self.assertEqual(delta['events'][0]['tags'], ["music"])
+        self.assertEqual(delta['deleted'], [dropped_id])
+
+        # Nothing new: same watermark
+        self.assertEqual(self.sync(delta['watermark']), {'events': [], 'deleted': [], 'watermark': delta['watermark'], 'has_more': False})
+
+    def test_full_sync_pages_then_catches_up(self):
+        events = [self.create_event(f"Event {i}") for i in range(3)]
+        first = self.sync(limit=2)
+        self.assertEqual([event['id'] for event in first['events']], [events[0].pk, events[1].pk])
+        self.assertTrue(first['has_more'])
+
+        # Written while the full sync is paging
+        events[0].title = "Renamed Event"
+        events[0].save()
+        deleted_id = events[2].pk
+        events[2].delete()
+
+        second = self.sync(first['watermark'], limit=2)
+        self.assertEqual(second['events'], [])
+        self.assertFalse(second['has_more'])
+        delta = self.sync(second['watermark'])
+        self.assertEqual([event['title'] for event in delta['events']], ["Renamed Event"])
+        self.assertEqual(delta['deleted'], [deleted_id])
+
+    def test_late_commits_and_invalid_watermark(self):
+        watermark = self.sync()['watermark']
+        # A transaction that began long before the last sync commits after it
+        late = self.create_event("Late Event")
+        an_hour_ago = now() - timedelta(hours=1)
+        Event.objects.filter(pk=late.pk).update(updated_at=an_hour_ago)
+        EventChange.objects.filter(event_id=late.pk).update(changed_at=an_hour_ago)
+        self.assertEqual([event['id'] for event in self.sync(watermark)['events']], [late.pk])
+
+        for since in ['not-a-watermark', 'e30']:
+            response = self.client.get('/api/events/sync/', {'since': since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
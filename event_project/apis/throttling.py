@@ -0,0 +1,214 @@
+"""
+Token bucket rate limiting for the API views.
+
+Every client gets a bucket per scope: ``TokenRateThrottle`` keys token
+authenticated requests on the token's user, ``IPRateThrottle`` keys every
+request on the client address. Reads (GET, HEAD, OPTIONS) and writes draw from separate buckets, with
+the rates of ``settings.EVENTS_THROTTLE['RATES']``. A bucket holds up to its
+rate's number of requests and refills continuously, so a check is a constant
+time read-modify-write of two numbers.
+
+Bucket state lives in a store: ``LocalBucketStore`` keeps it in the worker
+process (limits then apply per worker), ``CacheBucketStore`` in a Django cache
+such as Redis shared by all workers. A cache has no atomic read-modify-write,
+so the shared store counts requests per fixed window of the rate's period
+with the atomic ``add``/``incr`` instead of keeping a bucket. Responses of throttled views carry
+``X-RateLimit-Limit``, ``X-RateLimit-Remaining`` and ``X-RateLimit-Reset``
+(seconds until the bucket is full again) for their most depleted bucket, set
+by ``RateLimitHeadersMiddleware``; rejected requests get a 429 with
+``Retry-After``.
+"""
+import functools
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .cache import LRUCache
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def get_throttle_settings():
+    return {
+        'ENABLED': True,
+        'BACKEND': 'apis.throttling.LocalBucketStore',
+        'OPTIONS': {},
+        **getattr(settings, 'EVENTS_THROTTLE', {}),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``'600/min'`` -> ``(600, 10.0)``: capacity and tokens added per second."""
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period]
+
+
+def refill(state, capacity, per_second, now):
+    tokens, updated = state if state is not None else (capacity, now)
+    return min(capacity, tokens + (now - updated) * per_second)
+
+
+class LocalBucketStore:
+    """Buckets in this process, dropped once they would be full again anyway."""
+
+    def __init__(self, max_entries=100000):
+        self.buckets = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, per_second):
+        """
+        Take a token if there is one; return ``(allowed, tokens left, seconds
+        until a token is back or None if allowed, seconds until full)``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = refill(self.buckets.get(key), capacity, per_second, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets.set(key, (tokens, now), timeout=(capacity - tokens) / per_second)
+        wait = None if allowed else (1 - tokens) / per_second
+        return allowed, tokens, wait, (capacity - tokens) / per_second
+
+    def clear(self):
+        self.buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Request counters in a Django cache shared by all workers, one per client
+    and window of the rate's period: ``add`` creates it and ``incr`` counts,
+    both atomic, so concurrent requests never share the last slot. Unlike a
+    bucket a client may spend a window's budget at its end and the next one's
+    right after.
+    """
+
+    def __init__(self, alias='default', prefix='throttle'):
+        self.alias = alias
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def consume(self, key, capacity, per_second):
+        now = time.time()
+        period = capacity / per_second
+        window = math.floor(now / period)
+        key = f'{self.prefix}:{key}:{window}'
+        timeout = math.ceil(period) + 1
+        while True:
+            if self.cache.add(key, 1, timeout=timeout):
+                count = 1
+                break
+            try:
+                count = self.cache.incr(key)
+                break
+            except ValueError:
+                # Expired between add() and incr()
+                continue
+        allowed = count <= capacity
+        reset = (window + 1) * period - now
+        return allowed, max(capacity - count, 0), None if allowed else reset, reset
+
+
+_store = None
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        config = get_throttle_settings()
+        _store = import_string(config['BACKEND'])(**config['OPTIONS'])
+    return _store
+
+
+def _reset_bucket_store(setting, **kwargs):
+    global _store
+    if setting == 'EVENTS_THROTTLE':
+        _store = None
+
+
+setting_changed.connect(_reset_bucket_store)
+
+
+class BucketThrottle(BaseThrottle):
+    """A token bucket per client and scope; subclasses say who the client is."""
+    scope_prefix = None
+
+    def get_client(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        config = get_throttle_settings()
+        client = self.get_client(request)
+        if not config['ENABLED'] or client is None:
+            return True
+
+        scope = f"{self.scope_prefix}_{'read' if request.method in READ_METHODS else 'write'}"
+        capacity, per_second = parse_rate(config['RATES'][scope])
+        allowed, tokens, self.wait_seconds, reset = get_bucket_store().consume(f'{scope}:{client}', capacity, per_second)
+
+        # Keep the most depleted bucket for the response headers
+        state = (capacity, math.floor(tokens), math.ceil(reset))
+        current = getattr(request._request, 'rate_limit', None)
+        if current is None or state[1] < current[1]:
+            request._request.rate_limit = state
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class TokenRateThrottle(BucketThrottle):
+    scope_prefix = 'token'
+
+    def get_client(self, request):
+        # Users have a single token; the user id keeps keys out of the store
+        return getattr(request.auth, 'user_id', None)
+
+
+class IPRateThrottle(BucketThrottle):
+    scope_prefix = 'ip'
+
+    def get_client(self, request):
+        return self.get_ident(request)
+
+
+class RateLimitHeadersMiddleware:
+    """Copy the rate limit state recorded by the throttles to the response."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.add_headers(request, await self.get_response(request))
+
+    def add_headers(self, request, response):
+        state = getattr(request, 'rate_limit', None)
+        if state is not None:
+            limit, remaining, reset = state
+            response['X-RateLimit-Limit'] = str(limit)
+            response['X-RateLimit-Remaining'] = str(max(remaining, 0))
+            response['X-RateLimit-Reset'] = str(reset)
+        return response
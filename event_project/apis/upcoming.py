@@ -0,0 +1,194 @@
+"""
+Materialized index of the upcoming events.
+
+``UpcomingEvent`` holds a row for every event that has not started yet. Rows
+are added, moved and removed as events are written (see signals.py) and
+dropped by the rollover once their event starts, so the set only changes on
+writes and at rollover boundaries: the start time of the earliest upcoming
+event. Between two boundaries an upcoming page is a fixed result that can be
+cached until the boundary, instead of a ``date > now()`` filter that moves
+with the clock.
+
+The rollover runs:
+
+* lazily, before an upcoming read that finds the boundary in the past;
+* from an in-process timer set for the next boundary, when
+  ``UPCOMING_EVENTS['SCHEDULER']`` is on;
+* from the ``rollover_upcoming`` management command (``--loop`` to keep it
+  running next to the app servers).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Min
+from django.utils.timezone import now
+
+from . import tagcounts
+from .cache import get_events_cache
+from .models import Event, UpcomingEvent
+from .routers import internal_writes, primary
+
+logger = logging.getLogger(__name__)
+
+
+def get_upcoming_settings():
+    return {
+        'SCHEDULER': False,
+        'BOUNDARY_TTL': 5,
+        **getattr(settings, 'UPCOMING_EVENTS', {}),
+    }
+
+
+class Boundary:
+    """
+    The earliest upcoming start time, cached per events cache version: any
+    event write bumps the version, and a rollover stores its new boundary.
+    The version may be per process (``LRUBackend``), so the value is also
+    read again after ``BOUNDARY_TTL`` seconds to pick up other workers'
+    writes. It only decides when to roll over; which events are upcoming
+    comes from the index itself.
+    """
+
+    def __init__(self):
+        self._entry = (None, None, None)
+
+    def get(self):
+        version = get_events_cache().backend.get_version()
+        cached_version, value, expires_at = self._entry
+        if cached_version != version or expires_at <= time.monotonic():
+            value = self.refresh(version)
+        return value
+
+    def refresh(self, version=None):
+        if version is None:
+            version = get_events_cache().backend.get_version()
+        value = UpcomingEvent.objects.aggregate(date=Min('date'))['date']
+        self._entry = (version, value, time.monotonic() + get_upcoming_settings()['BOUNDARY_TTL'])
+        return value
+
+    def clear(self):
+        self._entry = (None, None, None)
+
+
+boundary = Boundary()
+
+
+def sync_upcoming(events, created=False):
+    """Add, move or remove the index rows of ``events`` after they were saved."""
+    current = now()
+    upcoming = [UpcomingEvent(event_id=event.pk, date=event.date) for event in events if event.date > current]
+    started = [event.pk for event in events if event.date <= current]
+    indexed = set()
+    if not created:
+        indexed = set(UpcomingEvent.objects.filter(event_id__in=[event.pk for event in events]).values_list('event_id', flat=True))
+
+    if upcoming:
+        UpcomingEvent.objects.bulk_create(
+            upcoming, update_conflicts=True, unique_fields=['event'], update_fields=['date'],
+        )
+    if started:
+        UpcomingEvent.objects.filter(event_id__in=started).delete()
+    if not created:
+        # New events have no tags yet; bulk-created ones are counted by the caller
+        tagcounts.upcoming_changed(
+            entered=[row.event_id for row in upcoming if row.event_id not in indexed],
+            left=[pk for pk in started if pk in indexed],
+        )
+    boundary.clear()
+    if upcoming:
+        schedule_rollover(min(row.date for row in upcoming))
+
+
+def rollover(at=None):
+    """Drop the events that started by ``at`` (default: now); return how many."""
+    with transaction.atomic():
+        started = UpcomingEvent.objects.filter(date__lte=at or now())
+        tagcounts.upcoming_changed(left=started.values('event_id'))
+        deleted, _ = started.delete()
+    boundary.refresh()
+    return deleted
+
+
+def rebuild():
+    """Repopulate the whole index (and the upcoming tag counts) from the events table; return its size."""
+    current = now()
+    with transaction.atomic():
+        UpcomingEvent.objects.all().delete()
+        rows = Event.objects.filter(date__gt=current).values_list('id', 'date')
+        UpcomingEvent.objects.bulk_create(
+            (UpcomingEvent(event_id=pk, date=date) for pk, date in rows.iterator(chunk_size=2000)),
+            batch_size=2000,
+        )
+        tagcounts.rebuild()
+    boundary.refresh()
+    return UpcomingEvent.objects.count()
+
+
+def upcoming_boundary():
+    """Roll over if a boundary has passed and return the next one (None if no events are upcoming)."""
+    # A lagging replica would hold events the primary already rolled over;
+    # rolling over isn't the reader's write
+    with primary(), internal_writes():
+        value = boundary.get()
+        if value is not None and value <= now():
+            rollover()
+            value = boundary.get()
+    schedule_rollover(value)
+    return value
+
+
+class RolloverScheduler:
+    """Runs ``rollover()`` on a timer thread at the earliest requested time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+        self._at = None
+
+    def schedule(self, at):
+        with self._lock:
+            if self._timer is not None and self._at <= at:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = max((at - now()).total_seconds(), 0)
+            self._timer = threading.Timer(delay, self.run)
+            self._timer.daemon = True
+            self._at = at
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = self._at = None
+
+    @property
+    def next_run(self):
+        return self._at
+
+    def run(self):
+        with self._lock:
+            self._timer = self._at = None
+        try:
+            rollover()
+            next_boundary = boundary.get()
+        except Exception:
+            logger.exception('Upcoming events rollover failed')
+            return
+        finally:
+            # Timer threads are short-lived; don't leave their connections open
+            connections.close_all()
+        if next_boundary is not None:
+            self.schedule(next_boundary)
+
+
+scheduler = RolloverScheduler()
+
+
+def schedule_rollover(at):
+    if at is not None and get_upcoming_settings()['SCHEDULER']:
+        scheduler.schedule(at)
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # views for user registration, login & logout
@@ -9,12 +9,29 @@ urlpatterns = [
 
     # CRUD views for events and users
     path('events/create-event/',views.CreateEventAPIView.as_view(),name="create-event"),
+    path('events/bulk-create/',views.BulkCreateEventAPIView.as_view(),name="bulk-create-events"),
+    path('events/batch/',views.BatchEventAPIView.as_view(),name="batch-events"),
     path('events/list-events/',views.ListEventAPIView.as_view(),name="list-event"),
     path('events/<int:pk>/',views.RetrieveUpdateDeleteEventAPIView.as_view(),name="detail-event"),
     # path('events/<int:pk>/edit/',views.RetrieveUpdateDeleteEventAPIView.as_view(),name="edit-event"),
     # path('events/<int:pk>/delete/',views.RetrieveUpdateDeleteEventAPIView.as_view(),name="delete-event"),
     
     path('events/upcoming/',views.ListEventUpcomingAPIView.as_view(),name="upcoming-events"),
+    path('events/search/',views.SearchEventAPIView.as_view(),name="search-events"),
+    path('events/export/',views.ExportEventAPIView.as_view(),name="export-events"),
+    path('events/nearby/',views.NearbyEventAPIView.as_view(),name="nearby-events"),
+    path('events/tags/',views.EventTagsAPIView.as_view(),name="event-tags"),
+    path('events/changes/',views.EventChangesAPIView.as_view(),name="event-changes"),
+    path('events/sync/',views.EventSyncAPIView.as_view(),name="event-sync"),
+
+    # async read path, served natively under ASGI
+    path('async/events/list-events/',async_views.AsyncListEventView.as_view(),name="async-list-event"),
+    path('async/events/upcoming/',async_views.AsyncListEventUpcomingView.as_view(),name="async-upcoming-events"),
+    path('async/events/<int:pk>/',async_views.AsyncRetrieveEventView.as_view(),name="async-detail-event"),
+    path('async/events/changes/stream/',async_views.EventChangeStreamView.as_view(),name="event-changes-stream"),
+
+    # runtime statistics for admins
+    path('stats/',views.StatsAPIView.as_view(),name="stats"),
 
     
 ]
@@ -1,13 +1,33 @@
 from django.shortcuts import render
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.contrib.auth import get_user_model
 from .models import Event
+from .authentication import CachedTokenAuthentication, get_token_cache
+from .bulk import bulk_create_events
+from .changes import changes_since, get_changes_settings
+from .cache import get_events_cache
+from .conditional import conditional_response, event_validators, if_match_given, make_etag, page_validators, set_validators
+from .export import EXPORT_FORMATS
+from . import geo
+from .metrics import timer
+from .pagination import EventCursorPagination
 from .permissions import IsAuthorOrReadOnly
+from .renderers import BINARY_RENDERER_CLASSES
+from .routers import ReplicaReadsMixin, reads_pinned_to_primary, replica_cache_timeout
+from .search import search_events, search_terms
+from .sync import decode_watermark, get_sync_settings, sync_page
+from .tagcounts import tag_facets
 from rest_framework import views, status
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication, authenticate
+from rest_framework.authentication import SessionAuthentication, authenticate
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .serializers import LoginSerializer, RegisterUserSerializer, EventSerializer, UserSerializer, CreateEventSerializer
+from rest_framework.settings import api_settings
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .serializers import LoginSerializer, RegisterUserSerializer, EventSerializer, EventValuesSerializer, UserSerializer, CreateEventSerializer, BulkCreateEventSerializer
 from django.utils.timezone import now
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -56,18 +76,13 @@ class RegisterUserAPIView(views.APIView):
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-
-            user = User.objects.get(username=request.data['username'])
-            token = Token.objects.get(user=user)
-
-            user_serializer = self.serializer_class(user)
+            user = serializer.save()
 
             return Response(
                 {
                     'message': 'New user registration successful!',
-                    'user': user_serializer.data,
-                    'token': token.key
+                    'user': serializer.data,
+                    'token': user.auth_token.key
                 },
                 status=status.HTTP_201_CREATED
             )
@@ -133,10 +148,8 @@ class LoginUserAPIView(views.APIView):
             )
 
             if user:
-                authenticated_user = User.objects.get(username=request.data['username'])
-
                 # Use the UserSerializer class instead to return response that doesn't show the user password.
-                user_serializer = UserSerializer(authenticated_user)
+                user_serializer = UserSerializer(user)
 
                 token, created = Token.objects.get_or_create(user=user)
                 return Response(
@@ -152,7 +165,7 @@ class LoginUserAPIView(views.APIView):
     
 
 class LogoutAPIView(views.APIView):
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     
     @swagger_auto_schema(
@@ -181,91 +194,545 @@ class LogoutAPIView(views.APIView):
         )
     
 
-# APIView to List all events
-class ListEventAPIView(views.APIView):
-    serializer_class = EventSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+# Query, filter and cache-key logic shared by the paginated event list
+# endpoints and their async counterparts in async_views.py
+class EventListMixin:
+    serializer_class = EventValuesSerializer
+    pagination_class = EventCursorPagination
+    cache_name = None
+    # The ?fields= subset of the representation, None for all of it
+    fields = None
+
+    def get_queryset(self):
+        return Event.objects.all()
+
+    def get_fields(self, request):
+        # ValueError for unknown field names
+        return self.serializer_class.parse_fields(request.query_params.get('fields'))
+
+    def as_rows(self, queryset):
+        # Only the columns the serializer reads, as named tuples
+        return queryset.values_list(*self.serializer_class.columns_for(self.fields), named=True)
+
+    def filter_queryset(self, queryset):
+        # Get tags from query params
+        tags = self.request.query_params.getlist('tags')  # For multiple tags
+
+        if tags:
+            queryset = queryset.tagged_with(tags) # Filter entries by tags
+        return queryset
+
+    def get_cache_params(self, request):
+        paginator = self.pagination_class()
+        params = {
+            'tags': sorted(set(request.query_params.getlist('tags'))),
+            'cursor': request.query_params.get(paginator.cursor_query_param),
+            'page_size': paginator.get_page_size(request),
+        }
+        # Another representation: another cache entry and ETag
+        if self.fields is not None:
+            params['fields'] = list(self.fields)
+        return params
+
+    def get_cache_timeout(self, page):
+        return None
+
+
+class UpcomingEventListMixin(EventListMixin):
+    cache_name = 'upcoming'
+
+    def get_queryset(self):
+        return Event.objects.upcoming()
+
+    def get_cache_timeout(self, page):
+        # The page changes at the rollover of its earliest event
+        return max((page[0].date - now()).total_seconds(), 0) if page else None
+
+
+class BaseEventListAPIView(ReplicaReadsMixin, EventListMixin, views.APIView):
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + BINARY_RENDERER_CLASSES
+
+    def get(self, request):
+        try:
+            self.fields = self.get_fields(request)
+        except ValueError as exc:
+            return Response({'Message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        events_cache = get_events_cache()
+        cache_params = self.get_cache_params(request)
+        cache_key = events_cache.make_key(self.cache_name, cache_params)
+
+        # Users who just wrote may find a page read from a lagging replica
+        entry = None if reads_pinned_to_primary() else events_cache.get(cache_key)
+        if entry is not None:
+            return self.page_response(request, entry, cache_status='HIT')
+
+        events = self.filter_queryset(self.get_queryset())
+        paginator = self.pagination_class()
+
+        if 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            # Check the client's copy against the page's (id, updated_at) rows
+            # before loading and serializing the events themselves.
+            rows = list(paginator.get_page_queryset(events, request).values_list('id', 'updated_at'))
+            etag, last_modified = page_validators(cache_params, rows[:paginator.page_size], len(rows) > paginator.page_size)
+            not_modified = conditional_response(request, self.representation_etag(request, etag), last_modified)
+            if not_modified is not None:
+                patch_vary_headers(not_modified, ('Accept',))
+                return not_modified
+
+        page = paginator.paginate_queryset(self.as_rows(events), request, view=self)
+
+        if page or paginator.cursor is not None:
+            serializer = self.serializer_class(page, fields=self.fields)
+            etag, last_modified = page_validators(
+                cache_params,
+                [(event.id, event.updated_at) for event in page],
+                paginator.has_more,
+            )
+            with timer('serialize'):
+                data = serializer.data
+            entry = {
+                'data': paginator.get_paginated_data(data),
+                'etag': etag,
+                'last_modified': last_modified,
+            }
+            events_cache.set(cache_key, entry, timeout=replica_cache_timeout(self.get_cache_timeout(page)))
+            return self.page_response(request, entry, cache_status='MISS')
+
+        return Response({'Message': 'No event records available'}, status=status.HTTP_404_NOT_FOUND)
+
+    def page_response(self, request, entry, cache_status):
+        etag = self.representation_etag(request, entry['etag'])
+        not_modified = conditional_response(request, etag, entry['last_modified'])
+        response = not_modified or Response(entry['data'], status=status.HTTP_200_OK)
+        set_validators(response, etag, entry['last_modified'])
+        patch_vary_headers(response, ('Accept',))
+        response['X-Cache'] = cache_status
+        return response
+
+    def representation_etag(self, request, etag):
+        # The same page in another format is another representation
+        renderer = request.accepted_renderer
+        if renderer.format == 'json':
+            return etag
+        return make_etag(etag, renderer.media_type)
+
+
+event_list_parameters = [
+    openapi.Parameter(
+        'tags', openapi.IN_QUERY,
+        description="Filter events by tags. Use multiple 'tags' parameters to filter by multiple tags.",
+        type=openapi.TYPE_STRING,
+        required=False,
+        example="music"
+    ),
+    openapi.Parameter(
+        'cursor', openapi.IN_QUERY,
+        description="Opaque cursor taken from the 'next' or 'previous' field of a previous page.",
+        type=openapi.TYPE_STRING,
+        required=False,
+    ),
+    openapi.Parameter(
+        'page_size', openapi.IN_QUERY,
+        description="Number of events per page (capped by EVENTS_MAX_PAGE_SIZE).",
+        type=openapi.TYPE_INTEGER,
+        required=False,
+        example=50
+    ),
+]
+
+fields_parameter = openapi.Parameter(
+    'fields', openapi.IN_QUERY,
+    description="Comma separated fields to return, all of them by default. Events without 'tags' are served without the tag query.",
+    type=openapi.TYPE_STRING,
+    required=False,
+    example="id,title,date"
+)
+event_list_parameters.append(fields_parameter)
+
+
+# APIView to List all events
+class ListEventAPIView(BaseEventListAPIView):
+    cache_name = 'list'
 
     @swagger_auto_schema(
         operation_summary="List all events",
-        operation_description="Retrieves a list of all events. Optionally, filter events by tags using query parameters.",
+        operation_description="Retrieves a page of events ordered by date. Optionally, filter events by tags using query parameters.",
+        manual_parameters=event_list_parameters,
+        responses={200: "OK"}
+    )
+    def get(self, request):
+        return super().get(request)
+    
+# APIView to List all upcoming events
+class ListEventUpcomingAPIView(UpcomingEventListMixin, BaseEventListAPIView):
+    @swagger_auto_schema(
+        operation_summary="List all upcoming events",
+        operation_description="Retrieves a page of upcoming events ordered by date. Optionally, filter events by tags using query parameters.",
+        manual_parameters=event_list_parameters,
+        responses={200: "OK"}
+    )
+    def get(self, request):
+        return super().get(request)
+
+# APIView to search events by title, description and location
+class SearchEventAPIView(ReplicaReadsMixin, views.APIView):
+    serializer_class = EventValuesSerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Search events",
+        operation_description="Full-text search over event titles, descriptions and locations, best matches first. Every word is matched as a prefix. Combine with the tags and upcoming filters to narrow the results.",
         manual_parameters=[
             openapi.Parameter(
-                'tags', openapi.IN_QUERY,
-                description="Filter events by tags. Use multiple 'tags' parameters to filter by multiple tags.",
+                'q', openapi.IN_QUERY,
+                description="Search words, e.g. 'jazz nairobi'.",
                 type=openapi.TYPE_STRING,
+                required=True,
+                example="jazz"
+            ),
+            event_list_parameters[0],
+            openapi.Parameter(
+                'upcoming', openapi.IN_QUERY,
+                description="Only return upcoming events.",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description="Maximum number of results (capped by EVENTS_MAX_PAGE_SIZE).",
+                type=openapi.TYPE_INTEGER,
                 required=False,
-                example="music"
+                example=20
             ),
         ],
         responses={200: "OK"}
     )
     def get(self, request):
+        query = request.query_params.get('q', '')
+        if not search_terms(query):
+            return Response({'Message': "Provide search words with the 'q' query parameter."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), settings.EVENTS_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = 20
+
         events = Event.objects.all()
+        if request.query_params.get('upcoming') in ('1', 'true', 'True'):
+            events = events.upcoming()
+        tags = request.query_params.getlist('tags')
+        if tags:
+            events = events.tagged_with(tags)
+
+        events = search_events(events, query).values_list(*self.serializer_class.value_fields, named=True)
+        rows = list(events[:max(limit, 1)])
+        with timer('serialize'):
+            data = self.serializer_class(rows).data
+        return Response(
+            {
+                'events': data,
+            },
+            status=status.HTTP_200_OK
+        )
 
+# APIView to find events close to a point
+class NearbyEventAPIView(ReplicaReadsMixin, views.APIView):
+    serializer_class = EventValuesSerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
-        # Get tags from query params
-        tags = request.query_params.getlist('tags')  # For multiple tags
+    @swagger_auto_schema(
+        operation_summary="Events near a point",
+        operation_description="Lists the events within 'radius' kilometres of a point, closest first, with their distance in 'distance_km'. Give the point as 'lat' and 'lon', or as a place name with 'near'. Only events with coordinates are found.",
+        manual_parameters=[
+            openapi.Parameter(
+                'lat', openapi.IN_QUERY,
+                description="Latitude of the point.",
+                type=openapi.TYPE_NUMBER,
+                required=False,
+                example=-1.2864
+            ),
+            openapi.Parameter(
+                'lon', openapi.IN_QUERY,
+                description="Longitude of the point.",
+                type=openapi.TYPE_NUMBER,
+                required=False,
+                example=36.8172
+            ),
+            openapi.Parameter(
+                'near', openapi.IN_QUERY,
+                description="Place name to use instead of 'lat' and 'lon'.",
+                type=openapi.TYPE_STRING,
+                required=False,
+                example="Nairobi"
+            ),
+            openapi.Parameter(
+                'radius', openapi.IN_QUERY,
+                description="Search radius in kilometres, 10 by default (capped by EVENTS_NEARBY_MAX_RADIUS_KM).",
+                type=openapi.TYPE_NUMBER,
+                required=False,
+                example=25
+            ),
+            event_list_parameters[0],
+            openapi.Parameter(
+                'upcoming', openapi.IN_QUERY,
+                description="Only return upcoming events.",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description="Maximum number of results (capped by EVENTS_MAX_PAGE_SIZE).",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                example=20
+            ),
+        ],
+        responses={200: "OK"}
+    )
+    def get(self, request):
+        params = request.query_params
+        if params.get('near'):
+            point = geo.geocode(params['near'])
+            if point is None:
+                return Response({'Message': f"Unknown place '{params['near']}'."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            try:
+                point = (float(params['lat']), float(params['lon']))
+            except (KeyError, ValueError):
+                return Response({'Message': "Provide the 'lat' and 'lon' query parameters, or a place name with 'near'."}, status=status.HTTP_400_BAD_REQUEST)
+            if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180):
+                return Response({'Message': "'lat' must be between -90 and 90 and 'lon' between -180 and 180."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            radius = float(params.get('radius', 10))
+        except ValueError:
+            radius = 0
+        if not 0 < radius <= settings.EVENTS_NEARBY_MAX_RADIUS_KM:
+            return Response({'Message': f"'radius' must be a number of kilometres up to {settings.EVENTS_NEARBY_MAX_RADIUS_KM}."}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            limit = min(int(params.get('limit', 20)), settings.EVENTS_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = 20
+
+        events = Event.objects.near(*point, radius)
+        if params.get('upcoming') in ('1', 'true', 'True'):
+            events = events.upcoming()
+        tags = params.getlist('tags')
         if tags:
-            events = events.filter(tags__name__in=tags).distinct() # Filter entries by tags
+            events = events.tagged_with(tags)
 
-        if events.exists():
-            serializer = self.serializer_class(events, many=True)
+        # Rank the candidates on their coordinates alone, then load the closest
+        distances = {}
+        for pk, latitude, longitude in events.values_list('id', 'latitude', 'longitude'):
+            distance = geo.haversine_km(point[0], point[1], latitude, longitude)
+            if distance <= radius:
+                distances[pk] = distance
+        closest = sorted(distances, key=lambda pk: (distances[pk], pk))[:max(limit, 1)]
+        rows = Event.objects.filter(pk__in=closest).values_list(*self.serializer_class.value_fields, named=True)
+        rows = sorted(rows, key=lambda row: (distances[row.id], row.id))
 
-            return Response(
-                {
-                    'events':serializer.data,
-                },
-                status=status.HTTP_200_OK
-            )
-        return Response({'Message': 'No event records available'}, status=status.HTTP_404_NOT_FOUND)
-    
-# APIView to List all upcoming events
-class ListEventUpcomingAPIView(views.APIView):
-    serializer_class = EventSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+        with timer('serialize'):
+            data = self.serializer_class(rows).data
+            for event in data:
+                event['distance_km'] = round(distances[event['id']], 3)
+        return Response(
+            {
+                'events': data,
+            },
+            status=status.HTTP_200_OK
+        )
+
+# APIView to list tags with their event counts
+class EventTagsAPIView(ReplicaReadsMixin, views.APIView):
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_summary="List all upcoming events",
-        operation_description="Retrieves a list of all upcoming events. Optionally, filter events by tags using query parameters.",
+        operation_summary="Tag facets and autocomplete",
+        operation_description="Lists the most used tags with their number of events, for building 'tags' filters. With 'prefix', only tags starting with it (case insensitive) are returned, for autocompletion.",
         manual_parameters=[
             openapi.Parameter(
-                'tags', openapi.IN_QUERY,
-                description="Filter events by tags. Use multiple 'tags' parameters to filter by multiple tags.",
+                'prefix', openapi.IN_QUERY,
+                description="Only return tags starting with this text.",
                 type=openapi.TYPE_STRING,
                 required=False,
-                example="music"
+                example="mu"
             ),
-        ],        
+            openapi.Parameter(
+                'upcoming', openapi.IN_QUERY,
+                description="Only count upcoming events.",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description="Maximum number of tags (capped by EVENTS_MAX_PAGE_SIZE).",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                example=20
+            ),
+        ],
         responses={200: "OK"}
     )
     def get(self, request):
-        events = Event.objects.filter(date__gt=now())
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), settings.EVENTS_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = 20
 
-        # Get tags from query params
-        tags = request.query_params.getlist('tags')  # For multiple tags
+        tags = tag_facets(
+            prefix=request.query_params.get('prefix', '').strip(),
+            upcoming=request.query_params.get('upcoming') in ('1', 'true', 'True'),
+            limit=max(limit, 1),
+        )
+        return Response(
+            {
+                'tags': tags,
+            },
+            status=status.HTTP_200_OK
+        )
 
-        if tags:
-            events = events.filter(tags__name__in=tags).distinct() # Filter entries by tags
+# APIView to list the event changes since a sequence number
+class EventChangesAPIView(ReplicaReadsMixin, views.APIView):
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
-        if events.exists():
-            serializer = self.serializer_class(events, many=True)
+    @swagger_auto_schema(
+        operation_summary="Event changes since a sequence number",
+        operation_description="Lists the events created, updated or deleted after change 'since', in order, each with its current representation ('event' is null for deleted events). Pass the returned 'next' as 'since' to get the following changes; 'has_more' says whether there are more already. Starting from 0 returns the whole catalog. The same changes are streamed live as Server-Sent Events at async/events/changes/stream/.",
+        manual_parameters=[
+            openapi.Parameter(
+                'since', openapi.IN_QUERY,
+                description="Sequence number of the last change already seen, 0 by default.",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                example=0
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description="Maximum number of log entries to read (capped by EVENTS_CHANGES['MAX_PAGE_SIZE']).",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                example=500
+            ),
+        ],
+        responses={200: "OK"}
+    )
+    def get(self, request):
+        config = get_changes_settings()
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            since = -1
+        if since < 0:
+            return Response({'Message': "'since' must be a change sequence number (0 or more)."}, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response(
-                {
-                    'events':serializer.data,
-                },
-                status=status.HTTP_200_OK
-            )
-        return Response({'Message': 'No event records available'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(int(request.query_params.get('limit', config['PAGE_SIZE'])), config['MAX_PAGE_SIZE'])
+        except ValueError:
+            limit = config['PAGE_SIZE']
+
+        with timer('serialize'):
+            data = changes_since(since, max(limit, 1))
+        return Response(data, status=status.HTTP_200_OK)
+
+# APIView to sync a copy of the catalog from a watermark
+class EventSyncAPIView(views.APIView):
+    # Reads stay on the primary: a lagging replica could hide writes older
+    # than the returned watermark, and the client would never see them
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Sync events from a watermark",
+        operation_description="Returns the events written and the ids of the events deleted since 'since', in the order of the change log, with the 'watermark' to pass as 'since' next time. Without 'since' the whole catalog is returned. While 'has_more' is true, call again with the new watermark.",
+        manual_parameters=[
+            openapi.Parameter(
+                'since', openapi.IN_QUERY,
+                description="Watermark returned by the previous sync.",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description="Maximum number of updated and deleted events together (capped by EVENTS_SYNC['MAX_PAGE_SIZE']).",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                example=500
+            ),
+        ],
+        responses={200: "OK", 400: "Invalid watermark"}
+    )
+    def get(self, request):
+        config = get_sync_settings()
+        since = request.query_params.get('since')
+        try:
+            watermark = decode_watermark(since) if since else None
+        except ValueError:
+            return Response({'Message': "'since' must be a watermark returned by events/sync/."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.query_params.get('limit', config['PAGE_SIZE'])), config['MAX_PAGE_SIZE'])
+        except ValueError:
+            limit = config['PAGE_SIZE']
+
+        with timer('serialize'):
+            data = sync_page(watermark, max(limit, 1))
+        return Response(data, status=status.HTTP_200_OK)
+
+# APIView to stream the whole event catalog
+class ExportEventAPIView(ReplicaReadsMixin, views.APIView):
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Export events",
+        operation_description="Streams every event as NDJSON (one JSON object per line) or CSV. Optionally, filter events by tags or restrict the export to upcoming events.",
+        manual_parameters=[
+            openapi.Parameter(
+                'output', openapi.IN_QUERY,
+                description="Export format: 'ndjson' (default) or 'csv'.",
+                type=openapi.TYPE_STRING,
+                required=False,
+                example="csv"
+            ),
+            event_list_parameters[0],
+            openapi.Parameter(
+                'upcoming', openapi.IN_QUERY,
+                description="Only export upcoming events.",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
+        ],
+        responses={200: "OK"}
+    )
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'Message': f"Unknown export format '{output}'. Use one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        iter_rows, content_type, filename = EXPORT_FORMATS[output]
+
+        events = Event.objects.all()
+        if request.query_params.get('upcoming') in ('1', 'true', 'True'):
+            events = events.upcoming()
+        tags = request.query_params.getlist('tags')
+        if tags:
+            events = events.tagged_with(tags)
+
+        response = StreamingHttpResponse(iter_rows(events, settings.EVENTS_EXPORT_CHUNK_SIZE), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 # APIView to Create an event
 class CreateEventAPIView(views.APIView):
     serializer_class = CreateEventSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     # def get(self, request):
@@ -324,31 +791,185 @@ class CreateEventAPIView(views.APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    
+
+
+# APIView to Create many events in one request
+class BulkCreateEventAPIView(views.APIView):
+    serializer_class = BulkCreateEventSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Create events in bulk",
+        operation_description="Validates a list of events and creates the valid ones in batched inserts. The authenticated user is set as the organizer. Invalid items are reported by their index in the request.",
+        request_body=BulkCreateEventSerializer(many=True),
+        responses={
+            201: openapi.Response(
+                description="Events Created",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "created": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT)),
+                        "errors": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT)),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="2 events created, 1 failed."),
+                    },
+                ),
+            )
+        }
+    )
+    def post(self, request):
+        items = request.data.get('events') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'Message': 'Send a non-empty list of events.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = settings.EVENTS_BULK_CREATE_MAX_SIZE
+        if len(items) > max_size:
+            return Response({'Message': f'At most {max_size} events can be created per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            serializer = self.serializer_class(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        # One query for title clashes with existing events, plus clashes inside the batch
+        titles = [data['title'] for index, data in valid]
+        taken = set(Event.objects.filter(title__in=titles).values_list('title', flat=True))
+        accepted = []
+        for index, data in valid:
+            if data['title'] in taken:
+                errors.append({'index': index, 'errors': {'title': ['event with this title already exists.']}})
+            else:
+                taken.add(data['title'])
+                accepted.append((index, data))
+        errors.sort(key=lambda error: error['index'])
+
+        events = bulk_create_events([data for index, data in accepted], organizer=request.user)
+
+        return Response(
+            {
+                'created': [{'index': index, 'id': event.id} for (index, data), event in zip(accepted, events)],
+                'errors': errors,
+                'message': f'{len(events)} events created, {len(errors)} failed.'
+            },
+            status=status.HTTP_201_CREATED if events else status.HTTP_400_BAD_REQUEST
+        )
+
+# APIView to retrieve many events by id in one request
+class BatchEventAPIView(ReplicaReadsMixin, views.APIView):
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve events by id",
+        operation_description="Returns the requested events in the order of their ids, with the ids that match no event under 'missing'. Repeated ids are returned once. Send large id sets with POST instead.",
+        manual_parameters=[
+            openapi.Parameter(
+                'ids', openapi.IN_QUERY,
+                description="Comma separated event ids (at most EVENTS_BATCH_MAX_SIZE).",
+                type=openapi.TYPE_STRING,
+                required=True,
+                example="3,1,2"
+            ),
+        ],
+        responses={200: "OK", 400: "Invalid or too many ids"}
+    )
+    def get(self, request):
+        ids = [part for value in request.query_params.getlist('ids') for part in value.split(',') if part.strip()]
+        return self.batch(ids)
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve events by id (POST)",
+        operation_description="Same as GET, for id sets too long for a URL.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "ids": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_INTEGER), example=[3, 1, 2]),
+            },
+            required=["ids"],
+        ),
+        responses={200: "OK", 400: "Invalid or too many ids"}
+    )
+    def post(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+        if not isinstance(ids, list):
+            return Response({'Message': "Send the event ids as a list under 'ids'."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.batch(ids)
+
+    def batch(self, ids):
+        try:
+            # Request order, without repeats
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response({'Message': 'Event ids must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'Message': 'Pass at least one event id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = settings.EVENTS_BATCH_MAX_SIZE
+        if len(ids) > max_size:
+            return Response({'Message': f'At most {max_size} events can be retrieved per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The rows, then the tags of all of them: two queries for any batch
+        rows = Event.objects.filter(pk__in=ids).values_list(*EventValuesSerializer.value_fields, named=True)
+        found = {row.id: row for row in rows}
+        with timer('serialize'):
+            events = EventValuesSerializer([found[pk] for pk in ids if pk in found]).data
+        return Response(
+            {
+                'events': events,
+                'missing': [pk for pk in ids if pk not in found],
+            },
+            status=status.HTTP_200_OK
+        )
+
+   
 # APIView to Retrieve, Update & Delete a specific event   
-class RetrieveUpdateDeleteEventAPIView(views.APIView):
+class RetrieveUpdateDeleteEventAPIView(ReplicaReadsMixin, views.APIView):
     serializer_class = EventSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthorOrReadOnly, IsAuthenticated]
 
-    def get_object(self, pk):
+    def get_object(self, pk, fields=None):
+        queryset = Event.objects.all()
+        if fields is not None:
+            queryset = queryset.only(*EventValuesSerializer.columns_for(fields))
         try:
-            obj = Event.objects.get(pk=pk)
+            obj = queryset.get(pk=pk)
             # Enforce object-level permission
             self.check_object_permissions(self.request, obj)
             return obj
         except Event.DoesNotExist:
-            return Response({'Message': 'No event record available'}, status=status.HTTP_404_NOT_FOUND)
+            raise NotFound({'Message': 'No event record available'})
     
     @swagger_auto_schema(
         operation_summary="Retrieve an event",
         operation_description="Retrieve an event by its ID. Only logged in user can retrieve an event.",
+        manual_parameters=[fields_parameter],
         responses={200: "OK"}
     )
     def get(self, request, pk, format=None):
-        Event = self.get_object(pk)
-        serializer = EventSerializer(Event)
-        return Response(serializer.data)
+        try:
+            fields = EventValuesSerializer.parse_fields(request.query_params.get('fields'))
+        except ValueError as exc:
+            return Response({'Message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        event = self.get_object(pk, fields)
+
+        # Answer conditional GETs before the serializer runs
+        etag, last_modified = event_validators(event)
+        if fields is not None:
+            etag = make_etag(etag, fields)
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        with timer('serialize'):
+            if fields is None:
+                data = EventSerializer(event).data
+            else:
+                data = EventValuesSerializer([event], fields=fields).data[0]
+        return set_validators(Response(data), etag, last_modified)
     
     @swagger_auto_schema(
         operation_summary="Update an event",
@@ -390,17 +1011,29 @@ class RetrieveUpdateDeleteEventAPIView(views.APIView):
     )
     def put(self, request, pk, format=None):
         event = self.get_object(pk)
+
+        # Optimistic concurrency: If-Match must name the current version
+        precondition_failed = conditional_response(request, *event_validators(event))
+        if precondition_failed is not None:
+            return precondition_failed
+
         serializer = EventSerializer(event, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                # Another writer may have passed the same check: only the
+                # first to claim the version it saw gets to write
+                if if_match_given(request) and not self.claim_version(event):
+                    return self.version_conflict()
+                serializer.save()
 
-            return Response(
+            response = Response(
                 {
                     "event" : serializer.data,
                     "message": "Event updated successfully!"
                 },
                 status=status.HTTP_200_OK
             )
+            return set_validators(response, *event_validators(event))
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -421,7 +1054,18 @@ class RetrieveUpdateDeleteEventAPIView(views.APIView):
     )
     def delete(self, request, pk, format=None):
         event = self.get_object(pk)
-        event.delete()
+
+        precondition_failed = conditional_response(request, *event_validators(event))
+        if precondition_failed is not None:
+            return precondition_failed
+
+        if if_match_given(request):
+            # Only the version the client saw
+            deleted, _ = Event.objects.filter(pk=event.pk, updated_at=event.updated_at).delete()
+            if not deleted:
+                return self.version_conflict()
+        else:
+            event.delete()
         return Response(
             {
                 "message": "Event deleted successfully!"
@@ -429,3 +1073,29 @@ class RetrieveUpdateDeleteEventAPIView(views.APIView):
             status=status.HTTP_204_NO_CONTENT
         )
 
+    def claim_version(self, event):
+        # A conditional UPDATE: it also locks the row until the transaction ends
+        return Event.objects.filter(pk=event.pk, updated_at=event.updated_at).update(updated_at=now()) == 1
+
+    def version_conflict(self):
+        return Response({'Message': 'The event was changed by someone else; fetch it again.'}, status=status.HTTP_412_PRECONDITION_FAILED)
+
+
+# APIView to expose runtime cache statistics to admins
+class StatsAPIView(views.APIView):
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Cache statistics",
+        operation_description="Returns hit/miss counters of the event list response cache and the token authentication cache for this worker process. Admin only.",
+        responses={200: "OK"}
+    )
+    def get(self, request):
+        return Response(
+            {
+                'events_cache': get_events_cache().stats(),
+                'token_cache': get_token_cache().stats(),
+            },
+            status=status.HTTP_200_OK
+        )
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,14 +58,140 @@ SWAGGER_SETTINGS = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apis.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         # 'rest_framework.authentication.TokenAuthentication'
-    ]
+    ],
+    # JSONRenderer output, encoded with orjson when it is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'apis.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Token buckets configured by EVENTS_THROTTLE (see apis/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'apis.throttling.TokenRateThrottle',
+        'apis.throttling.IPRateThrottle',
+    ],
+}
+
+# Recently used token -> user lookups kept by CachedTokenAuthentication
+# (see apis/authentication.py). TTL is in seconds. Logouts and user changes
+# are stamped in the CACHE Django cache, which every worker checks on each
+# hit; point it at a cache shared by all workers (e.g. Redis) when running
+# more than one process.
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+    'CACHE': 'default',
+}
+
+# Cursor pagination for the event list endpoints (see apis/pagination.py)
+EVENTS_PAGE_SIZE = 50
+EVENTS_MAX_PAGE_SIZE = 500
+
+# Largest list accepted by events/bulk-create/
+EVENTS_BULK_CREATE_MAX_SIZE = 5000
+
+# Most ids accepted by events/batch/
+EVENTS_BATCH_MAX_SIZE = 500
+
+# Largest radius accepted by events/nearby/, in kilometres
+EVENTS_NEARBY_MAX_RADIUS_KM = 500
+
+# Events read per query (and per tag query) by the streaming events/export/
+EVENTS_EXPORT_CHUNK_SIZE = 2000
+
+# Cache of serialized event list pages (see apis/cache.py). The default keeps
+# entries in each worker process for at most `timeout` seconds; other workers
+# don't see its invalidations, so they may serve pages that old. With more
+# than one worker, point it at a Redis (or Redis-compatible) Django cache
+# instead, which shares entries and invalidations:
+#
+# CACHES = {
+#     'events': {
+#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379',
+#     }
+# }
+# EVENTS_CACHE = {
+#     'BACKEND': 'apis.cache.DjangoCacheBackend',
+#     'OPTIONS': {'alias': 'events', 'timeout': 300},
+# }
+EVENTS_CACHE = {
+    'BACKEND': 'apis.cache.LRUBackend',
+    'OPTIONS': {'max_entries': 1024, 'timeout': 60},
+}
+
+# Upcoming events index (see apis/upcoming.py). Events leave it at their start
+# time: on the next upcoming read, or right away from a timer thread in each
+# worker when SCHEDULER is on. `manage.py rollover_upcoming --loop` does the
+# same from a single separate process. Each worker reads the next rollover
+# time again after BOUNDARY_TTL seconds, to notice other workers' events.
+UPCOMING_EVENTS = {
+    'SCHEDULER': False,
+    'BOUNDARY_TTL': 5,
+}
+
+# Request budgets per token and per client address, as DRF-style rates (see
+# apis/throttling.py). Buckets are kept per worker process; to share them
+# between workers use 'apis.throttling.CacheBucketStore' with
+# 'OPTIONS': {'alias': <a shared cache such as Redis>}.
+EVENTS_THROTTLE = {
+    'ENABLED': True,
+    'BACKEND': 'apis.throttling.LocalBucketStore',
+    'OPTIONS': {'max_entries': 100000},
+    'RATES': {
+        'token_read': '1200/min',
+        'token_write': '120/min',
+        'ip_read': '3000/min',
+        'ip_write': '300/min',
+    },
+}
+
+# Change feed (apis/changes.py): log entries per events/changes/ page, and the
+# heartbeat (also how often the stream polls for other workers' writes) and
+# per-subscriber backlog of the SSE stream.
+EVENTS_CHANGES = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 5000,
+    'HEARTBEAT_SECONDS': 15,
+    'QUEUE_SIZE': 1000,
+}
+
+# Delta sync (apis/sync.py): updated and deleted events per events/sync/ page.
+EVENTS_SYNC = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 5000,
+}
+
+# Per-request timing (apis.metrics.PerformanceMiddleware). Only SAMPLE_RATE of
+# the requests are measured; they get a Server-Timing header and feed the
+# Prometheus histograms served at /metrics to the listed addresses.
+PERFORMANCE_METRICS = {
+    'SAMPLE_RATE': 0.05,
+    'SERVER_TIMING': True,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+# Response compression (apis.compression.CompressionMiddleware): brotli when
+# the brotli package is installed, else gzip, for bodies of MIN_SIZE bytes or
+# more in one of the API's CONTENT_TYPES. Keep HTML out: its CSRF tokens would
+# be exposed to BREACH.
+EVENTS_COMPRESSION = {
+    'ENABLED': True,
+    'ENCODINGS': ['br', 'gzip'],
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CONTENT_TYPES': ['application/json', 'application/msgpack', 'application/x-ndjson', 'text/csv'],
 }
 
 
 MIDDLEWARE = [
+    'apis.metrics.PerformanceMiddleware',
+    'apis.throttling.RateLimitHeadersMiddleware',
+    'apis.routers.ReplicaRoutingMiddleware',
+    'apis.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,11 +225,62 @@ WSGI_APPLICATION = 'event_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# SQLite profiles, picked with the EVENT_API_DB_PROFILE environment variable.
+# 'tuned' (the default) runs in WAL mode so readers never block on a writer,
+# applies the pragmas below on every new connection, waits on a locked
+# database instead of failing at once, takes the write lock when a transaction
+# starts (no deadlocking lock upgrades) and keeps connections open between
+# requests. 'default' is Django's stock SQLite configuration.
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',  # 256 MiB
+    'PRAGMA cache_size=-65536',  # 64 MiB
+    'PRAGMA temp_store=MEMORY',
+]
+
+DATABASE_PROFILES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'tuned': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,  # seconds to wait for a lock
+        },
+    },
+}
+
+DATABASE_PROFILE = os.environ.get('EVENT_API_DB_PROFILE', 'tuned')
+
+DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+
+# Read replicas (apis/routers.py). EVENT_API_DB_REPLICAS=2 adds the aliases
+# replica1 and replica2: SQLite copies of the database next to it, refreshed by
+# `manage.py sync_sqlite_replicas`. Another engine's replicas go here the same way.
+for index in range(1, int(os.environ.get('EVENT_API_DB_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db.replica{index}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['apis.routers.PrimaryReplicaRouter']
+
+# Users are pinned to the primary for STICKY_SECONDS after a write, so they
+# read their own writes; use a CACHE shared by all workers in production.
+DATABASE_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': 5,
+    'CACHE': 'default',
 }
 
 
@@ -124,6 +302,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher writes new hashes; the others only read old ones.
+PASSWORD_HASHERS = [
+    'apis.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# PBKDF2 cost of new and rehashed passwords (None: Django's default), the
+# number of processes hashing them (0: in the request thread) and how long
+# hashing stays in the request thread after the pool breaks. See
+# apis/hashers.py; lowering ITERATIONS trades brute-force resistance for login
+# latency, so change it per deployment rather than per environment.
+PASSWORD_HASHING = {
+    'ITERATIONS': None,
+    'POOL_SIZE': 2,
+    'RETRY_SECONDS': 300,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from apis.metrics import metrics_view
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -37,4 +38,5 @@ urlpatterns = [
     path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('admin/', admin.site.urls),
     path('api/', include('apis.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]